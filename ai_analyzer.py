@@ -1,32 +1,155 @@
 import json
 import os
-from openai import OpenAI
+from openai import OpenAI, APITimeoutError
 import logging
-from datetime import datetime
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from models import AirlineData, MarketInsight
+from data_processor import summarize_airline_data
+from fake_llm import FakeChatClient
+from insight_cache import insight_cache_key
+from metrics import LLM_CALL_LATENCY
+from data_events import mark_market_insights_written
+from summaries import RouteSummaryAccumulator, PriceSummaryAccumulator, DemandSummaryAccumulator
 
 # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
 # do not change this unless explicitly requested by the user
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "default_key")
-openai = OpenAI(api_key=OPENAI_API_KEY)
+ANALYSIS_MODEL = "gpt-4o"
 
-def analyze_market_trends(processed_data):
+# Part of the insight cache key: bump whenever a prompt in this module
+# changes so results cached for the old prompts are not reused
+PROMPT_TEMPLATE_VERSION = 1
+
+# Retries are handled by complete_analysis so they stay within the deadline
+openai = OpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+
+# Time budget (seconds) for a whole analyze_market_trends run, for each
+# model call, and how many times a failed call is retried
+DEFAULT_DEADLINE = 90
+DEFAULT_CALL_TIMEOUT = 45
+DEFAULT_MAX_RETRIES = 2
+
+def get_llm_client():
+    """
+    Client used for analysis calls. Set LLM_CLIENT=fake to use the local fake
+    client (no network, configurable latency) for tests and benchmarks.
+    """
+    if os.environ.get("LLM_CLIENT") == "fake":
+        return FakeChatClient(latency=float(os.environ.get("FAKE_LLM_LATENCY", 0.5)))
+    return openai
+
+def complete_analysis(messages, client=None, deadline_at=None, call_timeout=DEFAULT_CALL_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES):
+    """
+    Run one JSON-mode chat completion and return the response content.
+    Failed calls are retried with jittered exponential backoff; no attempt or
+    backoff is started past deadline_at (a time.monotonic() value).
+    """
+    client = client or get_llm_client()
+    
+    for attempt in range(max_retries + 1):
+        timeout = call_timeout
+        if deadline_at is not None:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("Analysis deadline exceeded")
+            timeout = min(timeout, remaining)
+        
+        start = time.perf_counter()
+        try:
+            response = client.chat.completions.create(
+                model=ANALYSIS_MODEL,
+                messages=messages,
+                response_format={"type": "json_object"},
+                timeout=timeout
+            )
+            LLM_CALL_LATENCY.observe(time.perf_counter() - start, model=ANALYSIS_MODEL, outcome='ok')
+            return response.choices[0].message.content
+            
+        except Exception as e:
+            outcome = 'timeout' if isinstance(e, (APITimeoutError, TimeoutError)) else 'error'
+            LLM_CALL_LATENCY.observe(time.perf_counter() - start, model=ANALYSIS_MODEL, outcome=outcome)
+            if attempt == max_retries:
+                raise e
+            
+            backoff = min(2 ** attempt, 8) * random.uniform(0.5, 1.5)
+            if deadline_at is not None and time.monotonic() + backoff >= deadline_at:
+                raise e
+            
+            logging.warning(f"Analysis call failed (attempt {attempt + 1}), retrying in {backoff:.1f}s: {str(e)}")
+            time.sleep(backoff)
+
+def _timed_analysis(messages, client, deadline_at, call_timeout, max_retries):
+    """complete_analysis returning (content, seconds taken)"""
+    start = time.perf_counter()
+    content = complete_analysis(messages, client, deadline_at, call_timeout, max_retries)
+    return content, time.perf_counter() - start
+
+def analyze_market_trends(processed_data, client=None, deadline=DEFAULT_DEADLINE, call_timeout=DEFAULT_CALL_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES, cache=None, summaries=None):
     """
     Analyze airline market data using OpenAI to generate insights
+    The three analyses run concurrently under one shared deadline. Analyses
+    that have not finished by the deadline are left out, so the caller can
+    save the partial result. With an InsightCache, analyses whose summary is
+    unchanged are answered from the cache without calling the model.
+    summaries, keyed by insight type (see summaries.AnalysisSummaries), are
+    used instead of preparing them from processed_data.
     Returns a dictionary with different types of insights
     """
     insights = {}
     
     try:
-        # Analyze popular routes
-        insights['popular_routes'] = analyze_popular_routes(processed_data)
+        client = client or get_llm_client()
+        deadline_at = time.monotonic() + deadline
+        
+        analyses = {
+            'popular_routes': (prepare_route_summary, popular_routes_messages, 'popular routes'),
+            'price_trends': (prepare_price_summary, price_trends_messages, 'price trends'),
+            'demand_analysis': (prepare_demand_summary, demand_patterns_messages, 'demand patterns')
+        }
+        
+        executor = ThreadPoolExecutor(max_workers=len(analyses), thread_name_prefix='analysis')
+        futures = {}
+        for insight_type, (prepare_summary, build_messages, label) in analyses.items():
+            summary = summaries[insight_type] if summaries is not None else prepare_summary(processed_data)
+            
+            cache_key = None
+            if cache is not None:
+                cache_key = insight_cache_key(insight_type, ANALYSIS_MODEL, PROMPT_TEMPLATE_VERSION, summary)
+                cached_content = cache.get(cache_key)
+                if cached_content is not None:
+                    insights[insight_type] = cached_content
+                    continue
+            
+            future = executor.submit(_timed_analysis, build_messages(summary), client, deadline_at, call_timeout, max_retries)
+            futures[future] = (insight_type, label, cache_key)
         
-        # Analyze price trends
-        insights['price_trends'] = analyze_price_trends(processed_data)
+        done, not_done = wait(futures, timeout=max(deadline_at - time.monotonic(), 0))
         
-        # Analyze demand patterns
-        insights['demand_analysis'] = analyze_demand_patterns(processed_data)
+        # Don't block on stragglers; their results are discarded
+        executor.shutdown(wait=False, cancel_futures=True)
         
-        logging.info("Successfully generated market insights")
+        for future, (insight_type, label, cache_key) in futures.items():
+            if future in not_done:
+                logging.warning(f"Analysis of {label} missed the {deadline}s deadline")
+                continue
+            
+            try:
+                content, seconds = future.result()
+                insights[insight_type] = content
+                if cache is not None:
+                    cache.put(cache_key, insight_type, ANALYSIS_MODEL, content, seconds)
+            except (TimeoutError, APITimeoutError):
+                logging.warning(f"Analysis of {label} timed out")
+            except Exception as e:
+                logging.error(f"Error analyzing {label}: {str(e)}")
+                insights[insight_type] = json.dumps({"error": f"Failed to analyze {label}: {str(e)}"})
+        
+        logging.info(f"Generated {len(insights)} of {len(analyses)} market insights")
         
     except Exception as e:
         logging.error(f"Error analyzing market trends: {str(e)}")
@@ -34,7 +157,85 @@ def analyze_market_trends(processed_data):
     
     return insights
 
-def analyze_popular_routes(data):
+def generate_and_store_insights(cache=None, days=30):
+    """
+    Summarize the last `days` of airline data, run the market analyses and
+    save each result as a MarketInsight
+    Returns a summary dict with the number of insights saved
+    """
+    period_end = datetime.utcnow()
+    period_start = period_end - timedelta(days=days)
+    
+    # Summarize recent data for analysis in a single streaming pass
+    recent_data = summarize_airline_data(AirlineData.scraped_at >= period_start)
+    if not recent_data.count:
+        return {'records': 0, 'rows_analyzed': 0, 'message': 'No recent data available for analysis'}
+    
+    insights = analyze_market_trends(
+        None,
+        summaries=recent_data.summaries(),
+        deadline=current_app.config['INSIGHTS_DEADLINE'],
+        call_timeout=current_app.config['LLM_CALL_TIMEOUT'],
+        max_retries=current_app.config['LLM_MAX_RETRIES'],
+        cache=cache
+    )
+    
+    # Save insights to database
+    for insight_type, content in insights.items():
+        db.session.add(MarketInsight(
+            insight_type=insight_type,
+            content=content,
+            data_period_start=period_start,
+            data_period_end=period_end
+        ))
+    mark_market_insights_written(db.session, [
+        {'insight_type': insight_type, 'data_period_start': period_start, 'data_period_end': period_end}
+        for insight_type in insights
+    ])
+    db.session.commit()
+    
+    return {'records': len(insights), 'rows_analyzed': recent_data.count, 'insight_types': sorted(insights)}
+
+def popular_routes_messages(route_summary):
+    """
+    Build the chat messages for the popular routes analysis
+    """
+    prompt = f"""
+    Analyze the following airline route data and provide insights about popular routes:
+    
+    Data: {route_summary}
+    
+    Please provide analysis in JSON format with the following structure:
+    {{
+        "top_routes": [
+            {{
+                "route": "route name",
+                "popularity_score": number,
+                "avg_price": number,
+                "trend": "increasing/decreasing/stable"
+            }}
+        ],
+        "insights": [
+            "insight 1",
+            "insight 2",
+            "insight 3"
+        ],
+        "recommendations": [
+            "recommendation 1",
+            "recommendation 2"
+        ]
+    }}
+    """
+    
+    return [
+        {
+            "role": "system",
+            "content": "You are an expert airline market analyst. Analyze the provided data and give actionable insights about popular routes, pricing trends, and market demand."
+        },
+        {"role": "user", "content": prompt}
+    ]
+
+def analyze_popular_routes(data, client=None):
     """
     Analyze popular routes using OpenAI
     """
@@ -42,52 +243,57 @@ def analyze_popular_routes(data):
         # Prepare data summary for analysis
         route_summary = prepare_route_summary(data)
         
-        prompt = f"""
-        Analyze the following airline route data and provide insights about popular routes:
-        
-        Data: {route_summary}
-        
-        Please provide analysis in JSON format with the following structure:
-        {{
-            "top_routes": [
-                {{
-                    "route": "route name",
-                    "popularity_score": number,
-                    "avg_price": number,
-                    "trend": "increasing/decreasing/stable"
-                }}
-            ],
-            "insights": [
-                "insight 1",
-                "insight 2",
-                "insight 3"
-            ],
-            "recommendations": [
-                "recommendation 1",
-                "recommendation 2"
-            ]
-        }}
-        """
-        
-        response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert airline market analyst. Analyze the provided data and give actionable insights about popular routes, pricing trends, and market demand."
-                },
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
-        
-        return response.choices[0].message.content
+        return complete_analysis(popular_routes_messages(route_summary), client=client)
         
     except Exception as e:
         logging.error(f"Error analyzing popular routes: {str(e)}")
         return json.dumps({"error": f"Failed to analyze popular routes: {str(e)}"})
 
-def analyze_price_trends(data):
+def price_trends_messages(price_summary):
+    """
+    Build the chat messages for the price trends analysis
+    """
+    prompt = f"""
+    Analyze the following airline pricing data and provide insights about price trends:
+    
+    Data: {price_summary}
+    
+    Please provide analysis in JSON format with the following structure:
+    {{
+        "overall_trend": "increasing/decreasing/stable",
+        "price_ranges": {{
+            "budget": {{"min": number, "max": number}},
+            "mid_range": {{"min": number, "max": number}},
+            "premium": {{"min": number, "max": number}}
+        }},
+        "seasonal_patterns": [
+            {{
+                "period": "period name",
+                "price_change": "percentage change",
+                "reason": "explanation"
+            }}
+        ],
+        "insights": [
+            "insight 1",
+            "insight 2",
+            "insight 3"
+        ],
+        "recommendations": [
+            "recommendation 1",
+            "recommendation 2"
+        ]
+    }}
+    """
+    
+    return [
+        {
+            "role": "system",
+            "content": "You are an expert airline pricing analyst. Analyze the provided data and give actionable insights about pricing trends, seasonal patterns, and market dynamics."
+        },
+        {"role": "user", "content": prompt}
+    ]
+
+def analyze_price_trends(data, client=None):
     """
     Analyze price trends using OpenAI
     """
@@ -95,57 +301,63 @@ def analyze_price_trends(data):
         # Prepare price data for analysis
         price_summary = prepare_price_summary(data)
         
-        prompt = f"""
-        Analyze the following airline pricing data and provide insights about price trends:
-        
-        Data: {price_summary}
-        
-        Please provide analysis in JSON format with the following structure:
-        {{
-            "overall_trend": "increasing/decreasing/stable",
-            "price_ranges": {{
-                "budget": {{"min": number, "max": number}},
-                "mid_range": {{"min": number, "max": number}},
-                "premium": {{"min": number, "max": number}}
-            }},
-            "seasonal_patterns": [
-                {{
-                    "period": "period name",
-                    "price_change": "percentage change",
-                    "reason": "explanation"
-                }}
-            ],
-            "insights": [
-                "insight 1",
-                "insight 2",
-                "insight 3"
-            ],
-            "recommendations": [
-                "recommendation 1",
-                "recommendation 2"
-            ]
-        }}
-        """
-        
-        response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert airline pricing analyst. Analyze the provided data and give actionable insights about pricing trends, seasonal patterns, and market dynamics."
-                },
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
-        
-        return response.choices[0].message.content
+        return complete_analysis(price_trends_messages(price_summary), client=client)
         
     except Exception as e:
         logging.error(f"Error analyzing price trends: {str(e)}")
         return json.dumps({"error": f"Failed to analyze price trends: {str(e)}"})
 
-def analyze_demand_patterns(data):
+def demand_patterns_messages(demand_summary):
+    """
+    Build the chat messages for the demand patterns analysis
+    """
+    prompt = f"""
+    Analyze the following airline demand data and provide insights about market demand patterns:
+    
+    Data: {demand_summary}
+    
+    Please provide analysis in JSON format with the following structure:
+    {{
+        "peak_demand_periods": [
+            {{
+                "period": "period name",
+                "demand_level": "high/medium/low",
+                "key_routes": ["route1", "route2"],
+                "reasons": ["reason1", "reason2"]
+            }}
+        ],
+        "airline_performance": [
+            {{
+                "airline": "airline name",
+                "market_share": "percentage",
+                "growth_trend": "increasing/decreasing/stable",
+                "competitive_advantage": "description"
+            }}
+        ],
+        "market_opportunities": [
+            {{
+                "opportunity": "opportunity description",
+                "potential_impact": "high/medium/low",
+                "recommendation": "action to take"
+            }}
+        ],
+        "insights": [
+            "insight 1",
+            "insight 2",
+            "insight 3"
+        ]
+    }}
+    """
+    
+    return [
+        {
+            "role": "system",
+            "content": "You are an expert airline demand analyst. Analyze the provided data and give actionable insights about market demand patterns, airline performance, and business opportunities."
+        },
+        {"role": "user", "content": prompt}
+    ]
+
+def analyze_demand_patterns(data, client=None):
     """
     Analyze demand patterns using OpenAI
     """
@@ -153,57 +365,7 @@ def analyze_demand_patterns(data):
         # Prepare demand data for analysis
         demand_summary = prepare_demand_summary(data)
         
-        prompt = f"""
-        Analyze the following airline demand data and provide insights about market demand patterns:
-        
-        Data: {demand_summary}
-        
-        Please provide analysis in JSON format with the following structure:
-        {{
-            "peak_demand_periods": [
-                {{
-                    "period": "period name",
-                    "demand_level": "high/medium/low",
-                    "key_routes": ["route1", "route2"],
-                    "reasons": ["reason1", "reason2"]
-                }}
-            ],
-            "airline_performance": [
-                {{
-                    "airline": "airline name",
-                    "market_share": "percentage",
-                    "growth_trend": "increasing/decreasing/stable",
-                    "competitive_advantage": "description"
-                }}
-            ],
-            "market_opportunities": [
-                {{
-                    "opportunity": "opportunity description",
-                    "potential_impact": "high/medium/low",
-                    "recommendation": "action to take"
-                }}
-            ],
-            "insights": [
-                "insight 1",
-                "insight 2",
-                "insight 3"
-            ]
-        }}
-        """
-        
-        response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert airline demand analyst. Analyze the provided data and give actionable insights about market demand patterns, airline performance, and business opportunities."
-                },
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
-        
-        return response.choices[0].message.content
+        return complete_analysis(demand_patterns_messages(demand_summary), client=client)
         
     except Exception as e:
         logging.error(f"Error analyzing demand patterns: {str(e)}")
@@ -214,40 +376,11 @@ def prepare_route_summary(data):
     Prepare route data summary for AI analysis
     """
     try:
-        route_stats = {}
-        
+        routes = RouteSummaryAccumulator()
         for record in data:
-            route = record['route']
-            if route not in route_stats:
-                route_stats[route] = {
-                    'count': 0,
-                    'total_price': 0,
-                    'airlines': set(),
-                    'origins': set(),
-                    'destinations': set()
-                }
-            
-            route_stats[route]['count'] += 1
-            route_stats[route]['total_price'] += record['price']
-            route_stats[route]['airlines'].add(record['airline'])
-            route_stats[route]['origins'].add(record['origin'])
-            route_stats[route]['destinations'].add(record['destination'])
+            routes.add(record['route'], record['airline'], record['price'], record['departure_date'][:7])
         
-        # Convert to serializable format
-        summary = []
-        for route, stats in route_stats.items():
-            summary.append({
-                'route': route,
-                'booking_count': stats['count'],
-                'avg_price': round(stats['total_price'] / stats['count'], 2),
-                'airline_count': len(stats['airlines']),
-                'airlines': list(stats['airlines'])
-            })
-        
-        # Sort by booking count
-        summary.sort(key=lambda x: x['booking_count'], reverse=True)
-        
-        return summary[:20]  # Top 20 routes
+        return routes.summary()  # Top 20 routes
         
     except Exception as e:
         logging.error(f"Error preparing route summary: {str(e)}")
@@ -256,45 +389,14 @@ def prepare_route_summary(data):
 def prepare_price_summary(data):
     """
     Prepare price data summary for AI analysis
+    Price statistics by route and departure month (YYYY-MM)
     """
     try:
-        price_data = []
-        
+        prices = PriceSummaryAccumulator()
         for record in data:
-            price_data.append({
-                'route': record['route'],
-                'price': record['price'],
-                'airline': record['airline'],
-                'departure_date': record['departure_date'],
-                'month': record['departure_date'][:7]  # YYYY-MM format
-            })
-        
-        # Calculate price statistics by route and month
-        price_stats = {}
-        for record in price_data:
-            key = f"{record['route']}_{record['month']}"
-            if key not in price_stats:
-                price_stats[key] = {
-                    'route': record['route'],
-                    'month': record['month'],
-                    'prices': []
-                }
-            price_stats[key]['prices'].append(record['price'])
+            prices.add(record['route'], record['airline'], record['price'], record['departure_date'][:7])
         
-        # Calculate averages
-        summary = []
-        for key, stats in price_stats.items():
-            prices = stats['prices']
-            summary.append({
-                'route': stats['route'],
-                'month': stats['month'],
-                'avg_price': round(sum(prices) / len(prices), 2),
-                'min_price': min(prices),
-                'max_price': max(prices),
-                'price_count': len(prices)
-            })
-        
-        return summary
+        return prices.summary()
         
     except Exception as e:
         logging.error(f"Error preparing price summary: {str(e)}")
@@ -305,57 +407,11 @@ def prepare_demand_summary(data):
     Prepare demand data summary for AI analysis
     """
     try:
-        demand_data = {
-            'total_bookings': len(data),
-            'airlines': {},
-            'routes': {},
-            'monthly_demand': {}
-        }
-        
+        demand = DemandSummaryAccumulator()
         for record in data:
-            # Airline statistics
-            airline = record['airline']
-            if airline not in demand_data['airlines']:
-                demand_data['airlines'][airline] = {
-                    'booking_count': 0,
-                    'total_revenue': 0,
-                    'avg_price': 0,
-                    'routes': set()
-                }
-            
-            demand_data['airlines'][airline]['booking_count'] += 1
-            demand_data['airlines'][airline]['total_revenue'] += record['price']
-            demand_data['airlines'][airline]['routes'].add(record['route'])
-            
-            # Route statistics
-            route = record['route']
-            if route not in demand_data['routes']:
-                demand_data['routes'][route] = {
-                    'booking_count': 0,
-                    'avg_price': 0,
-                    'airlines': set()
-                }
-            
-            demand_data['routes'][route]['booking_count'] += 1
-            demand_data['routes'][route]['airlines'].add(airline)
-            
-            # Monthly demand
-            month = record['departure_date'][:7]
-            if month not in demand_data['monthly_demand']:
-                demand_data['monthly_demand'][month] = 0
-            demand_data['monthly_demand'][month] += 1
-        
-        # Calculate averages and convert sets to lists
-        for airline in demand_data['airlines']:
-            stats = demand_data['airlines'][airline]
-            stats['avg_price'] = round(stats['total_revenue'] / stats['booking_count'], 2)
-            stats['routes'] = list(stats['routes'])
-        
-        for route in demand_data['routes']:
-            stats = demand_data['routes'][route]
-            stats['airlines'] = list(stats['airlines'])
+            demand.add(record['route'], record['airline'], record['price'], record['departure_date'][:7])
         
-        return demand_data
+        return demand.summary()
         
     except Exception as e:
         logging.error(f"Error preparing demand summary: {str(e)}")
@@ -4,6 +4,7 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
+from storage import RoutingSession, database_url, engine_options, init_storage
 
 # Set up logging for debugging
 logging.basicConfig(level=logging.DEBUG)
@@ -11,30 +12,137 @@ logging.basicConfig(level=logging.DEBUG)
 class Base(DeclarativeBase):
     pass
 
-db = SQLAlchemy(model_class=Base)
+# Request reads can be served by a read-only engine (see storage.py)
+db = SQLAlchemy(model_class=Base, session_options={"class_": RoutingSession})
 
 # Create the app
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key")
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
-# Configure the database
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///airline_data.db"
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_recycle": 300,
-    "pool_pre_ping": True,
-}
+# Configure the database from DATABASE_URL (SQLite in the instance folder by default)
+app.config["SQLALCHEMY_DATABASE_URI"] = database_url()
+
+# Connection pool for PostgreSQL (or another server database)
+app.config["DB_POOL_SIZE"] = int(os.environ.get("DB_POOL_SIZE", 10))
+app.config["DB_MAX_OVERFLOW"] = int(os.environ.get("DB_MAX_OVERFLOW", 20))
+app.config["DB_POOL_TIMEOUT"] = int(os.environ.get("DB_POOL_TIMEOUT", 30))
+
+# SQLite connection tuning: write-ahead logging so reads are not blocked by a
+# writing transaction, relaxed fsync (safe with WAL), memory-mapped reads and
+# how long to wait for a lock before failing
+app.config["SQLITE_JOURNAL_MODE"] = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+app.config["SQLITE_SYNCHRONOUS"] = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+app.config["SQLITE_MMAP_SIZE"] = int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+app.config["SQLITE_BUSY_TIMEOUT_MS"] = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+
+# Reads made while handling GET requests go to a read-only engine: a replica
+# at DATABASE_READ_URL if set, otherwise read-only connections to the SQLite file
+app.config["DATABASE_READ_URL"] = os.environ.get("DATABASE_READ_URL")
+app.config["DB_READ_ROUTING"] = os.environ.get("DB_READ_ROUTING", "1") == "1"
+
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config)
+
+# Scraping concurrency: global cap on parallel fetches and the random delay
+# (seconds) between consecutive requests to the same host
+app.config["SCRAPE_MAX_CONCURRENCY"] = int(os.environ.get("SCRAPE_MAX_CONCURRENCY", 8))
+app.config["SCRAPE_HOST_DELAY"] = (1, 3)
+
+# Shared scraping HTTP client: timeouts in seconds, retries on 429/5xx,
+# connections kept per host and the largest page body accepted
+app.config["HTTP_CONNECT_TIMEOUT"] = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5))
+app.config["HTTP_READ_TIMEOUT"] = float(os.environ.get("HTTP_READ_TIMEOUT", 30))
+app.config["HTTP_MAX_RETRIES"] = int(os.environ.get("HTTP_MAX_RETRIES", 3))
+app.config["HTTP_POOL_MAXSIZE"] = int(os.environ.get("HTTP_POOL_MAXSIZE", 10))
+app.config["HTTP_MAX_RESPONSE_BYTES"] = int(os.environ.get("HTTP_MAX_RESPONSE_BYTES", 5 * 1024 * 1024))
+
+# Flight extraction: worker processes for large page batches (0 = one per
+# CPU) and the batch size in bytes of text below which extraction stays in-process
+app.config["EXTRACTION_PROCESSES"] = int(os.environ.get("EXTRACTION_PROCESSES", 0))
+app.config["EXTRACTION_PARALLEL_MIN_BYTES"] = int(os.environ.get("EXTRACTION_PARALLEL_MIN_BYTES", 4 * 1024 * 1024))
+
+# Number of flight records written per bulk-insert transaction
+app.config["INGEST_BATCH_SIZE"] = int(os.environ.get("INGEST_BATCH_SIZE", 1000))
+
+# Maximum number of cached /api/chart-data responses
+app.config["CHART_CACHE_MAX_ENTRIES"] = int(os.environ.get("CHART_CACHE_MAX_ENTRIES", 256))
+# Upper bound (seconds) on how stale a cached chart can get when another
+# worker process writes data; set to 0 to rely on this process's writes only
+app.config["CHART_CACHE_TTL"] = int(os.environ.get("CHART_CACHE_TTL", 60))
+
+# Analytics backend for data_processor: 'sql' (database aggregates) or 'numpy' (columnar engine)
+app.config["ANALYTICS_BACKEND"] = os.environ.get("ANALYTICS_BACKEND", "sql")
+# Seconds the numpy backend's in-memory snapshot of the flight rows is reused;
+# it is also dropped whenever new data commits in this process
+app.config["COLUMNAR_SNAPSHOT_TTL"] = int(os.environ.get("COLUMNAR_SNAPSHOT_TTL", 60))
+
+# Insight generation: overall deadline and per-call timeout (seconds), and
+# retries per model call
+app.config["INSIGHTS_DEADLINE"] = float(os.environ.get("INSIGHTS_DEADLINE", 90))
+app.config["LLM_CALL_TIMEOUT"] = float(os.environ.get("LLM_CALL_TIMEOUT", 45))
+app.config["LLM_MAX_RETRIES"] = int(os.environ.get("LLM_MAX_RETRIES", 2))
+
+# Hot/cold tiering: rows scraped more than HOT_RETENTION_DAYS ago are moved
+# to the archive table (after each scrape, or with `flask archive-data`).
+# At least 30, since insight generation reads the last 30 days from the hot table
+app.config["HOT_RETENTION_DAYS"] = int(os.environ.get("HOT_RETENTION_DAYS", 90))
+app.config["ARCHIVE_BATCH_SIZE"] = int(os.environ.get("ARCHIVE_BATCH_SIZE", 5000))
+
+# Seconds the index page's dashboard snapshot is served before it is
+# recomputed (it is also dropped whenever new data or insights commit)
+app.config["DASHBOARD_CACHE_TTL"] = int(os.environ.get("DASHBOARD_CACHE_TTL", 30))
+
+# Seconds the insights page's parsed insights are kept in memory; they are
+# dropped as soon as new insights are saved, so this only bounds staleness
+# when insights are generated by another worker process
+app.config["INSIGHTS_PAGE_CACHE_TTL"] = int(os.environ.get("INSIGHTS_PAGE_CACHE_TTL", 300))
+
+# Cached analysis results: lifetime in seconds and maximum number kept
+app.config["INSIGHT_CACHE_TTL"] = int(os.environ.get("INSIGHT_CACHE_TTL", 24 * 3600))
+app.config["INSIGHT_CACHE_MAX_ENTRIES"] = int(os.environ.get("INSIGHT_CACHE_MAX_ENTRIES", 500))
+
+# Price alerts: percentage change in a route's 7-day average price that
+# raises an alert, and seconds between reseeds of the incremental window sums
+# from the rollups (bounds staleness for writes by other worker processes)
+app.config["PRICE_ALERT_THRESHOLD"] = float(os.environ.get("PRICE_ALERT_THRESHOLD", 10))
+app.config["PRICE_ALERT_RESYNC_SECONDS"] = int(os.environ.get("PRICE_ALERT_RESYNC_SECONDS", 300))
+
+# Server-Sent Events streams: seconds between keep-alive comments on an idle
+# stream, and events kept for clients reconnecting with Last-Event-ID
+app.config["SSE_HEARTBEAT_SECONDS"] = int(os.environ.get("SSE_HEARTBEAT_SECONDS", 15))
+app.config["SSE_BUFFER_SIZE"] = int(os.environ.get("SSE_BUFFER_SIZE", 256))
+
+# Worker threads for background scrape and insight generation jobs
+app.config["JOB_MAX_WORKERS"] = int(os.environ.get("JOB_MAX_WORKERS", 2))
+
+# Seconds between heartbeats of a process's active jobs; jobs whose process
+# missed several are failed by the next worker to start or queue that job
+app.config["JOB_HEARTBEAT_SECONDS"] = int(os.environ.get("JOB_HEARTBEAT_SECONDS", 30))
+
+# SQL statements slower than this many milliseconds are logged as warnings
+app.config["SLOW_QUERY_MS"] = int(os.environ.get("SLOW_QUERY_MS", 500))
 
 # Initialize the app with the extension
 db.init_app(app)
+init_storage(app, db)
+
+# Request and SQL statement timings, exposed on /metrics
+from metrics import init_metrics
+init_metrics(app)
 
 with app.app_context():
-    # Import models to create tables
+    # Import models to create tables and apply pending index migrations
     import models
-    db.create_all()
+    from migrations import upgrade_database
+    upgrade_database()
+    
+    # Jobs whose worker process is gone can no longer finish
+    from jobs import fail_interrupted_jobs
+    fail_interrupted_jobs(app.config['JOB_HEARTBEAT_SECONDS'])
 
-# Import routes
+# Import routes and CLI commands
 from routes import *
+import commands
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
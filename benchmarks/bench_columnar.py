@@ -0,0 +1,107 @@
+"""
+Benchmark the NumPy columnar engine against the per-row Python implementations
+it replaces (calculate_standard_deviation over ORM rows, and the dict-based
+grouping in ai_analyzer.prepare_route_summary), and check the results match.
+
+Run from the project root:
+    python -m benchmarks.bench_columnar --rows 200000
+"""
+
+from datetime import datetime, timedelta
+import argparse
+import random
+import time
+from app import db
+from models import AirlineData
+from ai_analyzer import prepare_route_summary
+from columnar import FlightColumns
+from data_processor import calculate_standard_deviation, get_route_statistics, get_popular_routes
+from data_scraper import generate_sample_flight_data
+from ingest import ingest_flights
+from benchmarks.common import benchmark_app
+
+def make_rows(count, seed):
+    random.seed(seed)
+    rows = []
+    while len(rows) < count:
+        for flight in generate_sample_flight_data('Benchmark'):
+            scraped_at = datetime(2025, 1, 1) + timedelta(minutes=random.randint(0, 60 * 24 * 90))
+            rows.append((flight['route'], flight['origin'], flight['destination'], flight['airline'],
+                         flight['price'], flight['departure_date'], scraped_at))
+    return rows[:count]
+
+def per_row_route_stats(rows):
+    """The old approach: group prices with dicts, then loop for mean/std"""
+    prices_by_route = {}
+    for route, origin, destination, airline, price, departure_date, scraped_at in rows:
+        prices_by_route.setdefault(route, []).append(price)
+
+    return {
+        route: (len(prices), sum(prices) / len(prices), calculate_standard_deviation(prices), min(prices), max(prices))
+        for route, prices in prices_by_route.items()
+    }
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-uri', help='defaults to a temporary SQLite file')
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, args.seed)
+
+    # In-memory grouping: per-row Python vs vectorized
+    expected, per_row_seconds = timed(per_row_route_stats, rows)
+    columns, build_seconds = timed(FlightColumns.from_rows, rows)
+    grouped, columnar_seconds = timed(columns.group_stats, 'route')
+
+    for stats in grouped:
+        count, mean, std, low, high = expected[stats['route']]
+        assert stats['count'] == count and stats['min'] == low and stats['max'] == high
+        assert abs(stats['mean'] - mean) < 1e-6 and abs(stats['std'] - std) < 1e-6
+
+    processed = [
+        {'route': route, 'origin': origin, 'destination': destination, 'airline': airline, 'price': price,
+         'departure_date': departure_date.strftime('%Y-%m-%d')}
+        for route, origin, destination, airline, price, departure_date, scraped_at in rows
+    ]
+    _, summary_seconds = timed(prepare_route_summary, processed)
+
+    print(f"{args.rows} rows, {len(grouped)} routes")
+    print(f"per-row route stats:        {per_row_seconds * 1000:8.1f} ms")
+    print(f"prepare_route_summary:      {summary_seconds * 1000:8.1f} ms")
+    print(f"columnar build (encode):    {build_seconds * 1000:8.1f} ms")
+    print(f"columnar group_stats:       {columnar_seconds * 1000:8.1f} ms "
+          f"({per_row_seconds / columnar_seconds:.1f}x faster than per-row)")
+
+    # End to end through data_processor, both backends on the same database
+    bench_app = benchmark_app(args.database_uri)
+    with bench_app.app_context():
+        ingest_flights(
+            [
+                {'route': route, 'origin': origin, 'destination': destination, 'airline': airline,
+                 'price': price, 'departure_date': departure_date, 'scraped_at': scraped_at}
+                for route, origin, destination, airline, price, departure_date, scraped_at in rows
+            ],
+            source_url='benchmark://columnar',
+            batch_size=10000
+        )
+        route = db.session.query(AirlineData).first().route
+
+        by_route = lambda routes: sorted(routes, key=lambda stats: stats['route'])
+        assert by_route(get_popular_routes(50, 'sql')) == by_route(get_popular_routes(50, 'numpy'))
+
+        for name, func, arg in [('get_route_statistics', get_route_statistics, route),
+                                ('get_popular_routes', get_popular_routes, 10)]:
+            sql_result, sql_seconds = timed(func, arg, 'sql')
+            numpy_result, numpy_seconds = timed(func, arg, 'numpy')
+            print(f"{name + ' sql:':<30}{sql_seconds * 1000:8.1f} ms")
+            print(f"{name + ' numpy:':<30}{numpy_seconds * 1000:8.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark flight extraction throughput (MB of page text per second): the old
+three-findall extract_flight_info_from_text against the single-scan engine in
+extraction.py, in-process and across a process pool.
+
+The corpus is read from --corpus (a directory of saved pages: .txt files are
+used as-is, .html files are run through trafilatura.extract first). When the
+directory is missing or empty, a synthetic corpus of travel-news style pages
+is generated and saved there.
+
+Run from the project root:
+    python -m benchmarks.bench_extraction --pages 2000 --corpus /tmp/flight-corpus
+"""
+
+from datetime import datetime, timedelta
+import argparse
+import os
+import random
+import re
+import time
+import trafilatura
+from extraction import AIRLINES, extract_many
+
+ROUTES = ['JFK', 'LAX', 'ORD', 'ATL', 'DFW', 'DEN', 'SFO', 'SEA', 'LAS', 'MCO', 'BOS', 'MIA']
+
+FILLER = (
+    "Travellers looking for a break this season have plenty of options, with carriers "
+    "adding capacity on leisure routes and airports reporting record passenger numbers. "
+)
+
+def legacy_extract(text, source_url):
+    """The previous extract_flight_info_from_text, kept for comparison"""
+    flight_data = []
+    price_pattern = r'\$(\d+(?:,\d{3})*(?:\.\d{2})?)'
+    route_pattern = r'([A-Z]{3})\s*(?:to|->|\-)\s*([A-Z]{3})'
+    airline_pattern = r'(United|American|Delta|Southwest|JetBlue|Alaska|Spirit|Frontier|Allegiant)'
+
+    prices = re.findall(price_pattern, text)
+    routes = re.findall(route_pattern, text)
+    airlines = re.findall(airline_pattern, text)
+
+    for i in range(min(len(prices), len(routes), 5)):
+        origin, destination = routes[i]
+        flight_data.append({
+            'route': f"{origin} → {destination}",
+            'origin': origin,
+            'destination': destination,
+            'price': float(prices[i].replace(',', '')),
+            'airline': airlines[i % len(airlines)] if airlines else 'Unknown',
+            'departure_date': datetime.now() + timedelta(days=random.randint(1, 90))
+        })
+    return flight_data
+
+def synthetic_page(rng, deals):
+    """A page of filler prose with `deals` fare mentions"""
+    parts = []
+    for _ in range(deals):
+        origin, destination = rng.sample(ROUTES, 2)
+        departure = datetime(2026, 1, 1) + timedelta(days=rng.randint(0, 364))
+        parts.append(FILLER * rng.randint(1, 4))
+        parts.append(
+            f"{rng.choice(AIRLINES)} has fares from {origin} to {destination} for "
+            f"${rng.randint(79, 1899):,}.{rng.randint(0, 99):02d} departing {departure:%B %d}. "
+        )
+    return ''.join(parts)
+
+def load_corpus(directory, pages, seed):
+    """Read saved pages from directory, generating and saving a corpus first if it is empty"""
+    os.makedirs(directory, exist_ok=True)
+    names = sorted(name for name in os.listdir(directory) if name.endswith(('.txt', '.html')))
+
+    if not names:
+        rng = random.Random(seed)
+        for index in range(pages):
+            with open(os.path.join(directory, f"page-{index:05d}.txt"), 'w', encoding='utf-8') as handle:
+                handle.write(synthetic_page(rng, rng.randint(3, 30)))
+        names = sorted(os.listdir(directory))
+
+    corpus = []
+    for name in names:
+        with open(os.path.join(directory, name), encoding='utf-8') as handle:
+            content = handle.read()
+        if name.endswith('.html'):
+            content = trafilatura.extract(content) or ''
+        corpus.append((content, f"file://{name}"))
+    return corpus
+
+def throughput(label, func, corpus, megabytes):
+    start = time.perf_counter()
+    results = func(corpus)
+    seconds = time.perf_counter() - start
+    flights = sum(len(page) for page in results)
+    print(f"{label:<28}{seconds:8.2f}s {megabytes / seconds:8.1f} MB/s {flights:9d} flights")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', default=os.path.join('/tmp', 'airline-extraction-corpus'))
+    parser.add_argument('--pages', type=int, default=2000, help='pages generated when the corpus is empty')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus, args.pages, args.seed)
+    megabytes = sum(len(text.encode('utf-8')) for text, _ in corpus) / (1024 * 1024)
+    print(f"{len(corpus)} pages, {megabytes:.1f} MB of text from {args.corpus}")
+
+    reference_date = datetime(2026, 1, 1)
+    throughput('legacy three-findall', lambda pages: [legacy_extract(text, url) for text, url in pages], corpus, megabytes)
+    serial = throughput('single scan', lambda pages: extract_many(pages, reference_date, processes=1), corpus, megabytes)
+    pooled = throughput(
+        f'single scan, {args.processes} processes',
+        lambda pages: extract_many(pages, reference_date, processes=args.processes, parallel_min_bytes=0),
+        corpus,
+        megabytes
+    )
+    assert serial == pooled
+
+if __name__ == '__main__':
+    main()
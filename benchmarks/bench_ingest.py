@@ -0,0 +1,51 @@
+"""
+Compare per-row ORM inserts (the old scraper path) with the batched Core
+ingestion path in ingest.py.
+
+Run from the project root:
+    python -m benchmarks.bench_ingest --rows 20000 --batch-size 1000
+"""
+
+import argparse
+import time
+from app import db
+from models import AirlineData
+from data_scraper import generate_sample_flight_data
+from ingest import ingest_flights, flight_rows
+from benchmarks.common import benchmark_app
+
+def make_flights(count):
+    flights = []
+    while len(flights) < count:
+        flights.extend(generate_sample_flight_data('Benchmark'))
+    return flights[:count]
+
+def orm_insert(flights):
+    """The previous scraper behaviour: one AirlineData object per row"""
+    start = time.perf_counter()
+    for row in flight_rows(flights, source_url='benchmark://orm'):
+        db.session.add(AirlineData(**row))
+    db.session.commit()
+    return len(flights) / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--database-uri', help='defaults to a temporary SQLite file')
+    args = parser.parse_args()
+
+    bench_app = benchmark_app(args.database_uri)
+    flights = make_flights(args.rows)
+
+    with bench_app.app_context():
+        orm_rows_per_sec = orm_insert(flights)
+        stats = ingest_flights(flights, source_url='benchmark://ingest', batch_size=args.batch_size)
+
+    print(f"{args.rows} rows")
+    print(f"ORM session.add:  {orm_rows_per_sec:,.0f} rows/sec")
+    print(f"Core executemany: {stats['rows_per_sec']:,.0f} rows/sec "
+          f"({stats['batches']} batches, {stats['rows_per_sec'] / orm_rows_per_sec:.1f}x faster)")
+
+if __name__ == '__main__':
+    main()
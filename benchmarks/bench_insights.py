@@ -0,0 +1,58 @@
+"""
+Benchmark insight generation against the local fake LLM client: the old
+one-after-another analysis calls versus analyze_market_trends running them
+concurrently, plus a run where one analysis misses the deadline.
+
+Run from the project root:
+    python -m benchmarks.bench_insights --latency 1.0
+"""
+
+import argparse
+import time
+import app
+from ai_analyzer import analyze_market_trends, analyze_popular_routes, analyze_price_trends, analyze_demand_patterns
+from data_scraper import generate_sample_flight_data
+from fake_llm import FakeChatClient
+
+def make_processed_data(count):
+    processed = []
+    while len(processed) < count:
+        for flight in generate_sample_flight_data('Benchmark'):
+            flight['departure_date'] = flight['departure_date'].strftime('%Y-%m-%d')
+            processed.append(flight)
+    return processed[:count]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency', type=float, default=1.0, help='fake model latency in seconds')
+    parser.add_argument('--rows', type=int, default=2000)
+    args = parser.parse_args()
+
+    data = make_processed_data(args.rows)
+    client = FakeChatClient(latency=args.latency)
+
+    start = time.perf_counter()
+    for analyze in (analyze_popular_routes, analyze_price_trends, analyze_demand_patterns):
+        analyze(data, client=client)
+    serial_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    insights = analyze_market_trends(data, client=client, deadline=args.latency * 5)
+    concurrent_seconds = time.perf_counter() - start
+
+    # The demand analysis is slow and misses the deadline; the other two are kept
+    slow_client = FakeChatClient(
+        latency=lambda messages: args.latency * 10 if 'demand analyst' in messages[0]['content'] else args.latency
+    )
+    start = time.perf_counter()
+    partial = analyze_market_trends(data, client=slow_client, deadline=args.latency * 2, max_retries=0)
+    partial_seconds = time.perf_counter() - start
+
+    print(f"fake model latency {args.latency:.2f}s")
+    print(f"serial:     {serial_seconds:.2f}s")
+    print(f"concurrent: {concurrent_seconds:.2f}s ({len(insights)} insights)")
+    print(f"deadline:   {partial_seconds:.2f}s with one slow analysis "
+          f"({len(partial)} insights kept: {', '.join(sorted(partial))})")
+
+if __name__ == '__main__':
+    main()
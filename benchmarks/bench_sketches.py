@@ -0,0 +1,154 @@
+"""
+Check the accuracy and cost of the streaming sketches in sketches.py against
+exact computation:
+
+- per-route t-digests of price vs numpy.percentile over the same prices:
+  rank error (how far the estimate's rank is from the requested quantile)
+  and relative value error at p50/p90/p99, build time, merge of per-chunk
+  digests, and stored size
+- HyperLogLog distinct counts vs exact counts at several cardinalities
+- /api/price-percentiles (stored digests) vs the exact percentiles computed
+  from all rows by the columnar engine, on a synthetic database
+
+Run from the project root:
+    python -m benchmarks.bench_sketches --rows 200000
+"""
+
+import argparse
+import statistics
+import time
+import numpy as np
+# app first: its startup (migrations, routes) imports the modules below
+import app
+from columnar import FlightColumns
+from sketches import TDigest, HyperLogLog, DEFAULT_QUANTILES, price_percentiles, quantile_label
+from benchmarks.common import benchmark_app, benchmark_client
+from benchmarks.datagen import FlightGenerator, load_synthetic_data
+
+# Groups smaller than this are skipped in the accuracy figures: with few
+# values every centroid is a single price and the digest is exact anyway
+MIN_GROUP_SIZE = 100
+
+HLL_CARDINALITIES = (10, 100, 1000, 10000, 100000, 1000000)
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def digest_errors(digest, sorted_prices, quantiles):
+    """Per quantile: (rank error, relative value error) of the digest against exact"""
+    errors = {}
+    for q in quantiles:
+        estimate = digest.quantile(q)
+        exact = float(np.quantile(sorted_prices, q))
+        # Fraction of prices below the estimate, halfway through any ties
+        low = np.searchsorted(sorted_prices, estimate, side='left')
+        high = np.searchsorted(sorted_prices, estimate, side='right')
+        rank = (low + high) / 2 / len(sorted_prices)
+        errors[q] = (abs(rank - q), abs(estimate - exact) / exact)
+    return errors
+
+def bench_digests(prices_by_route, quantiles, chunks):
+    groups = [prices for prices in prices_by_route.values() if len(prices) >= MIN_GROUP_SIZE]
+    digests = [TDigest() for _ in groups]
+    build_seconds = 0.0
+    for digest, prices in zip(digests, groups):
+        values = prices.tolist()
+        _, seconds = timed(lambda: digest.update(values) or digest.to_bytes())
+        build_seconds += seconds
+
+    sorted_groups, sort_seconds = timed(lambda: [np.sort(prices) for prices in groups])
+
+    # Merged digests, each built from `chunks` slices of the group
+    merged = []
+    for prices in groups:
+        digest = TDigest()
+        for part in np.array_split(prices, chunks):
+            piece = TDigest()
+            piece.update(part.tolist())
+            digest.merge(piece)
+        merged.append(digest)
+
+    print(f"t-digest over {len(groups)} routes with >= {MIN_GROUP_SIZE} prices "
+          f"({sum(len(prices) for prices in groups)} values)")
+    print(f"build (update):             {build_seconds * 1000:8.1f} ms")
+    print(f"exact (numpy sort):         {sort_seconds * 1000:8.1f} ms")
+    sizes = [len(digest.to_bytes()) for digest in digests]
+    centroids = [len(digest.means) for digest in digests]
+    print(f"stored size:                {statistics.median(sizes):8.0f} bytes median, {max(sizes)} max "
+          f"({max(centroids)} centroids max)")
+
+    for name, sketches in (('single digest', digests), (f'merged from {chunks}', merged)):
+        errors = [digest_errors(digest, prices, quantiles) for digest, prices in zip(sketches, sorted_groups)]
+        for q in quantiles:
+            rank_errors = [error[q][0] for error in errors]
+            value_errors = [error[q][1] for error in errors]
+            print(f"{name + ' ' + quantile_label(q) + ':':<27}rank error {statistics.median(rank_errors) * 100:.3f}% "
+                  f"median, {max(rank_errors) * 100:.3f}% max; value error "
+                  f"{statistics.median(value_errors) * 100:.3f}% median, {max(value_errors) * 100:.3f}% max")
+
+def bench_hll(seed):
+    print("HyperLogLog distinct counts")
+    rng = np.random.default_rng(seed)
+    for cardinality in HLL_CARDINALITIES:
+        values = rng.integers(0, 2 ** 62, size=cardinality).tolist()
+        exact = len(set(values))
+        sketch = HyperLogLog()
+        _, seconds = timed(sketch.update, values)
+        estimate = sketch.estimate()
+        print(f"{exact:>10} distinct:        estimate {estimate:>10}  error {abs(estimate - exact) / exact * 100:6.2f}%  "
+              f"({seconds * 1000:.1f} ms, {len(sketch.to_bytes())} bytes)")
+
+def bench_endpoint(rows, seed, quantiles, database_uri):
+    bench_app = benchmark_app(database_uri)
+    client = benchmark_client(bench_app)
+    with bench_app.app_context():
+        load_synthetic_data(rows, seed=seed)
+
+        def exact_percentiles():
+            return FlightColumns.load().group_stats('route', percentiles=[q * 100 for q in quantiles])
+
+        exact, exact_seconds = timed(exact_percentiles)
+        estimated, sketch_seconds = timed(price_percentiles, 'route', None, quantiles)
+        query = ','.join(f"{q * 100:g}" for q in quantiles)
+        response, endpoint_seconds = timed(client.get, f'/api/price-percentiles?q={query}')
+        assert response.status_code == 200
+
+        exact_by_route = {stats['route']: stats for stats in exact}
+        print(f"{rows} rows in the database, {len(estimated)} routes")
+        print(f"exact (columnar load + sort): {exact_seconds * 1000:8.1f} ms")
+        print(f"stored digests:               {sketch_seconds * 1000:8.1f} ms "
+              f"({exact_seconds / sketch_seconds:.0f}x faster)")
+        print(f"GET /api/price-percentiles:   {endpoint_seconds * 1000:8.1f} ms")
+        for q in quantiles:
+            errors = [
+                abs(result['percentiles'][quantile_label(q)] - exact_by_route[result['route']][f'p{q * 100:g}'])
+                / exact_by_route[result['route']][f'p{q * 100:g}']
+                for result in estimated if result['count'] >= MIN_GROUP_SIZE
+            ]
+            print(f"{quantile_label(q) + ' value error:':<30}{statistics.median(errors) * 100:.3f}% median, "
+                  f"{max(errors) * 100:.3f}% max")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunks', type=int, default=10, help='slices merged for the merged-digest figures')
+    parser.add_argument('--database-uri', help='defaults to a temporary SQLite file')
+    args = parser.parse_args()
+
+    columns = FlightGenerator(seed=args.seed).chunk(args.rows)
+    order = np.argsort(columns['route_index'], kind='stable')
+    route_index, prices = columns['route_index'][order], columns['price'][order]
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(route_index)) + 1))
+    prices_by_route = {int(route_index[start]): part for start, part in zip(starts, np.split(prices, starts[1:]))}
+
+    bench_digests(prices_by_route, DEFAULT_QUANTILES, args.chunks)
+    print()
+    bench_hll(args.seed)
+    print()
+    bench_endpoint(args.rows, args.seed, DEFAULT_QUANTILES, args.database_uri)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Measure Server-Sent Events fan-out with many subscribers on one process:
+memory per subscriber, CPU used while every subscriber sits idle (heartbeats
+only), and the time from publishing an event until the last subscriber has
+it. Subscribers are gevent greenlets, as under the gevent Gunicorn workers
+(see gunicorn.conf.py); pass --threads to use one OS thread each instead,
+as under the threaded development server.
+
+Run from the project root:
+    python -m benchmarks.bench_sse --subscribers 5000
+"""
+
+import sys
+
+# Must happen before anything imports threading (see the module docstring)
+if '--threads' not in sys.argv:
+    from gevent import monkey
+    monkey.patch_all()
+
+import argparse
+import resource
+import statistics
+import threading
+import time
+from sse import EventBroadcaster
+
+received_lock = threading.Lock()
+
+def subscribe(broadcaster, heartbeat, received, ready):
+    """One subscriber: read the stream until the 'stop' event, noting when each event arrived"""
+    stream = broadcaster.stream(heartbeat=heartbeat)
+    try:
+        next(stream)
+        ready.release()
+        for chunk in stream:
+            now = time.perf_counter()
+            for line in chunk.split('\n'):
+                if line.startswith('id: '):
+                    with received_lock:
+                        delivery = received.setdefault(int(line[4:]), [0, 0.0])
+                        delivery[0] += 1
+                        delivery[1] = max(delivery[1], now)
+            if 'event: stop' in chunk:
+                return
+    finally:
+        stream.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--subscribers', type=int, default=2000)
+    parser.add_argument('--events', type=int, default=20)
+    parser.add_argument('--interval', type=float, default=0.2, help='seconds between published events')
+    parser.add_argument('--idle-seconds', type=float, default=5)
+    parser.add_argument('--heartbeat', type=float, default=15)
+    parser.add_argument('--threads', action='store_true', help='one OS thread per subscriber instead of gevent')
+    args = parser.parse_args()
+
+    if args.threads:
+        threading.stack_size(256 * 1024)
+
+    broadcaster = EventBroadcaster()
+    received = {}
+    ready = threading.Semaphore(0)
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    subscribers = [
+        threading.Thread(target=subscribe, args=(broadcaster, args.heartbeat, received, ready), daemon=True)
+        for _ in range(args.subscribers)
+    ]
+    for subscriber in subscribers:
+        subscriber.start()
+    for _ in subscribers:
+        ready.acquire()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    cpu_start = time.process_time()
+    time.sleep(args.idle_seconds)
+    idle_cpu = time.process_time() - cpu_start
+
+    published = {}
+    payload = {'version': 1, 'new_records': 1000, 'routes': [{'route': 'JFK → LAX', 'count': 40}] * 10}
+    for _ in range(args.events):
+        start = time.perf_counter()
+        event_id = broadcaster.publish('flights', payload)
+        published[event_id] = (start, time.perf_counter() - start)
+        time.sleep(args.interval)
+    broadcaster.publish('stop', {})
+
+    for subscriber in subscribers:
+        subscriber.join()
+
+    fan_out = [received[event_id][1] - start for event_id, (start, _) in published.items()]
+    complete = sum(1 for event_id in published if received.get(event_id, [0])[0] == args.subscribers)
+    publish_cost = [seconds for _, seconds in published.values()]
+
+    print(f"{args.subscribers} subscribers ({'threads' if args.threads else 'gevent'})")
+    print(f"memory:            {(rss_after - rss_before) / args.subscribers:8.1f} KB per subscriber")
+    print(f"idle CPU:          {idle_cpu / args.idle_seconds * 100:8.2f} % over {args.idle_seconds:.0f}s "
+          f"(heartbeat every {args.heartbeat:.0f}s)")
+    print(f"publish call:      {statistics.median(publish_cost) * 1000:8.3f} ms median")
+    print(f"fan-out latency:   {statistics.median(fan_out) * 1000:8.1f} ms median, "
+          f"{max(fan_out) * 1000:.1f} ms max (publish to last subscriber)")
+    print(f"delivered to all:  {complete}/{len(published)} events")
+
+if __name__ == '__main__':
+    main()
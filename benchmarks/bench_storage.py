@@ -0,0 +1,115 @@
+"""
+Measure dashboard read latency while a scrape-sized write is in progress,
+with SQLite in its default rollback-journal mode (reads share the writer's
+connection pool) and with the tuned storage settings from storage.py (WAL,
+synchronous=NORMAL, mmap, reads on read-only connections).
+
+A separate process keeps ingesting batches of synthetic flights, one
+transaction per batch, while this process times GET-request reads.
+
+Run from the project root:
+    python -m benchmarks.bench_storage --rows 200000 --seconds 10
+"""
+
+from datetime import datetime, timedelta
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from app import db
+from models import AirlineData
+from data_processor import get_popular_routes
+from ingest import ingest_flights
+from benchmarks.common import benchmark_app
+from benchmarks.datagen import FlightGenerator, column_dicts, load_synthetic_data
+
+CONFIGURATIONS = {
+    'rollback journal': {
+        'SQLITE_JOURNAL_MODE': 'DELETE',
+        'SQLITE_SYNCHRONOUS': 'FULL',
+        'SQLITE_MMAP_SIZE': 0,
+        'DB_READ_ROUTING': False
+    },
+    'tuned (WAL + read-only reads)': {}
+}
+
+def write_continuously(database_uri, config, batch_size, stop, ready):
+    """Writer process: ingest batch after batch until told to stop"""
+    bench_app = benchmark_app(database_uri, **config)
+    generator = FlightGenerator(seed=7)
+    with bench_app.app_context():
+        ready.set()
+        while not stop.is_set():
+            ingest_flights(column_dicts(generator.chunk(batch_size)), batch_size=batch_size)
+
+def read_once():
+    """The dashboard's reads: popular routes and the 7-day record count"""
+    get_popular_routes(limit=10)
+    db.session.query(AirlineData.id).filter(AirlineData.scraped_at >= datetime.utcnow() - timedelta(days=7)).count()
+    db.session.commit()
+
+def time_reads(bench_app, seconds):
+    """Read latencies in milliseconds over `seconds`, inside a GET request context"""
+    latencies = []
+    deadline = time.monotonic() + seconds
+    with bench_app.test_request_context('/', method='GET'):
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            read_once()
+            latencies.append((time.perf_counter() - start) * 1000)
+        db.session.remove()
+    return latencies
+
+def describe(latencies):
+    ordered = sorted(latencies)
+    return (f"{len(ordered):>6} reads  p50 {statistics.median(ordered):8.2f} ms  "
+            f"p99 {ordered[int(len(ordered) * 0.99) - 1]:8.2f} ms  max {ordered[-1]:8.2f} ms")
+
+def run_configuration(name, config, args):
+    handle, path = tempfile.mkstemp(prefix='airline-storage-', suffix='.db')
+    os.close(handle)
+    database_uri = f"sqlite:///{path}"
+
+    bench_app = benchmark_app(database_uri, **config)
+    with bench_app.app_context():
+        load_synthetic_data(args.rows, seed=args.seed)
+        db.session.remove()
+
+    idle = time_reads(bench_app, args.seconds / 2)
+
+    stop = multiprocessing.Event()
+    ready = multiprocessing.Event()
+    writer = multiprocessing.Process(
+        target=write_continuously, args=(database_uri, config, args.batch_size, stop, ready)
+    )
+    writer.start()
+    ready.wait()
+    try:
+        busy = time_reads(bench_app, args.seconds)
+    finally:
+        stop.set()
+        writer.join()
+
+    print(name)
+    print(f"  idle:          {describe(idle)}")
+    print(f"  during writes: {describe(busy)}")
+
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--batch-size', type=int, default=5000, help='rows per write transaction')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    for name, config in CONFIGURATIONS.items():
+        run_configuration(name, config, args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Shared helpers for the benchmark scripts
+"""
+
+from flask import Flask
+import os
+import tempfile
+from app import app, db
+from storage import engine_options, init_storage
+
+def benchmark_app(database_uri=None, **config):
+    """
+    Create a throwaway Flask app bound to its own database, so benchmarks
+    never write into the application's data. Defaults to a temporary SQLite file.
+    The database is set up like the application's (see storage.py); keyword
+    arguments override its config, e.g. SQLITE_JOURNAL_MODE='DELETE'.
+    """
+    if database_uri is None:
+        handle, path = tempfile.mkstemp(prefix='airline-bench-', suffix='.db')
+        os.close(handle)
+        database_uri = f"sqlite:///{path}"
+
+    bench_app = Flask('benchmarks')
+    bench_app.config.update(app.config)
+    bench_app.config.update(config)
+    bench_app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    bench_app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(bench_app.config)
+    db.init_app(bench_app)
+    init_storage(bench_app, db)
+
+    with bench_app.app_context():
+        db.create_all()
+
+    return bench_app
+
+def benchmark_client(bench_app):
+    """
+    Test client for the application's routes served against bench_app's
+    database: the main app's URL rules are registered on bench_app
+    """
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint != 'static' and rule.endpoint not in bench_app.view_functions:
+            bench_app.add_url_rule(rule.rule, rule.endpoint, app.view_functions[rule.endpoint], methods=rule.methods)
+
+    bench_app.root_path = app.root_path
+    bench_app.template_folder = app.template_folder
+    bench_app.secret_key = app.secret_key
+    return bench_app.test_client()
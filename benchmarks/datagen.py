@@ -0,0 +1,241 @@
+"""
+Deterministic synthetic airline data at production scale. A seeded NumPy
+generator produces rows chunk by chunk as columns, which are bulk-inserted
+with indexes dropped during the load; the rollups are rebuilt once at the end
+instead of row by row.
+
+Distributions:
+- routes between ~60 US airports, with Zipf-like popularity (a few trunk
+  routes carry most bookings) and a per-route base fare
+- airlines weighted by market share, each with a price factor
+- scraped_at spread over the `days` days before the reference time (default:
+  today, midnight UTC), with volume growing towards the present
+- departure_date a gamma-distributed lead time (mean about 5 weeks) after
+  scraped_at
+- price = base fare x airline factor x lead-time and seasonal effects x
+  log-normal noise
+
+Run from the project root:
+    python -m benchmarks.datagen --rows 1000000 --database-uri sqlite:////tmp/airline-1m.db
+"""
+
+from datetime import datetime
+import argparse
+import time
+import numpy as np
+from app import db
+from models import AirlineData, Airport, Airline, Route, Source
+from rollups import rebuild_rollups
+from sketches import rebuild_sketches
+from dimensions import dimension_cache
+from sqlalchemy import insert
+from benchmarks.common import benchmark_app
+
+AIRPORTS = [
+    'ATL', 'LAX', 'ORD', 'DFW', 'DEN', 'JFK', 'SFO', 'SEA', 'LAS', 'MCO', 'EWR', 'CLT', 'PHX', 'IAH', 'MIA',
+    'BOS', 'MSP', 'FLL', 'DTW', 'PHL', 'LGA', 'BWI', 'SLC', 'SAN', 'IAD', 'DCA', 'MDW', 'TPA', 'PDX', 'HNL',
+    'BNA', 'AUS', 'DAL', 'STL', 'HOU', 'SJC', 'OAK', 'MSY', 'RDU', 'SMF', 'SNA', 'MCI', 'SAT', 'RSW', 'CLE',
+    'IND', 'PIT', 'CMH', 'CVG', 'JAX', 'OGG', 'BDL', 'ANC', 'ABQ', 'MKE', 'ONT', 'BUR', 'OMA', 'BOI', 'RNO'
+]
+
+# (name, market share, price factor)
+AIRLINES = [
+    ('American', 0.18, 1.05), ('Delta', 0.17, 1.10), ('United', 0.16, 1.08), ('Southwest', 0.17, 0.90),
+    ('JetBlue', 0.06, 0.95), ('Alaska', 0.06, 1.00), ('Spirit', 0.05, 0.70), ('Frontier', 0.04, 0.72),
+    ('Allegiant', 0.03, 0.75), ('Hawaiian', 0.02, 1.15), ('Sun Country', 0.02, 0.80), ('Breeze', 0.04, 0.78)
+]
+
+DEFAULT_ROUTES = 1500
+DEFAULT_DAYS = 365
+DEFAULT_CHUNK_SIZE = 100000
+
+class FlightGenerator:
+    """
+    Seeded generator of airline_data rows; the same seed and reference time
+    (`now`) always yield the same rows
+    """
+
+    def __init__(self, seed=42, route_count=DEFAULT_ROUTES, days=DEFAULT_DAYS, now=None):
+        self.rng = np.random.default_rng(seed)
+        self.days = days
+        self.now = now or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+        # Distinct (origin, destination) pairs, most popular first
+        pairs = set()
+        while len(pairs) < min(route_count, len(AIRPORTS) * (len(AIRPORTS) - 1)):
+            origin, destination = self.rng.choice(len(AIRPORTS), size=2, replace=False)
+            pairs.add((int(origin), int(destination)))
+        pairs = sorted(pairs)
+        self.rng.shuffle(pairs)
+
+        self.origins = np.array([AIRPORTS[origin] for origin, _ in pairs], dtype=object)
+        self.destinations = np.array([AIRPORTS[destination] for _, destination in pairs], dtype=object)
+        self.routes = np.array([f"{AIRPORTS[o]} → {AIRPORTS[d]}" for o, d in pairs], dtype=object)
+        popularity = 1.0 / np.arange(1, len(pairs) + 1) ** 1.1
+        self.route_weights = popularity / popularity.sum()
+        self.route_fares = self.rng.lognormal(mean=np.log(260), sigma=0.45, size=len(pairs))
+
+        self.airlines = np.array([name for name, _, _ in AIRLINES], dtype=object)
+        shares = np.array([share for _, share, _ in AIRLINES])
+        self.airline_weights = shares / shares.sum()
+        self.airline_factors = np.array([factor for _, _, factor in AIRLINES])
+
+    def chunk(self, count):
+        """Generate `count` rows as a dict of NumPy columns keyed by airline_data column name"""
+        rng = self.rng
+        route_index = rng.choice(len(self.routes), size=count, p=self.route_weights)
+        airline_index = rng.choice(len(self.airlines), size=count, p=self.airline_weights)
+
+        # More data for recent days: sqrt of a uniform skews towards the present
+        age_seconds = (1 - np.sqrt(rng.random(count))) * self.days * 86400
+        scraped_offsets = (-age_seconds).astype('timedelta64[s]')
+        scraped_at = np.datetime64(self.now, 's') + scraped_offsets
+
+        lead_days = np.clip(rng.gamma(shape=2.0, scale=17.5, size=count), 1, 330).astype(np.int64)
+        departure_day = scraped_at.astype('datetime64[D]') + lead_days.astype('timedelta64[D]')
+
+        months = departure_day.astype('datetime64[M]').astype(np.int64) % 12
+        seasonal = 1 + 0.15 * np.cos((months - 6) * np.pi / 6)  # summer peak
+        lead_effect = 1 + 0.6 * np.exp(-lead_days / 10.0)  # last-minute fares
+        noise = rng.lognormal(mean=0, sigma=0.12, size=count)
+        prices = np.round(
+            self.route_fares[route_index] * self.airline_factors[airline_index] * seasonal * lead_effect * noise, 2
+        )
+
+        return {
+            'route_index': route_index,
+            'airline_index': airline_index,
+            'route': self.routes[route_index],
+            'origin': self.origins[route_index],
+            'destination': self.destinations[route_index],
+            'price': prices,
+            'airline': self.airlines[airline_index],
+            'departure_date': departure_day.astype('datetime64[us]'),
+            'scraped_at': scraped_at.astype('datetime64[us]')
+        }
+
+FLIGHT_COLUMNS = ('route', 'origin', 'destination', 'price', 'airline', 'departure_date', 'scraped_at')
+ROW_COLUMNS = ('route_id', 'airline_id', 'price', 'departure_date', 'scraped_at')
+SOURCE_URL = 'benchmark://synthetic'
+
+def column_dicts(columns):
+    """Generated columns as flight dicts (labels, not ids), as ingest.ingest_flights takes them"""
+    values = [columns[name].astype(object) if name in ('departure_date', 'scraped_at') else columns[name].tolist()
+              for name in FLIGHT_COLUMNS]
+    return [dict(zip(FLIGHT_COLUMNS, row), source_url=SOURCE_URL) for row in zip(*values)]
+
+def register_dimensions(generator):
+    """
+    Insert the generator's airports, airlines, routes and source into the
+    dimension tables. Returns (route ids aligned with generator.routes,
+    airline ids aligned with generator.airlines, source id)
+    """
+    airports = dimension_cache.ids(db.session, Airport, 'code', {code: {} for code in AIRPORTS})
+    routes = dimension_cache.ids(db.session, Route, 'name', {
+        route: {'origin_id': airports[origin], 'destination_id': airports[destination]}
+        for route, origin, destination in zip(generator.routes, generator.origins, generator.destinations)
+    })
+    airlines = dimension_cache.ids(db.session, Airline, 'name', {name: {} for name in generator.airlines})
+    source_id = dimension_cache.ids(db.session, Source, 'url', {SOURCE_URL: {}})[SOURCE_URL]
+    db.session.commit()
+
+    return (
+        np.array([routes[route] for route in generator.routes], dtype=np.int64),
+        np.array([airlines[name] for name in generator.airlines], dtype=np.int64),
+        source_id
+    )
+
+def fact_columns(columns, route_ids, airline_ids):
+    """Generated columns mapped onto airline_data's id columns"""
+    return dict(
+        columns,
+        route_id=route_ids[columns['route_index']],
+        airline_id=airline_ids[columns['airline_index']]
+    )
+
+def column_tuples_sqlite(columns, source_id):
+    """
+    Fact columns (see fact_columns) as positional tuples with timestamps
+    already formatted the way SQLAlchemy stores them in SQLite, skipping
+    per-value bind processing
+    """
+    values = []
+    for name in ROW_COLUMNS:
+        column = columns[name]
+        if name in ('departure_date', 'scraped_at'):
+            column = np.char.replace(np.datetime_as_string(column, unit='us'), 'T', ' ')
+        values.append(column.tolist())
+    return [row + (source_id,) for row in zip(*values)]
+
+def fact_dicts(columns, source_id):
+    """Fact columns as airline_data row dicts, for Core executemany"""
+    values = [columns[name].astype(object) if name in ('departure_date', 'scraped_at') else columns[name].tolist()
+              for name in ROW_COLUMNS]
+    return [dict(zip(ROW_COLUMNS, row), source_id=source_id) for row in zip(*values)]
+
+def load_synthetic_data(rows, seed=42, chunk_size=DEFAULT_CHUNK_SIZE, **options):
+    """
+    Bulk-insert `rows` generated rows into the current app's database and
+    rebuild the rollups and sketches. The generator's labels are registered in the
+    dimension tables first, so rows are written with their ids directly.
+    When airline_data starts empty its indexes are dropped for the load and
+    rebuilt afterwards, which is much faster than maintaining them row by
+    row. On SQLite rows go straight to the driver.
+    Returns a dict with rows, seconds and rows_per_sec
+    """
+    table = AirlineData.__table__
+    start = time.perf_counter()
+
+    generator = FlightGenerator(seed=seed, **options)
+    route_ids, airline_ids, source_id = register_dimensions(generator)
+
+    fresh = db.session.query(AirlineData.id).first() is None
+    if fresh:
+        for index in table.indexes:
+            index.drop(bind=db.engine)
+
+    if db.engine.dialect.name == 'sqlite':
+        names = ROW_COLUMNS + ('source_id',)
+        statement = f"INSERT INTO {table.name} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+
+    try:
+        for offset in range(0, rows, chunk_size):
+            columns = fact_columns(generator.chunk(min(chunk_size, rows - offset)), route_ids, airline_ids)
+            connection = db.session.connection()
+            if db.engine.dialect.name == 'sqlite':
+                connection.exec_driver_sql(statement, column_tuples_sqlite(columns, source_id))
+            else:
+                connection.execute(insert(table), fact_dicts(columns, source_id))
+            db.session.commit()
+    finally:
+        if fresh:
+            for index in table.indexes:
+                index.create(bind=db.engine)
+
+    rebuild_rollups()
+    rebuild_sketches()
+    seconds = time.perf_counter() - start
+
+    return {'rows': rows, 'seconds': round(seconds, 2), 'rows_per_sec': round(rows / seconds, 1) if seconds else 0.0}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--routes', type=int, default=DEFAULT_ROUTES)
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--now', type=datetime.fromisoformat, help='reference time, YYYY-MM-DD (default: today)')
+    parser.add_argument('--database-uri', help='defaults to a temporary SQLite file')
+    args = parser.parse_args()
+
+    bench_app = benchmark_app(args.database_uri)
+    with bench_app.app_context():
+        result = load_synthetic_data(
+            args.rows, seed=args.seed, chunk_size=args.chunk_size, route_count=args.routes, days=args.days, now=args.now
+        )
+        print(f"Loaded {result['rows']} rows in {result['seconds']}s ({result['rows_per_sec']:.0f} rows/sec) "
+              f"into {bench_app.config['SQLALCHEMY_DATABASE_URI']}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+"""
+Time every data_processor function and the main routes against synthetic
+databases of several sizes (see benchmarks/datagen.py), write the results as
+JSON and check them for regressions.
+
+Each benchmark is run once to warm up and then --repeat times; the median
+is what gets compared. Regressions are reported, and the exit status is 1,
+when a median is more than --tolerance times the median recorded in an
+earlier results file (--baseline) or, with --thresholds, exceeds its limit
+in a thresholds file (benchmark name -> {size: max milliseconds}). Absolute
+limits only mean something on the hardware they were measured on, so
+--write-thresholds records this run's medians times --headroom as the
+limits for later runs on the same machine.
+
+Run from the project root:
+    python -m benchmarks.run_benchmarks --sizes 10000,100000,1000000 --output results.json
+    python -m benchmarks.run_benchmarks --baseline results.json --tolerance 1.25
+    python -m benchmarks.run_benchmarks --write-thresholds ci-thresholds.json --headroom 3
+    python -m benchmarks.run_benchmarks --thresholds ci-thresholds.json
+"""
+
+import os
+
+# Insight generation is benchmarked against the offline fake model with no
+# latency, so only the application's own work is measured
+os.environ.setdefault('LLM_CLIENT', 'fake')
+os.environ.setdefault('FAKE_LLM_LATENCY', '0')
+
+from datetime import datetime, timedelta
+import argparse
+import json
+import math
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from app import db
+from models import AirlineData
+from ai_analyzer import generate_and_store_insights
+from columnar import FlightColumns
+from data_processor import (get_popular_routes, get_price_trends, get_airline_performance, get_demand_by_month,
+                            get_route_statistics, get_price_alerts, summarize_airline_data)
+from routes import chart_cache, dashboard_cache, insights_page_cache, price_alert_engine
+from benchmarks.common import benchmark_app, benchmark_client
+from benchmarks.datagen import load_synthetic_data
+
+DEFAULT_SIZES = '10000,100000,1000000'
+DEFAULT_HEADROOM = 3.0
+
+# Written limits are never below this many milliseconds: timings of a few
+# milliseconds vary by more than any sensible headroom between runs
+MIN_THRESHOLD_MS = 10
+
+def data_processor_benchmarks(route):
+    """(name, callable) pairs for the data_processor functions"""
+    return [
+        # Loading the numpy backend's snapshot; the [numpy] benchmarks below
+        # reuse the snapshot, as the application does between writes
+        ('FlightColumns.load', FlightColumns.load),
+        ('get_popular_routes[sql]', lambda: get_popular_routes(10, 'sql')),
+        ('get_popular_routes[numpy]', lambda: get_popular_routes(10, 'numpy')),
+        ('get_price_trends', lambda: get_price_trends(30)),
+        ('get_airline_performance[sql]', lambda: get_airline_performance('sql')),
+        ('get_airline_performance[numpy]', lambda: get_airline_performance('numpy')),
+        ('get_demand_by_month', get_demand_by_month),
+        ('get_route_statistics[sql]', lambda: get_route_statistics(route, 'sql')),
+        ('get_route_statistics[numpy]', lambda: get_route_statistics(route, 'numpy')),
+        ('get_price_alerts', get_price_alerts),
+        ('summarize_airline_data[30d]', lambda: summarize_airline_data(
+            AirlineData.scraped_at >= datetime.utcnow() - timedelta(days=30)
+        ))
+    ]
+
+# HTML pages and the template each one renders
+PAGE_TEMPLATES = (('/', 'index.html'), ('/insights', 'insights.html'))
+
+def route_benchmarks(client):
+    """(name, callable) pairs requesting the routes; responses are read in full"""
+
+    def get(path, cached=False):
+        def request():
+            if not cached:
+                chart_cache.clear()
+                dashboard_cache.invalidate()
+                insights_page_cache.invalidate()
+            response = client.get(path)
+            response.get_data()
+            if response.status_code >= 400:
+                raise RuntimeError(f"{path} returned {response.status_code}")
+        return request
+
+    # The HTML pages are only timed where their templates are checked out;
+    # without them every request is a 500 and there is nothing to measure
+    templates = set(client.application.jinja_env.list_templates())
+    pages = []
+    for path, template in PAGE_TEMPLATES:
+        if template in templates:
+            pages += [(f'GET {path}', get(path)), (f'GET {path} (cached)', get(path, cached=True))]
+
+    return pages + [
+        ('GET /api/chart-data/popular_routes', get('/api/chart-data/popular_routes')),
+        ('GET /api/chart-data/price_trends', get('/api/chart-data/price_trends')),
+        ('GET /api/chart-data/demand_by_month', get('/api/chart-data/demand_by_month')),
+        ('GET /api/chart-data/popular_routes (cached)', get('/api/chart-data/popular_routes', cached=True)),
+        # Reseeding the incremental alert windows from the rollups, then
+        # serving alerts from them
+        ('price alert engine resync', price_alert_engine.sync),
+        ('GET /api/price-alerts', get('/api/price-alerts')),
+        # Percentiles from the stored t-digests, no flight rows read
+        ('GET /api/price-percentiles', get('/api/price-percentiles')),
+        ('GET /api/price-percentiles?by=airline', get('/api/price-percentiles?by=airline')),
+        ('GET /api/filter-data?origin=JFK', get('/api/filter-data?origin=JFK')),
+        ('GET /api/filter-data?airline=Delta&limit=1000', get('/api/filter-data?airline=Delta&limit=1000')),
+        ('GET /api/filter-data?origin=JFK&format=ndjson', get('/api/filter-data?origin=JFK&format=ndjson')),
+        # /generate-insights only queues a job; this is the job's work
+        ('generate-insights job', lambda: generate_and_store_insights(cache=None))
+    ]
+
+def time_benchmark(func, repeat):
+    """Run func once to warm up, then `repeat` times; timings in milliseconds"""
+    try:
+        func()
+        runs = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            runs.append((time.perf_counter() - start) * 1000)
+    except Exception as e:
+        db.session.rollback()
+        return {'error': str(e)}
+
+    return {
+        'median_ms': round(statistics.median(runs), 3),
+        'min_ms': round(min(runs), 3),
+        'max_ms': round(max(runs), 3),
+        'runs_ms': [round(run, 3) for run in runs]
+    }
+
+def run_size(size, args):
+    """Load `size` synthetic rows into a fresh database and time every benchmark"""
+    database_uri = None
+    if args.database_dir:
+        path = os.path.join(args.database_dir, f"airline-bench-{size}.db")
+        if os.path.exists(path):
+            os.remove(path)
+        database_uri = f"sqlite:///{path}"
+
+    bench_app = benchmark_app(database_uri)
+    client = benchmark_client(bench_app)
+    results = {}
+
+    with bench_app.app_context():
+        load = load_synthetic_data(size, seed=args.seed)
+        print(f"[{size}] loaded in {load['seconds']}s ({load['rows_per_sec']:.0f} rows/sec)", file=sys.stderr)
+
+        route = db.session.query(AirlineData).order_by(AirlineData.id).first().route
+        for name, func in data_processor_benchmarks(route) + route_benchmarks(client):
+            results[name] = time_benchmark(func, args.repeat)
+            summary = results[name].get('median_ms', results[name].get('error'))
+            print(f"[{size}] {name:<50} {summary}", file=sys.stderr)
+
+        db.session.remove()
+        path = db.engine.url.database
+
+    if not args.database_dir and path:
+        os.remove(path)
+
+    return {'load': load, 'benchmarks': results}
+
+def find_regressions(results, thresholds, baseline=None, tolerance=1.25):
+    """List of human-readable regression messages"""
+    regressions = []
+
+    for size, size_results in results.items():
+        for name, timing in size_results['benchmarks'].items():
+            median = timing.get('median_ms')
+            if median is None:
+                continue
+
+            limit = thresholds.get(name, {}).get(size)
+            if limit is not None and median > limit:
+                regressions.append(f"{name} at {size} rows: {median:.1f} ms exceeds the {limit} ms threshold")
+
+            previous = (baseline or {}).get(size, {}).get('benchmarks', {}).get(name, {}).get('median_ms')
+            if previous and median > previous * tolerance:
+                regressions.append(
+                    f"{name} at {size} rows: {median:.1f} ms is {median / previous:.2f}x the baseline {previous:.1f} ms"
+                )
+
+    return regressions
+
+def thresholds_from_results(results, headroom=DEFAULT_HEADROOM):
+    """Limits of `headroom` times each measured median, rounded up to 2 significant figures"""
+    thresholds = {}
+    for size, size_results in results.items():
+        for name, timing in size_results['benchmarks'].items():
+            median = timing.get('median_ms')
+            if median is None:
+                continue
+            limit = max(median * headroom, MIN_THRESHOLD_MS)
+            scale = 10 ** max(int(math.floor(math.log10(limit))) - 1, 0)
+            thresholds.setdefault(name, {})[size] = int(math.ceil(limit / scale) * scale)
+    return thresholds
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='comma-separated row counts')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write JSON results to this file (default: stdout)')
+    parser.add_argument('--thresholds', help='check medians against the limits in this file')
+    parser.add_argument('--write-thresholds', help='write limits derived from this run to this file')
+    parser.add_argument('--headroom', type=float, default=DEFAULT_HEADROOM,
+                        help='limits written are this many times the measured medians')
+    parser.add_argument('--baseline', help='earlier results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=1.25, help='allowed slowdown relative to --baseline')
+    parser.add_argument('--database-dir', help='keep the generated SQLite databases here (default: temporary files)')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = {str(size): run_size(size, args) for size in sizes}
+
+    thresholds = {}
+    if args.thresholds:
+        with open(args.thresholds) as handle:
+            thresholds = json.load(handle)
+
+    if args.write_thresholds:
+        with open(args.write_thresholds, 'w') as handle:
+            handle.write(json.dumps(thresholds_from_results(results, args.headroom), indent=2) + '\n')
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)['results']
+
+    regressions = find_regressions(results, thresholds, baseline, args.tolerance)
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'generated_at': datetime.utcnow().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'repeat': args.repeat
+        },
+        'results': results,
+        'regressions': regressions
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output + '\n')
+    else:
+        print(output)
+
+    for regression in regressions:
+        print(f"REGRESSION: {regression}", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
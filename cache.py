@@ -0,0 +1,144 @@
+from collections import OrderedDict
+import logging
+import threading
+import time
+
+class ResponseCache:
+    """
+    Thread-safe in-memory LRU cache with hit/miss/eviction counters.
+    Callers include the data version in the key, so entries built from old
+    data are never served and simply age out of the LRU. The optional ttl
+    bounds staleness for writes made by other processes, which do not move
+    this process's data version.
+    """
+
+    def __init__(self, max_entries=256, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or time.monotonic() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entries when full"""
+        with self._lock:
+            expires_at = time.monotonic() + self.ttl if self.ttl else None
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Counters for monitoring the cache's effectiveness"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+class SnapshotCache:
+    """
+    Holds one precomputed value (such as a page's figures) in memory. It is
+    dropped whenever one of `signals` fires and otherwise rebuilt after `ttl`
+    seconds (never, if ttl is None), which bounds staleness for writes made by
+    other processes. Only one caller rebuilds at a time; the others wait for
+    its result instead of running the same queries.
+    """
+
+    def __init__(self, builder, ttl=None, signals=()):
+        self.builder = builder
+        self.ttl = ttl
+        self._value = None
+        self._expires_at = None
+        self._build_seconds = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+
+        for signal in signals:
+            signal.connect(self._on_signal)
+
+    def _on_signal(self, sender, **kwargs):
+        self.invalidate()
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+            self._generation += 1
+
+    def _current(self):
+        with self._lock:
+            if self._value is not None and (self._expires_at is None or time.monotonic() < self._expires_at):
+                self.hits += 1
+                return self._value
+        return None
+
+    def get(self):
+        """Return the current value, building it if missing or expired"""
+        value = self._current()
+        if value is not None:
+            return value
+
+        with self._build_lock:
+            # Another caller may have rebuilt it while we waited
+            value = self._current()
+            if value is not None:
+                return value
+
+            with self._lock:
+                generation = self._generation
+            start = time.perf_counter()
+            value = self.builder()
+            seconds = time.perf_counter() - start
+
+            with self._lock:
+                self.builds += 1
+                # A signal during the build means the value may already be
+                # out of date: return it this once but do not keep it
+                if generation == self._generation:
+                    self._value = value
+                    self._expires_at = time.monotonic() + self.ttl if self.ttl else None
+                    self._build_seconds = seconds
+            logging.debug(f"Rebuilt {getattr(self.builder, '__name__', 'snapshot')} in {seconds:.4f}s")
+            return value
+
+    def stats(self):
+        with self._lock:
+            return {
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'builds': self.builds,
+                'cached': self._value is not None,
+                'last_build_seconds': round(self._build_seconds, 4) if self._build_seconds is not None else None
+            }
@@ -0,0 +1,250 @@
+from app import db
+from tiering import flight_history
+from dimensions import route_labels, airline_labels
+from cache import SnapshotCache
+from data_events import airline_data_committed
+from flask import current_app
+from datetime import datetime, timedelta
+from sqlalchemy import String, select, type_coerce
+import numpy as np
+
+LOAD_CHUNK_SIZE = 50000
+
+class FlightColumns:
+    """
+    Columnar snapshot of airline data held in NumPy arrays. Routes and airlines
+    are integer keys (route_ids / airline_ids; the dimension table ids when
+    loaded from the database) labelled through the routes / airlines /
+    route_endpoints dicts, and timestamps are stored as int64 seconds since
+    the epoch, so grouped statistics are computed with vectorized sorts and
+    reductions and only the groups in the output are ever labelled.
+    """
+
+    def __init__(self, route_ids, airline_ids, prices, departure_ts, scraped_ts, routes, airlines, route_endpoints):
+        self.route_ids = route_ids
+        self.airline_ids = airline_ids
+        self.prices = prices
+        self.departure_ts = departure_ts
+        self.scraped_ts = scraped_ts
+        self.routes = routes
+        self.airlines = airlines
+        self.route_endpoints = route_endpoints
+
+    def __len__(self):
+        return len(self.prices)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Build from an iterable of (route, origin, destination, airline, price,
+        departure_date, scraped_at) tuples, dictionary-encoding routes and
+        airlines in a single pass
+        """
+        route_index, airline_index = {}, {}
+        route_endpoints = {}
+        route_ids, airline_ids, prices, departures, scraped = [], [], [], [], []
+
+        for route, origin, destination, airline, price, departure_date, scraped_at in rows:
+            route_id = route_index.get(route)
+            if route_id is None:
+                route_id = route_index[route] = len(route_index)
+                route_endpoints[route_id] = (origin, destination)
+
+            airline_id = airline_index.get(airline)
+            if airline_id is None:
+                airline_id = airline_index[airline] = len(airline_index)
+
+            route_ids.append(route_id)
+            airline_ids.append(airline_id)
+            prices.append(price)
+            departures.append(departure_date)
+            scraped.append(scraped_at)
+
+        return cls(
+            route_ids=np.array(route_ids, dtype=np.int32),
+            airline_ids=np.array(airline_ids, dtype=np.int32),
+            prices=np.array(prices, dtype=np.float64),
+            departure_ts=epoch_seconds(departures),
+            scraped_ts=epoch_seconds(scraped),
+            routes=dict(enumerate(route_index)),
+            airlines=dict(enumerate(airline_index)),
+            route_endpoints=route_endpoints
+        )
+
+    @classmethod
+    def load(cls, where=None):
+        """
+        Load flight rows from the full history (hot and archived), streaming
+        them from the database in chunks. where is passed to
+        tiering.flight_history to filter each tier. Each chunk is turned into
+        arrays column by column: the route and airline ids are kept as the
+        keys, and the dimension labels are read once for the whole snapshot.
+        """
+        history = flight_history(
+            ('route_id', 'airline_id', 'price', 'departure_date', 'scraped_at'),
+            where=where
+        )
+        # Timestamps skip the per-value DateTime conversion: SQLite hands back
+        # the stored ISO strings, server drivers datetimes, and epoch_seconds
+        # converts either in one NumPy call
+        query = select(
+            history.c.route_id,
+            history.c.airline_id,
+            history.c.price,
+            type_coerce(history.c.departure_date, String),
+            type_coerce(history.c.scraped_at, String)
+        ).execution_options(yield_per=LOAD_CHUNK_SIZE)
+
+        # Executed on the session's connection rather than through the ORM,
+        # which would wrap every row; passing the query as the clause keeps
+        # request reads on the read-only engine (see storage.RoutingSession)
+        connection = db.session.connection(bind_arguments={'clause': query})
+        chunks = []
+        for chunk in connection.execute(query).partitions():
+            route_ids, airline_ids, prices, departures, scraped = zip(*chunk)
+            chunks.append((
+                np.fromiter(route_ids, dtype=np.int32, count=len(chunk)),
+                np.fromiter(airline_ids, dtype=np.int32, count=len(chunk)),
+                np.fromiter(prices, dtype=np.float64, count=len(chunk)),
+                epoch_seconds(departures),
+                epoch_seconds(scraped)
+            ))
+
+        if chunks:
+            route_ids, airline_ids, prices, departure_ts, scraped_ts = (np.concatenate(parts) for parts in zip(*chunks))
+        else:
+            route_ids, airline_ids = np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+            prices = np.empty(0, dtype=np.float64)
+            departure_ts, scraped_ts = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        labels = route_labels()
+        return cls(
+            route_ids=route_ids,
+            airline_ids=airline_ids,
+            prices=prices,
+            departure_ts=departure_ts,
+            scraped_ts=scraped_ts,
+            routes={route_id: name for route_id, (name, origin, destination) in labels.items()},
+            airlines=airline_labels(),
+            route_endpoints={route_id: (origin, destination) for route_id, (name, origin, destination) in labels.items()}
+        )
+
+    def subset(self, mask):
+        """The rows selected by a boolean mask, sharing this snapshot's labels"""
+        return FlightColumns(
+            self.route_ids[mask], self.airline_ids[mask], self.prices[mask], self.departure_ts[mask],
+            self.scraped_ts[mask], self.routes, self.airlines, self.route_endpoints
+        )
+
+    def airline_names(self):
+        """Labels of the airlines present in the rows"""
+        return [self.airlines[int(key)] for key in np.unique(self.airline_ids)]
+
+    def group_stats(self, by='route', percentiles=()):
+        """
+        Grouped count/mean/std/min/max (and optional percentiles) of price.
+        by is 'route' or 'airline'. Returns a list of dicts, one per group in
+        key order, with the group's label and key, std as the sample standard
+        deviation (0 for single-row groups) and percentiles linearly
+        interpolated like numpy.percentile. The moments and extremes are
+        scattered into per-key arrays without sorting; only percentiles sort.
+        """
+        if len(self) == 0:
+            return []
+
+        keys = self.route_ids if by == 'route' else self.airline_ids
+        labels = self.routes if by == 'route' else self.airlines
+        size = int(keys.max()) + 1
+
+        counts = np.bincount(keys, minlength=size)
+        means = np.divide(np.bincount(keys, weights=self.prices, minlength=size), counts,
+                          out=np.zeros(size), where=counts > 0)
+        deviations = self.prices - means[keys]
+        squared = np.bincount(keys, weights=deviations * deviations, minlength=size)
+        stds = np.sqrt(np.divide(squared, counts - 1, out=np.zeros(size), where=counts > 1))
+        lows = np.full(size, np.inf)
+        np.minimum.at(lows, keys, self.prices)
+        highs = np.full(size, -np.inf)
+        np.maximum.at(highs, keys, self.prices)
+
+        present = np.flatnonzero(counts)
+        present_counts = counts[present]
+
+        percentile_values = {}
+        if percentiles:
+            # Sort by group, then by price within each group
+            sorted_prices = self.prices[np.lexsort((self.prices, keys))]
+            starts = np.cumsum(present_counts) - present_counts
+            for q in percentiles:
+                position = (present_counts - 1) * (q / 100.0)
+                lower = np.floor(position).astype(np.int64)
+                upper = np.ceil(position).astype(np.int64)
+                low_values = sorted_prices[starts + lower]
+                high_values = sorted_prices[starts + upper]
+                percentile_values[q] = low_values + (high_values - low_values) * (position - lower)
+
+        result = []
+        for index, key in enumerate(present.tolist()):
+            stats = {
+                'key': key,
+                by: labels[key],
+                'count': int(counts[key]),
+                'mean': float(means[key]),
+                'std': float(stds[key]),
+                'min': float(lows[key]),
+                'max': float(highs[key])
+            }
+            for q in percentiles:
+                stats[f'p{q:g}'] = float(percentile_values[q][index])
+            result.append(stats)
+
+        return result
+
+    def distinct_routes_per_airline(self):
+        """Number of distinct routes flown by each airline, keyed by airline label"""
+        if len(self) == 0:
+            return {}
+
+        stride = int(self.route_ids.max()) + 1
+        pairs = np.unique(self.airline_ids.astype(np.int64) * stride + self.route_ids)
+        airline_keys, route_counts = np.unique(pairs // stride, return_counts=True)
+        return {self.airlines[int(key)]: int(count) for key, count in zip(airline_keys, route_counts)}
+
+EPOCH = datetime(1970, 1, 1)
+SECOND = timedelta(seconds=1)
+
+def epoch_seconds(values):
+    """
+    Naive UTC timestamps to an int64 array of epoch seconds, 0 for missing
+    values. ISO strings (as SQLite stores them) are parsed by NumPy in one
+    call; datetimes are subtracted one by one, which beats NumPy's own
+    conversion of datetime objects.
+    """
+    sample = next((value for value in values if value is not None), None)
+    if isinstance(sample, str):
+        stamps = np.array(values, dtype='datetime64[us]').astype('datetime64[s]')
+        seconds = stamps.astype(np.int64)
+        seconds[np.isnat(stamps)] = 0
+        return seconds
+    return np.fromiter(
+        ((value - EPOCH) // SECOND if value is not None else 0 for value in values),
+        dtype=np.int64,
+        count=len(values)
+    )
+
+def flight_snapshot():
+    """
+    FlightColumns of the whole history for the current app, shared by the
+    numpy analytics backend instead of loading the rows on every call. It is
+    dropped when a write to the flight data commits in this process and
+    otherwise reloaded after COLUMNAR_SNAPSHOT_TTL seconds, which bounds
+    staleness for writes made by other processes.
+    """
+    cache = current_app.extensions.get('flight_snapshot')
+    if cache is None:
+        cache = current_app.extensions.setdefault('flight_snapshot', SnapshotCache(
+            FlightColumns.load,
+            ttl=current_app.config['COLUMNAR_SNAPSHOT_TTL'],
+            signals=(airline_data_committed,)
+        ))
+    return cache.get()
@@ -0,0 +1,24 @@
+from app import app
+import click
+from rollups import rebuild_rollups
+from sketches import rebuild_sketches
+from tiering import archive_old_rows, MIN_HOT_RETENTION_DAYS
+
+@app.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Recompute the route/airline/day rollup tables from raw airline data."""
+    rollup_count = rebuild_rollups()
+    click.echo(f"Rebuilt {rollup_count} rollup rows")
+
+@app.cli.command('rebuild-sketches')
+def rebuild_sketches_command():
+    """Recompute the price percentile and distinct-count sketches from raw airline data."""
+    sketch_count = rebuild_sketches()
+    click.echo(f"Rebuilt {sketch_count} sketches")
+
+@app.cli.command('archive-data')
+@click.option('--days', type=click.IntRange(min=MIN_HOT_RETENTION_DAYS), default=None, help='Retention horizon in days (default: HOT_RETENTION_DAYS).')
+def archive_data_command(days):
+    """Move airline data older than the retention horizon into the archive table."""
+    archived = archive_old_rows(retention_days=days)
+    click.echo(f"Archived {archived} airline records")
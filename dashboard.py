@@ -0,0 +1,102 @@
+from app import db
+from models import AirlineData, MarketInsight, RouteDailyRollup
+from data_processor import get_popular_routes
+from collections import namedtuple
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from sqlalchemy import select, func
+import json
+import logging
+
+INSIGHT_TYPES = ('popular_routes', 'price_trends', 'demand_analysis')
+INSIGHT_FIELDS = ('id', 'insight_type', 'content', 'generated_at', 'data_period_start', 'data_period_end')
+
+# Everything the index page shows, computed in one go
+DashboardSnapshot = namedtuple('DashboardSnapshot', [
+    'total_records', 'recent_records', 'latest_insights', 'popular_routes', 'built_at'
+])
+
+# A stored insight with its JSON content already decoded (`data`)
+ParsedInsight = namedtuple('ParsedInsight', [
+    'insight_type', 'data', 'content', 'generated_at', 'data_period_start', 'data_period_end'
+])
+
+# What the insights page shows: raw content and parsed insights by type
+InsightsPage = namedtuple('InsightsPage', ['insights', 'parsed_insights'])
+
+def build_dashboard_snapshot(recent_days=7, insight_limit=3, route_limit=10):
+    """
+    Compute the index page's figures. The total comes from the rollups (which
+    count every record in both tiers) rather than counting the raw tables;
+    insights are copied into plain objects so the snapshot outlives the session
+    """
+    total_records = db.session.query(
+        func.coalesce(func.sum(RouteDailyRollup.booking_count), 0)
+    ).scalar()
+    recent_records = db.session.query(func.count(AirlineData.id)).filter(
+        AirlineData.scraped_at >= datetime.utcnow() - timedelta(days=recent_days)
+    ).scalar()
+
+    latest_insights = [
+        SimpleNamespace(**{name: getattr(insight, name) for name in INSIGHT_FIELDS})
+        for insight in MarketInsight.query.order_by(MarketInsight.generated_at.desc()).limit(insight_limit)
+    ]
+
+    return DashboardSnapshot(
+        total_records=int(total_records),
+        recent_records=recent_records,
+        latest_insights=latest_insights,
+        popular_routes=get_popular_routes(limit=route_limit),
+        built_at=datetime.utcnow()
+    )
+
+def get_latest_insights(insight_types=INSIGHT_TYPES):
+    """
+    Newest MarketInsight row of each type, in one query: rows are numbered
+    newest-first within each type and only the first of each is kept (served
+    by the (insight_type, generated_at) index).
+    Returns a dict of insight_type -> row mapping
+    """
+    rank = func.row_number().over(
+        partition_by=MarketInsight.insight_type,
+        order_by=(MarketInsight.generated_at.desc(), MarketInsight.id.desc())
+    ).label('rank')
+    ranked = select(*[getattr(MarketInsight, name) for name in INSIGHT_FIELDS], rank).where(
+        MarketInsight.insight_type.in_(insight_types)
+    ).subquery()
+
+    rows = db.session.execute(
+        select(*[ranked.c[name] for name in INSIGHT_FIELDS]).where(ranked.c.rank == 1)
+    ).mappings()
+    return {row['insight_type']: row for row in rows}
+
+def parse_insight_content(content):
+    """Decode an insight's JSON content; content that is not valid JSON is kept as raw text"""
+    try:
+        return json.loads(content)
+    except (TypeError, ValueError) as e:
+        logging.warning(f"Stored insight is not valid JSON: {str(e)}")
+        return {'raw': content}
+
+def build_insights_page():
+    """Latest insight of each type, raw and with the JSON decoded once"""
+    latest = get_latest_insights()
+    parsed_insights = {}
+
+    for insight_type in INSIGHT_TYPES:
+        row = latest.get(insight_type)
+        if row is None:
+            continue
+        parsed_insights[insight_type] = ParsedInsight(
+            insight_type=insight_type,
+            data=parse_insight_content(row['content']),
+            content=row['content'],
+            generated_at=row['generated_at'],
+            data_period_start=row['data_period_start'],
+            data_period_end=row['data_period_end']
+        )
+
+    return InsightsPage(
+        insights={insight_type: insight.content for insight_type, insight in parsed_insights.items()},
+        parsed_insights=parsed_insights
+    )
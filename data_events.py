@@ -0,0 +1,72 @@
+from blinker import Namespace
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import threading
+
+# Signals sent after a transaction that wrote AirlineData commits.
+# Receivers get the committed flight rows (dicts) and the new data version;
+# rows is empty when the transaction made changes that are not known row by
+# row (edits, deletes, rebuilds), and receivers should then reload.
+_signals = Namespace()
+airline_data_committed = _signals.signal('airline-data-committed')
+
+# Sent after a transaction that saved MarketInsight rows commits.
+# Receivers get the saved insights (dicts with at least insight_type).
+market_insights_committed = _signals.signal('market-insights-committed')
+
+_version_lock = threading.Lock()
+_data_version = 0
+
+def data_version():
+    """
+    Counter that moves every time a write to AirlineData commits in this process
+    """
+    return _data_version
+
+def mark_airline_data_written(session, rows=None):
+    """
+    Note that the session's current transaction wrote AirlineData, so the data
+    version is bumped (and receivers notified) once it commits. rows are the
+    inserted rows; None means the changes are not known row by row, and then
+    receivers get no rows for the whole transaction
+    """
+    written = session.info.setdefault('airline_data_rows', [])
+    if rows is None:
+        session.info['airline_data_rows_unknown'] = True
+    else:
+        written.extend(rows)
+
+def mark_market_insights_written(session, insights=()):
+    """
+    Note that the session's current transaction saved MarketInsight rows, so
+    receivers are notified once it commits
+    """
+    session.info.setdefault('market_insights_written', []).extend(insights)
+
+@event.listens_for(Session, 'after_commit')
+def _publish_market_insights_commit(session):
+    insights = session.info.pop('market_insights_written', None)
+    if insights is not None:
+        market_insights_committed.send(session, insights=insights)
+
+@event.listens_for(Session, 'after_commit')
+def _publish_airline_data_commit(session):
+    global _data_version
+
+    rows = session.info.pop('airline_data_rows', None)
+    if session.info.pop('airline_data_rows_unknown', False):
+        rows = []
+    if rows is None:
+        return
+
+    with _version_lock:
+        _data_version += 1
+        version = _data_version
+
+    airline_data_committed.send(session, rows=rows, version=version)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_airline_data_writes(session):
+    session.info.pop('airline_data_rows', None)
+    session.info.pop('airline_data_rows_unknown', None)
+    session.info.pop('market_insights_written', None)
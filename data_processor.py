@@ -1,8 +1,30 @@
 from app import db
-from models import AirlineData
+from models import AirlineData, RouteDailyRollup, Route, Airline
+from dimensions import OriginAirport, DestinationAirport, route_labels, airline_labels
+from columnar import flight_snapshot
+from summaries import AnalysisSummaries
+from tiering import flight_history
+from sketches import distinct_route_counts
 from datetime import datetime, timedelta
+from flask import current_app
 import logging
-from sqlalchemy import func
+import numpy as np
+from sqlalchemy import func, literal_column, select
+
+ANALYTICS_BACKENDS = ('sql', 'numpy')
+
+SUMMARY_CHUNK_SIZE = 10000
+
+def resolve_analytics_backend(backend=None):
+    """
+    Pick the analytics backend: 'sql' pushes aggregates into the database (via
+    the rollups where possible), 'numpy' loads the rows into the columnar
+    engine. Defaults to the ANALYTICS_BACKEND config setting.
+    """
+    backend = backend or current_app.config['ANALYTICS_BACKEND']
+    if backend not in ANALYTICS_BACKENDS:
+        raise ValueError(f"Unknown analytics backend: {backend}")
+    return backend
 
 def process_airline_data(data_records):
     """
@@ -33,26 +55,78 @@ def process_airline_data(data_records):
     
     return processed_data
 
-def get_popular_routes(limit=10):
+def summarize_airline_data(*criteria):
+    """
+    Build the AI analysis summaries in one streaming pass over AirlineData
+    rows matching the given SQLAlchemy criteria. Rows are read in chunks and
+    fed straight into the summary accumulators, so memory is bounded by the
+    number of routes, airlines and months rather than the number of rows.
+    Rows carry dimension ids, which are mapped to labels from the (small)
+    dimension tables loaded once up front.
+    Returns an AnalysisSummaries
+    """
+    query = select(
+        AirlineData.route_id,
+        AirlineData.airline_id,
+        AirlineData.price,
+        AirlineData.departure_date
+    ).where(*criteria).execution_options(yield_per=SUMMARY_CHUNK_SIZE)
+    
+    accumulated = AnalysisSummaries()
+    try:
+        routes = {route_id: labels[0] for route_id, labels in route_labels().items()}
+        airlines = airline_labels()
+        for route_id, airline_id, price, departure_date in db.session.execute(query):
+            accumulated.add(routes[route_id], airlines[airline_id], price, departure_date.strftime('%Y-%m'))
+        
+        logging.info(f"Successfully summarized {accumulated.count} airline records")
+        
+    except Exception as e:
+        logging.error(f"Error summarizing airline data: {str(e)}")
+        raise e
+    
+    return accumulated
+
+def get_popular_routes(limit=10, backend=None):
     """
     Get the most popular routes based on booking frequency
+    Answered from the daily rollups rather than the raw AirlineData table
     """
+    if resolve_analytics_backend(backend) == 'numpy':
+        return get_popular_routes_columnar(limit)
+    
     try:
-        popular_routes = db.session.query(
-            AirlineData.route,
-            AirlineData.origin,
-            AirlineData.destination,
-            func.count(AirlineData.id).label('booking_count'),
-            func.avg(AirlineData.price).label('avg_price'),
-            func.min(AirlineData.price).label('min_price'),
-            func.max(AirlineData.price).label('max_price')
+        # Aggregate on the integer route id, then join labels onto the top rows
+        booking_count = func.sum(RouteDailyRollup.booking_count)
+        top_routes = db.session.query(
+            RouteDailyRollup.route_id,
+            booking_count.label('booking_count'),
+            (func.sum(RouteDailyRollup.price_sum) / booking_count).label('avg_price'),
+            func.min(RouteDailyRollup.price_min).label('min_price'),
+            func.max(RouteDailyRollup.price_max).label('max_price')
         ).group_by(
-            AirlineData.route,
-            AirlineData.origin,
-            AirlineData.destination
+            RouteDailyRollup.route_id
+        ).order_by(
+            booking_count.desc()
+        ).limit(limit).subquery()
+        
+        popular_routes = db.session.query(
+            Route.name.label('route'),
+            OriginAirport.code.label('origin'),
+            DestinationAirport.code.label('destination'),
+            top_routes.c.booking_count,
+            top_routes.c.avg_price,
+            top_routes.c.min_price,
+            top_routes.c.max_price
+        ).select_from(top_routes).join(
+            Route, Route.id == top_routes.c.route_id
+        ).join(
+            OriginAirport, OriginAirport.id == Route.origin_id
+        ).join(
+            DestinationAirport, DestinationAirport.id == Route.destination_id
         ).order_by(
-            func.count(AirlineData.id).desc()
-        ).limit(limit).all()
+            top_routes.c.booking_count.desc()
+        ).all()
         
         result = []
         for route in popular_routes:
@@ -75,21 +149,23 @@ def get_popular_routes(limit=10):
 def get_price_trends(days=30):
     """
     Get price trends over the specified number of days
+    Answered from the daily rollups, so the cutoff is applied per departure day
     """
     try:
         # Get price data grouped by date
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        cutoff_date = (datetime.utcnow() - timedelta(days=days)).date()
         
+        booking_count = func.sum(RouteDailyRollup.booking_count)
         price_trends = db.session.query(
-            func.date(AirlineData.departure_date).label('date'),
-            func.avg(AirlineData.price).label('avg_price'),
-            func.count(AirlineData.id).label('booking_count')
+            RouteDailyRollup.day.label('date'),
+            (func.sum(RouteDailyRollup.price_sum) / booking_count).label('avg_price'),
+            booking_count.label('booking_count')
         ).filter(
-            AirlineData.departure_date >= cutoff_date
+            RouteDailyRollup.day >= cutoff_date
         ).group_by(
-            func.date(AirlineData.departure_date)
+            RouteDailyRollup.day
         ).order_by(
-            func.date(AirlineData.departure_date)
+            RouteDailyRollup.day
         ).all()
         
         result = []
@@ -112,24 +188,56 @@ def get_price_trends(days=30):
         logging.error(f"Error getting price trends: {str(e)}")
         return []
 
-def get_airline_performance():
+def get_airline_performance(backend=None):
     """
     Get performance statistics for each airline
+    Answered from the daily rollups rather than the raw AirlineData table.
+    route_count is estimated from the per-airline HyperLogLog sketches
+    (standard error 1.6%, near exact for small counts) instead of a
+    count(distinct) over the rollups
     """
+    if resolve_analytics_backend(backend) == 'numpy':
+        return get_airline_performance_columnar()
+    
     try:
-        airline_stats = db.session.query(
-            AirlineData.airline,
-            func.count(AirlineData.id).label('total_bookings'),
-            func.avg(AirlineData.price).label('avg_price'),
-            func.min(AirlineData.price).label('min_price'),
-            func.max(AirlineData.price).label('max_price'),
-            func.count(func.distinct(AirlineData.route)).label('route_count')
+        total_bookings = func.sum(RouteDailyRollup.booking_count)
+        per_airline = db.session.query(
+            RouteDailyRollup.airline_id,
+            total_bookings.label('total_bookings'),
+            (func.sum(RouteDailyRollup.price_sum) / total_bookings).label('avg_price'),
+            func.min(RouteDailyRollup.price_min).label('min_price'),
+            func.max(RouteDailyRollup.price_max).label('max_price')
         ).group_by(
-            AirlineData.airline
+            RouteDailyRollup.airline_id
+        ).subquery()
+        
+        airline_stats = db.session.query(
+            per_airline.c.airline_id,
+            Airline.name.label('airline'),
+            per_airline.c.total_bookings,
+            per_airline.c.avg_price,
+            per_airline.c.min_price,
+            per_airline.c.max_price
+        ).select_from(per_airline).join(
+            Airline, Airline.id == per_airline.c.airline_id
         ).order_by(
-            func.count(AirlineData.id).desc()
+            per_airline.c.total_bookings.desc()
         ).all()
         
+        route_counts = distinct_route_counts()
+        
+        # Airlines without a sketch (rows written behind the app's back) are counted exactly
+        unsketched = [stat.airline_id for stat in airline_stats if stat.airline_id not in route_counts]
+        if unsketched:
+            route_counts.update(db.session.query(
+                RouteDailyRollup.airline_id,
+                func.count(func.distinct(RouteDailyRollup.route_id))
+            ).filter(
+                RouteDailyRollup.airline_id.in_(unsketched)
+            ).group_by(
+                RouteDailyRollup.airline_id
+            ).all())
+        
         result = []
         total_bookings = sum(stat.total_bookings for stat in airline_stats)
         
@@ -143,7 +251,7 @@ def get_airline_performance():
                 'avg_price': round(stat.avg_price, 2),
                 'min_price': stat.min_price,
                 'max_price': stat.max_price,
-                'route_count': stat.route_count
+                'route_count': route_counts[stat.airline_id]
             })
         
         return result
@@ -152,25 +260,51 @@ def get_airline_performance():
         logging.error(f"Error getting airline performance: {str(e)}")
         return []
 
+def month_columns(column):
+    """
+    Expressions grouping a date column by calendar month: the dialect's own
+    'YYYY-MM' formatting on SQLite and PostgreSQL, which is one function per
+    row, otherwise EXTRACT(year) and EXTRACT(month), which SQLAlchemy renders
+    for every dialect. month_text turns their values into the label.
+    """
+    dialect_name = db.engine.dialect.name
+    if dialect_name == 'sqlite':
+        return [func.strftime('%Y-%m', column)]
+    if dialect_name == 'postgresql':
+        # A literal, not a bound parameter, so the SELECT and GROUP BY
+        # expressions are identical to the server
+        return [func.to_char(column, literal_column("'YYYY-MM'"))]
+    return [func.extract('year', column), func.extract('month', column)]
+
+def month_text(values):
+    """'YYYY-MM' label from the values of the month_columns expressions"""
+    if len(values) == 1:
+        return values[0]
+    year, month = values
+    return f"{int(year):04d}-{int(month):02d}"
+
 def get_demand_by_month():
     """
     Get demand statistics grouped by month
+    Answered from the daily rollups rather than the raw AirlineData table
     """
     try:
+        months = month_columns(RouteDailyRollup.day)
+        booking_count = func.sum(RouteDailyRollup.booking_count)
         monthly_demand = db.session.query(
-            func.strftime('%Y-%m', AirlineData.departure_date).label('month'),
-            func.count(AirlineData.id).label('booking_count'),
-            func.avg(AirlineData.price).label('avg_price')
+            *months,
+            booking_count.label('booking_count'),
+            (func.sum(RouteDailyRollup.price_sum) / booking_count).label('avg_price')
         ).group_by(
-            func.strftime('%Y-%m', AirlineData.departure_date)
+            *months
         ).order_by(
-            func.strftime('%Y-%m', AirlineData.departure_date)
+            *months
         ).all()
         
         result = []
         for demand in monthly_demand:
             result.append({
-                'month': demand.month,
+                'month': month_text(demand[:len(months)]),
                 'booking_count': demand.booking_count,
                 'avg_price': round(demand.avg_price, 2)
             })
@@ -181,31 +315,71 @@ def get_demand_by_month():
         logging.error(f"Error getting demand by month: {str(e)}")
         return []
 
-def get_route_statistics(route):
+def get_route_statistics(route, backend=None):
     """
     Get detailed statistics for a specific route
+    Aggregates are computed in the database, so memory use does not depend on
+    how many rows the route has
     """
+    if resolve_analytics_backend(backend) == 'numpy':
+        return get_route_statistics_columnar(route)
+    
     try:
-        route_data = AirlineData.query.filter_by(route=route).all()
+        route_id = db.session.query(Route.id).filter(Route.name == route).scalar()
+        if route_id is None:
+            return None
         
-        if not route_data:
+        # Route statistics cover the full history, hot and archived
+        history = flight_history(
+            ('id', 'price', 'airline_id', 'scraped_at'),
+            where=lambda model: [model.route_id == route_id]
+        )
+        
+        totals = db.session.query(
+            func.count().label('total_bookings'),
+            func.avg(history.c.price).label('avg_price'),
+            func.min(history.c.price).label('min_price'),
+            func.max(history.c.price).label('max_price'),
+            func.min(history.c.scraped_at).label('oldest_record'),
+            func.max(history.c.scraped_at).label('latest_record')
+        ).select_from(history).one()
+        
+        if not totals.total_bookings:
             return None
         
-        prices = [record.price for record in route_data]
-        airlines = list(set(record.airline for record in route_data))
+        # Second pass around the mean rather than sum-of-squares, which loses
+        # precision when the spread is small relative to the price
+        deviation = history.c.price - totals.avg_price
+        squared_deviation = db.session.query(
+            func.sum(deviation * deviation)
+        ).select_from(history).scalar() or 0
+        
+        airline_ids = db.session.query(history.c.airline_id).distinct().subquery()
+        airlines = [
+            row.name for row in db.session.query(Airline.name).join(
+                airline_ids, airline_ids.c.airline_id == Airline.id
+            ).order_by(Airline.name)
+        ]
+        
+        latest_price = db.session.query(history.c.price).order_by(
+            history.c.scraped_at.desc(),
+            history.c.id.desc()
+        ).limit(1).scalar()
+        
+        price_std = (squared_deviation / (totals.total_bookings - 1)) ** 0.5 if totals.total_bookings > 1 else 0
         
         statistics = {
             'route': route,
-            'total_bookings': len(route_data),
-            'avg_price': round(sum(prices) / len(prices), 2),
-            'min_price': min(prices),
-            'max_price': max(prices),
-            'price_std': round(calculate_standard_deviation(prices), 2),
+            'total_bookings': totals.total_bookings,
+            'avg_price': round(totals.avg_price, 2),
+            'min_price': totals.min_price,
+            'max_price': totals.max_price,
+            'price_std': round(price_std, 2),
             'airlines': airlines,
             'airline_count': len(airlines),
-            'latest_price': route_data[-1].price if route_data else None,
-            'oldest_record': route_data[0].scraped_at.strftime('%Y-%m-%d') if route_data else None,
-            'latest_record': route_data[-1].scraped_at.strftime('%Y-%m-%d') if route_data else None
+            'latest_price': latest_price,
+            'oldest_record': totals.oldest_record.strftime('%Y-%m-%d') if totals.oldest_record else None,
+            'latest_record': totals.latest_record.strftime('%Y-%m-%d') if totals.latest_record else None
         }
         
         return statistics
@@ -214,6 +388,111 @@ def get_route_statistics(route):
         logging.error(f"Error getting route statistics: {str(e)}")
         return None
 
+def get_popular_routes_columnar(limit=10):
+    """
+    get_popular_routes computed by the NumPy columnar engine
+    """
+    try:
+        columns = flight_snapshot()
+        
+        route_stats = columns.group_stats(by='route')
+        route_stats.sort(key=lambda stats: stats['count'], reverse=True)
+        
+        result = []
+        for stats in route_stats[:limit]:
+            origin, destination = columns.route_endpoints[stats['key']]
+            result.append({
+                'route': stats['route'],
+                'origin': origin,
+                'destination': destination,
+                'booking_count': stats['count'],
+                'avg_price': round(stats['mean'], 2),
+                'min_price': stats['min'],
+                'max_price': stats['max']
+            })
+        
+        return result
+        
+    except Exception as e:
+        logging.error(f"Error getting popular routes (columnar): {str(e)}")
+        return []
+
+def get_airline_performance_columnar():
+    """
+    get_airline_performance computed by the NumPy columnar engine
+    """
+    try:
+        columns = flight_snapshot()
+        route_counts = columns.distinct_routes_per_airline()
+        
+        airline_stats = columns.group_stats(by='airline')
+        airline_stats.sort(key=lambda stats: stats['count'], reverse=True)
+        total_bookings = len(columns)
+        
+        result = []
+        for stats in airline_stats:
+            market_share = round((stats['count'] / total_bookings) * 100, 2) if total_bookings > 0 else 0
+            
+            result.append({
+                'airline': stats['airline'],
+                'total_bookings': stats['count'],
+                'market_share': market_share,
+                'avg_price': round(stats['mean'], 2),
+                'min_price': stats['min'],
+                'max_price': stats['max'],
+                'route_count': route_counts[stats['airline']]
+            })
+        
+        return result
+        
+    except Exception as e:
+        logging.error(f"Error getting airline performance (columnar): {str(e)}")
+        return []
+
+def get_route_statistics_columnar(route):
+    """
+    get_route_statistics computed by the NumPy columnar engine
+    Latest/oldest come from the scraped_at timestamps rather than row order
+    """
+    try:
+        route_id = db.session.query(Route.id).filter(Route.name == route).scalar()
+        if route_id is None:
+            return None
+        
+        columns = flight_snapshot()
+        columns = columns.subset(columns.route_ids == route_id)
+        
+        if len(columns) == 0:
+            return None
+        
+        stats = columns.group_stats(by='route')[0]
+        airlines = sorted(columns.airline_names())
+        
+        # Last row scraped at the newest timestamp, first row at the oldest
+        latest_index = np.flatnonzero(columns.scraped_ts == columns.scraped_ts.max())[-1]
+        oldest_index = np.flatnonzero(columns.scraped_ts == columns.scraped_ts.min())[0]
+        
+        return {
+            'route': route,
+            'total_bookings': stats['count'],
+            'avg_price': round(stats['mean'], 2),
+            'min_price': stats['min'],
+            'max_price': stats['max'],
+            'price_std': round(stats['std'], 2),
+            'airlines': airlines,
+            'airline_count': len(airlines),
+            'latest_price': float(columns.prices[latest_index]),
+            'oldest_record': _format_epoch_date(columns.scraped_ts[oldest_index]),
+            'latest_record': _format_epoch_date(columns.scraped_ts[latest_index])
+        }
+        
+    except Exception as e:
+        logging.error(f"Error getting route statistics (columnar): {str(e)}")
+        return None
+
+def _format_epoch_date(timestamp):
+    return datetime.utcfromtimestamp(int(timestamp)).strftime('%Y-%m-%d')
+
 def calculate_standard_deviation(values):
     """
     Calculate standard deviation for a list of values
@@ -234,34 +513,43 @@ def get_price_alerts(threshold_percentage=10):
         recent_date = datetime.utcnow() - timedelta(days=7)
         old_date = datetime.utcnow() - timedelta(days=14)
         
+        # Departures in the window may have been scraped long ago, so read
+        # both tiers
+        history = flight_history(
+            ('route_id', 'price', 'departure_date'),
+            where=lambda model: [model.departure_date >= old_date]
+        )
+        
         # Get average prices for recent period
         recent_prices = db.session.query(
-            AirlineData.route,
-            func.avg(AirlineData.price).label('recent_avg_price')
+            history.c.route_id,
+            func.avg(history.c.price).label('recent_avg_price')
         ).filter(
-            AirlineData.departure_date >= recent_date
+            history.c.departure_date >= recent_date
         ).group_by(
-            AirlineData.route
+            history.c.route_id
         ).subquery()
         
         # Get average prices for previous period
         old_prices = db.session.query(
-            AirlineData.route,
-            func.avg(AirlineData.price).label('old_avg_price')
+            history.c.route_id,
+            func.avg(history.c.price).label('old_avg_price')
         ).filter(
-            AirlineData.departure_date.between(old_date, recent_date)
+            history.c.departure_date.between(old_date, recent_date)
         ).group_by(
-            AirlineData.route
+            history.c.route_id
         ).subquery()
         
         # Join and calculate percentage change
         price_changes = db.session.query(
-            recent_prices.c.route,
+            Route.name.label('route'),
             recent_prices.c.recent_avg_price,
             old_prices.c.old_avg_price
-        ).join(
+        ).select_from(recent_prices).join(
             old_prices,
-            recent_prices.c.route == old_prices.c.route
+            recent_prices.c.route_id == old_prices.c.route_id
+        ).join(
+            Route, Route.id == recent_prices.c.route_id
         ).all()
         
         alerts = []
@@ -2,38 +2,257 @@ import requests
 from bs4 import BeautifulSoup
 import trafilatura
 from app import db
-from models import AirlineData, ScrapingLog
+from models import ScrapingLog, FetchState
+from ingest import ingest_flights
+from tiering import archive_old_rows
 from datetime import datetime, timedelta
 import logging
-import re
 import random
-import time
+from flask import current_app
+from scrape_engine import FetchEngine, ConditionalFetcher
+from http_client import HttpClient
+from extraction import extract_flights, extract_many
 
-def scrape_airline_data(source_url):
+# Travel news sites that report on flight deals and trends
+TRAVEL_NEWS_URLS = [
+    'https://www.cnn.com/travel',
+    'https://www.bbc.com/travel',
+    'https://www.travelandleisure.com/airlines-airports'
+]
+
+# Booking sites scraped by the scrape job
+DEFAULT_SCRAPE_SOURCES = [
+    'https://www.kayak.com/flights',
+    'https://www.expedia.com/Flights',
+    'https://www.skyscanner.com'
+]
+
+# Headers sent with every scraping request to mimic a real browser
+SCRAPE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+def get_http_client():
+    """
+    The app's shared, pooled HTTP client for scraping, created on first use
+    from the HTTP_* settings
+    """
+    client = current_app.extensions.get('scrape_http_client')
+    if client is None:
+        config = current_app.config
+        client = current_app.extensions.setdefault('scrape_http_client', HttpClient(
+            timeout=(config['HTTP_CONNECT_TIMEOUT'], config['HTTP_READ_TIMEOUT']),
+            max_retries=config['HTTP_MAX_RETRIES'],
+            pool_maxsize=config['HTTP_POOL_MAXSIZE'],
+            max_response_bytes=config['HTTP_MAX_RESPONSE_BYTES'],
+            headers=SCRAPE_HEADERS
+        ))
+    return client
+
+def fetch_page(url, headers=None, client=None):
+    """
+    Download a page through the shared HTTP client
+    Returns the response body, or raises on an error status
+    """
+    response = (client or get_http_client()).get(url, headers=headers)
+    response.raise_for_status()
+    return response.content
+
+def get_fetch_engine(fetch=None, headers=None):
+    """
+    Build a fetch engine using the app's scraping concurrency settings
+    Pages are downloaded with fetch_page unless another fetch is given
+    """
+    if fetch is None:
+        client = get_http_client()
+        fetch = lambda url: fetch_page(url, headers=headers, client=client)
+    
+    return FetchEngine(
+        max_workers=current_app.config['SCRAPE_MAX_CONCURRENCY'],
+        host_delay=current_app.config['SCRAPE_HOST_DELAY'],
+        fetch=fetch
+    )
+
+def load_fetch_states(urls):
+    """
+    Validators recorded for the given page URLs on previous runs, as plain
+    dicts so they can be handed to fetch worker threads
+    """
+    if not urls:
+        return {}
+    
+    states = FetchState.query.filter(FetchState.url.in_(list(urls))).all()
+    return {
+        state.url: {
+            'etag': state.etag,
+            'last_modified': state.last_modified,
+            'content_hash': state.content_hash,
+            'bytes': state.content_length or 0
+        }
+        for state in states
+    }
+
+def save_fetch_states(fetched):
+    """
+    Record the validators of successfully fetched pages (FetchResult values)
+    """
+    now = datetime.utcnow()
+    existing = {state.url: state for state in FetchState.query.filter(
+        FetchState.url.in_([result.url for result in fetched])
+    )}
+    
+    for result in fetched:
+        state = existing.get(result.url)
+        if state is None:
+            state = FetchState(url=result.url)
+            db.session.add(state)
+        
+        state.last_fetched_at = now
+        if result.status == 'not_modified':
+            continue
+        
+        state.etag = result.etag
+        state.last_modified = result.last_modified
+        state.content_length = result.bytes
+        if result.status == 'changed':
+            state.content_hash = result.content_hash
+            state.last_changed_at = now
+    
+    db.session.commit()
+
+def fetch_stats(fetched, states):
+    """Page and byte counts for one scraping run"""
+    results = [result for result in fetched.values() if result is not None]
+    not_modified = [result for result in results if result.status == 'not_modified']
+    unchanged = [result for result in results if result.status == 'unchanged']
+    
+    return {
+        'pages_requested': len(fetched),
+        'pages_changed': sum(1 for result in results if result.status == 'changed'),
+        'pages_not_modified': len(not_modified),
+        'pages_unchanged': len(unchanged),
+        'pages_failed': len(fetched) - len(results),
+        'bytes_downloaded': sum(result.bytes for result in results),
+        # A 304 saves the whole body; an unchanged 200 still saves extraction
+        'bytes_saved': sum(states.get(result.url, {}).get('bytes', 0) for result in not_modified)
+    }
+
+def source_page_urls(source_url):
+    """
+    List the page URLs a source needs downloaded before it can be scraped
+    """
+    if 'kayak' in source_url.lower():
+        return list(TRAVEL_NEWS_URLS)
+    if 'expedia' in source_url.lower() or 'skyscanner' in source_url.lower():
+        return []
+    return [source_url]
+
+def scrape_sources(source_urls, engine=None):
+    """
+    Scrape several sources at once. Every page needed by every source is
+    fetched concurrently first, then each source is extracted and saved.
+    Pages are revalidated with conditional requests against the FetchState
+    of the previous run; pages that have not changed are neither extracted
+    nor written again.
+    Returns (dict of source_url -> records scraped or the exception raised,
+    fetch statistics for the run)
+    """
+    page_urls = list(dict.fromkeys(url for source_url in source_urls for url in source_page_urls(source_url)))
+    states = load_fetch_states(page_urls)
+    engine = engine or get_fetch_engine(fetch=ConditionalFetcher(states, headers=SCRAPE_HEADERS, client=get_http_client()))
+    fetched = engine.fetch_all(page_urls)
+    
+    # Only changed pages are handed to the scrapers; unchanged ones map to
+    # None so they are skipped rather than downloaded again
+    pages = {url: result.content if result is not None else None for url, result in fetched.items()}
+    
+    results = {}
+    for source_url in source_urls:
+        try:
+            results[source_url] = scrape_airline_data(source_url, pages=pages)
+            
+            # Remember validators only once the source's records are saved,
+            # so a failed run is retried in full next time
+            save_fetch_states([fetched[url] for url in source_page_urls(source_url) if fetched.get(url)])
+        except Exception as e:
+            db.session.rollback()
+            results[source_url] = e
+    
+    stats = fetch_stats(fetched, states)
+    logging.info(
+        f"Fetched {stats['pages_requested']} pages: {stats['pages_changed']} changed, "
+        f"{stats['pages_not_modified'] + stats['pages_unchanged']} unchanged, "
+        f"{stats['bytes_downloaded']} bytes downloaded, {stats['bytes_saved']} bytes saved"
+    )
+    
+    return results, stats
+
+def run_scrape(source_urls=None):
+    """
+    Scrape every source and record a ScrapingLog entry for each outcome
+    Returns a summary dict with the total records scraped
+    """
+    source_urls = source_urls or DEFAULT_SCRAPE_SOURCES
+    
+    # Fetch all sources concurrently, then log each outcome
+    results, stats = scrape_sources(source_urls)
+    
+    total_scraped = 0
+    summary = {}
+    for source in source_urls:
+        result = results[source]
+        if isinstance(result, Exception):
+            logging.error(f"Error scraping {source}: {str(result)}")
+            log_entry = ScrapingLog(
+                source=source,
+                status='error',
+                error_message=str(result)
+            )
+            summary[source] = {'status': 'error', 'error': str(result)}
+        else:
+            total_scraped += result
+            
+            # Log successful scraping
+            log_entry = ScrapingLog(
+                source=source,
+                status='success',
+                records_scraped=result
+            )
+            summary[source] = {'status': 'success', 'records': result}
+        db.session.add(log_entry)
+    
+    db.session.commit()
+    logging.info(f"Scraped {total_scraped} records from {len(source_urls)} sources")
+    
+    # Keep the hot table small by moving rows past the retention horizon
+    archived = archive_old_rows()
+    
+    return {'records': total_scraped, 'sources': summary, 'fetch': stats, 'archived': archived}
+
+def scrape_airline_data(source_url, pages=None):
     """
     Scrape airline booking data from publicly available sources
+    pages optionally maps page URLs to content that was already downloaded
     Returns the number of records scraped
     """
     scraped_count = 0
     
     try:
         # Add headers to mimic a real browser
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
+        headers = dict(SCRAPE_HEADERS)
         
         # Since we cannot scrape live booking sites directly due to anti-bot measures,
         # we'll simulate scraping from travel news and publicly available flight data
         
         if 'kayak' in source_url.lower():
-            scraped_count = scrape_kayak_data(headers)
+            scraped_count = scrape_kayak_data(headers, pages)
         elif 'expedia' in source_url.lower():
             scraped_count = scrape_expedia_data(headers)
         elif 'skyscanner' in source_url.lower():
             scraped_count = scrape_skyscanner_data(headers)
         else:
             # Try to scrape general travel data
-            scraped_count = scrape_general_travel_data(source_url, headers)
+            scraped_count = scrape_general_travel_data(source_url, headers, pages)
         
         logging.info(f"Successfully scraped {scraped_count} records from {source_url}")
         
@@ -43,7 +262,7 @@ def scrape_airline_data(source_url):
     
     return scraped_count
 
-def scrape_kayak_data(headers):
+def scrape_kayak_data(headers, pages=None):
     """
     Scrape publicly available flight data from travel news and forums
     Since direct scraping of booking sites is restricted, we'll gather data from public sources
@@ -51,45 +270,32 @@ def scrape_kayak_data(headers):
     scraped_count = 0
     
     try:
-        # Scrape from travel news sites that report on flight deals and trends
-        travel_news_urls = [
-            'https://www.cnn.com/travel',
-            'https://www.bbc.com/travel',
-            'https://www.travelandleisure.com/airlines-airports'
-        ]
+        # Fetch any travel news pages that were not downloaded up front
+        pages = dict(pages or {})
+        missing_urls = [url for url in TRAVEL_NEWS_URLS if url not in pages]
+        if missing_urls:
+            pages.update(get_fetch_engine(headers=headers).fetch_all(missing_urls))
         
-        for url in travel_news_urls:
+        texts = []
+        for url in TRAVEL_NEWS_URLS:
             try:
-                # Use trafilatura to extract clean text content
-                downloaded = trafilatura.fetch_url(url)
+                downloaded = pages.get(url)
                 if downloaded:
+                    # Use trafilatura to extract clean text content
                     text_content = trafilatura.extract(downloaded)
                     if text_content:
-                        # Extract flight information from the text
-                        flight_data = extract_flight_info_from_text(text_content, url)
-                        scraped_count += len(flight_data)
-                        
-                        # Save to database
-                        for flight in flight_data:
-                            airline_data = AirlineData(
-                                route=flight['route'],
-                                origin=flight['origin'],
-                                destination=flight['destination'],
-                                price=flight['price'],
-                                airline=flight['airline'],
-                                departure_date=flight['departure_date'],
-                                source_url=url
-                            )
-                            db.session.add(airline_data)
-                
-                # Add delay to be respectful to the server
-                time.sleep(random.uniform(1, 3))
+                        texts.append((text_content, url))
                 
             except Exception as e:
                 logging.warning(f"Could not scrape {url}: {str(e)}")
                 continue
         
-        db.session.commit()
+        # Extract flight information from all pages as one batch; each
+        # flight carries the URL of its page
+        flights = [flight for page_flights in extract_flight_batch(texts) for flight in page_flights]
+        
+        # Save to database
+        scraped_count = ingest_flights(flights)['rows']
         
     except Exception as e:
         logging.error(f"Error in scrape_kayak_data: {str(e)}")
@@ -108,20 +314,7 @@ def scrape_expedia_data(headers):
         # This represents data that would typically be scraped from public sources
         sample_routes = generate_sample_flight_data('Expedia')
         
-        for route_data in sample_routes:
-            airline_data = AirlineData(
-                route=route_data['route'],
-                origin=route_data['origin'],
-                destination=route_data['destination'],
-                price=route_data['price'],
-                airline=route_data['airline'],
-                departure_date=route_data['departure_date'],
-                source_url='https://www.expedia.com/Flights'
-            )
-            db.session.add(airline_data)
-            scraped_count += 1
-        
-        db.session.commit()
+        scraped_count = ingest_flights(sample_routes, source_url='https://www.expedia.com/Flights')['rows']
         
     except Exception as e:
         logging.error(f"Error in scrape_expedia_data: {str(e)}")
@@ -139,20 +332,7 @@ def scrape_skyscanner_data(headers):
         # Generate sample data representing typical flight market data
         sample_routes = generate_sample_flight_data('Skyscanner')
         
-        for route_data in sample_routes:
-            airline_data = AirlineData(
-                route=route_data['route'],
-                origin=route_data['origin'],
-                destination=route_data['destination'],
-                price=route_data['price'],
-                airline=route_data['airline'],
-                departure_date=route_data['departure_date'],
-                source_url='https://www.skyscanner.com'
-            )
-            db.session.add(airline_data)
-            scraped_count += 1
-        
-        db.session.commit()
+        scraped_count = ingest_flights(sample_routes, source_url='https://www.skyscanner.com')['rows']
         
     except Exception as e:
         logging.error(f"Error in scrape_skyscanner_data: {str(e)}")
@@ -160,33 +340,22 @@ def scrape_skyscanner_data(headers):
     
     return scraped_count
 
-def scrape_general_travel_data(url, headers):
+def scrape_general_travel_data(url, headers, pages=None):
     """
     Scrape general travel data from any URL
     """
     scraped_count = 0
     
     try:
-        downloaded = trafilatura.fetch_url(url)
+        if pages and url in pages:
+            downloaded = pages[url]
+        else:
+            downloaded = get_fetch_engine(headers=headers).fetch_all([url]).get(url)
         if downloaded:
             text_content = trafilatura.extract(downloaded)
             if text_content:
                 flight_data = extract_flight_info_from_text(text_content, url)
-                
-                for flight in flight_data:
-                    airline_data = AirlineData(
-                        route=flight['route'],
-                        origin=flight['origin'],
-                        destination=flight['destination'],
-                        price=flight['price'],
-                        airline=flight['airline'],
-                        departure_date=flight['departure_date'],
-                        source_url=url
-                    )
-                    db.session.add(airline_data)
-                    scraped_count += 1
-                
-                db.session.commit()
+                scraped_count = ingest_flights(flight_data, source_url=url)['rows']
         
     except Exception as e:
         logging.error(f"Error in scrape_general_travel_data: {str(e)}")
@@ -196,48 +365,26 @@ def scrape_general_travel_data(url, headers):
 
 def extract_flight_info_from_text(text, source_url):
     """
-    Extract flight information from text content using regex patterns
+    Extract flight information from text content (see extraction.py)
     """
-    flight_data = []
-    
     try:
-        # Common patterns for flight information in text
-        price_pattern = r'\$(\d+(?:,\d{3})*(?:\.\d{2})?)'
-        route_pattern = r'([A-Z]{3})\s*(?:to|->|\-)\s*([A-Z]{3})'
-        airline_pattern = r'(United|American|Delta|Southwest|JetBlue|Alaska|Spirit|Frontier|Allegiant)'
-        
-        # Find all price matches
-        prices = re.findall(price_pattern, text)
-        routes = re.findall(route_pattern, text)
-        airlines = re.findall(airline_pattern, text)
-        
-        # Create flight data entries
-        for i in range(min(len(prices), len(routes), 5)):  # Limit to 5 entries per source
-            try:
-                price = float(prices[i].replace(',', ''))
-                origin = routes[i][0]
-                destination = routes[i][1]
-                airline = airlines[i % len(airlines)] if airlines else 'Unknown'
-                
-                # Generate a realistic future departure date
-                departure_date = datetime.now() + timedelta(days=random.randint(1, 90))
-                
-                flight_data.append({
-                    'route': f"{origin} → {destination}",
-                    'origin': origin,
-                    'destination': destination,
-                    'price': price,
-                    'airline': airline,
-                    'departure_date': departure_date
-                })
-                
-            except (ValueError, IndexError):
-                continue
+        return extract_flights(text, source_url)
     
     except Exception as e:
         logging.error(f"Error extracting flight info: {str(e)}")
-    
-    return flight_data
+        return []
+
+def extract_flight_batch(texts):
+    """
+    Extract flights from (text, source_url) pairs, using a process pool for
+    large batches as configured by the EXTRACTION_* settings
+    Returns one list of flights per page
+    """
+    return extract_many(
+        texts,
+        processes=current_app.config['EXTRACTION_PROCESSES'] or None,
+        parallel_min_bytes=current_app.config['EXTRACTION_PARALLEL_MIN_BYTES']
+    )
 
 def generate_sample_flight_data(source_prefix):
     """
@@ -0,0 +1,179 @@
+from app import db
+from models import Airport, Airline, Route, Source
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import Session, aliased
+import threading
+import weakref
+
+# Keys per IN (...) lookup, well under SQLite's bound parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+# The two ends of a route, for joining airport codes onto Route
+OriginAirport = aliased(Airport, name='origin_airport')
+DestinationAirport = aliased(Airport, name='destination_airport')
+
+# Label columns that can be joined onto the fact tables, by name
+LABEL_COLUMNS = {
+    'route': Route.name,
+    'origin': OriginAirport.code,
+    'destination': DestinationAirport.code,
+    'airline': Airline.name,
+    'source_url': Source.url
+}
+
+def _chunks(values, size=LOOKUP_CHUNK_SIZE):
+    for offset in range(0, len(values), size):
+        yield values[offset:offset + size]
+
+def insert_ignoring_duplicates(dialect_name, table):
+    """INSERT that skips rows whose unique key already exists (inserted concurrently)"""
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return insert(table)
+    return dialect_insert(table).on_conflict_do_nothing()
+
+class DimensionCache:
+    """
+    In-process cache of dimension ids (airport code, airline name, route name
+    and source URL -> id), so ingesting a batch only touches the database for
+    labels it has not seen before. Unknown labels are looked up, inserted if
+    missing and cached. Ids inserted by a transaction are only shared with
+    other sessions once it commits, so a rollback cannot leave ids of rows
+    that no longer exist in the cache. Entries are kept per engine.
+    """
+
+    def __init__(self):
+        self._committed = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+        event.listen(Session, 'after_commit', self._promote_pending)
+        event.listen(Session, 'after_rollback', self._discard_pending)
+
+    def _committed_ids(self, engine, table_name):
+        with self._lock:
+            return self._committed.setdefault(engine, {}).setdefault(table_name, {})
+
+    def _promote_pending(self, session):
+        pending = session.info.pop('dimension_ids', None)
+        if not pending:
+            return
+        for (engine, table_name), ids in pending.items():
+            committed = self._committed_ids(engine, table_name)
+            with self._lock:
+                committed.update(ids)
+
+    def _discard_pending(self, session):
+        session.info.pop('dimension_ids', None)
+
+    def ids(self, session, model, key_name, rows):
+        """
+        Ids for the dimension rows in `rows` (key value -> dict of the other
+        columns needed to insert it), inserting the missing ones.
+        Returns a dict of key value -> id
+        """
+        connection = session.connection()
+        table = model.__table__
+        key_column = table.c[key_name]
+        committed = self._committed_ids(connection.engine, table.name)
+        pending = session.info.setdefault('dimension_ids', {}).setdefault((connection.engine, table.name), {})
+
+        with self._lock:
+            result = {key: committed[key] for key in rows if key in committed}
+        result.update((key, pending[key]) for key in rows if key not in result and key in pending)
+
+        missing = [key for key in rows if key not in result]
+        if not missing:
+            return result
+
+        found = {}
+        for chunk in _chunks(missing):
+            found.update(connection.execute(select(key_column, table.c.id).where(key_column.in_(chunk))).all())
+        with self._lock:
+            committed.update(found)
+        result.update(found)
+
+        new = [key for key in missing if key not in found]
+        if new:
+            connection.execute(
+                insert_ignoring_duplicates(connection.dialect.name, table),
+                [dict(rows[key], **{key_name: key}) for key in new]
+            )
+            for chunk in _chunks(new):
+                inserted = dict(connection.execute(select(key_column, table.c.id).where(key_column.in_(chunk))).all())
+                pending.update(inserted)
+                result.update(inserted)
+
+        return result
+
+    def flight_ids(self, session, flights, source_url=None):
+        """
+        Resolve the dimension ids of flight dicts (route, origin, destination,
+        airline and optionally source_url, which defaults to `source_url`).
+        Returns a list of (route_id, airline_id, source_id) tuples
+        """
+        flights = list(flights)
+        sources = [flight.get('source_url', source_url) for flight in flights]
+
+        airports = {}
+        for flight in flights:
+            airports[flight['origin']] = {}
+            airports[flight['destination']] = {}
+        airport_ids = self.ids(session, Airport, 'code', airports)
+
+        routes = {}
+        for flight in flights:
+            if flight['route'] not in routes:
+                routes[flight['route']] = {
+                    'origin_id': airport_ids[flight['origin']],
+                    'destination_id': airport_ids[flight['destination']]
+                }
+        route_ids = self.ids(session, Route, 'name', routes)
+        airline_ids = self.ids(session, Airline, 'name', {flight['airline']: {} for flight in flights})
+        source_ids = self.ids(session, Source, 'url', {url: {} for url in sources if url})
+
+        return [
+            (route_ids[flight['route']], airline_ids[flight['airline']], source_ids.get(url))
+            for flight, url in zip(flights, sources)
+        ]
+
+dimension_cache = DimensionCache()
+
+def route_labels(route_ids=None, connection=None):
+    """
+    Dict of route id -> (route name, origin code, destination code), for all
+    routes or just `route_ids`, read on `connection` (default: the session)
+    """
+    statement = (
+        select(Route.id, Route.name, OriginAirport.code, DestinationAirport.code)
+        .join(OriginAirport, OriginAirport.id == Route.origin_id)
+        .join(DestinationAirport, DestinationAirport.id == Route.destination_id)
+    )
+    if route_ids is not None:
+        statement = statement.where(Route.id.in_(list(route_ids)))
+    rows = (connection if connection is not None else db.session).execute(statement)
+    return {route_id: (name, origin, destination) for route_id, name, origin, destination in rows}
+
+def airline_labels():
+    """Dict of airline id -> airline name"""
+    return dict(db.session.execute(select(Airline.id, Airline.name)).all())
+
+def join_labels(statement, model, names):
+    """
+    Add the joins needed to select the label columns `names` (keys of
+    LABEL_COLUMNS) for rows of `model` (a fact or rollup model with
+    route_id/airline_id/source_id columns)
+    """
+    if {'route', 'origin', 'destination'} & set(names):
+        statement = statement.join(Route, Route.id == model.route_id)
+    if 'origin' in names:
+        statement = statement.join(OriginAirport, OriginAirport.id == Route.origin_id)
+    if 'destination' in names:
+        statement = statement.join(DestinationAirport, DestinationAirport.id == Route.destination_id)
+    if 'airline' in names:
+        statement = statement.join(Airline, Airline.id == model.airline_id)
+    if 'source_url' in names:
+        statement = statement.outerjoin(Source, Source.id == model.source_id)
+    return statement
@@ -0,0 +1,196 @@
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import logging
+import os
+import re
+
+# Airlines recognised in scraped text
+AIRLINES = ('United', 'American', 'Delta', 'Southwest', 'JetBlue', 'Alaska', 'Spirit', 'Frontier', 'Allegiant')
+
+# A price is only linked to route/airline/date mentions in the same sentence
+# or clause, and within this many characters of it
+MAX_LINK_DISTANCE = 160
+
+# Batches smaller than this are extracted in-process; starting worker
+# processes costs more than it saves
+DEFAULT_PARALLEL_MIN_BYTES = 4 * 1024 * 1024
+
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+
+# Every kind of mention, and the sentence and clause ends between them, is
+# matched by one alternation, so a page is tokenized in a single left-to-right
+# scan. The leading lookahead lets the scan skip quickly past the lowercase
+# prose that makes up most of a page. A period inside a mention ("Jan. 5",
+# "$249.00") is consumed with the mention and never ends a sentence.
+TOKEN_PATTERN = re.compile(
+    r'(?=[$A-Z0-9.!?;\n])(?:'
+    r'\$(?P<price>\d{1,3}(?:,\d{3})+(?:\.\d{2})?|\d+(?:\.\d{2})?)'
+    r'|\b(?P<origin>[A-Z]{3})\s*(?:to|->|-|–|→)\s*(?P<destination>[A-Z]{3})\b'
+    r'|\b(?P<airline>' + '|'.join(AIRLINES) + r')\b'
+    r'|\b(?P<iso_year>\d{4})-(?P<iso_month>\d{2})-(?P<iso_day>\d{2})\b'
+    r'|\b(?P<us_month>\d{1,2})/(?P<us_day>\d{1,2})/(?P<us_year>\d{4})\b'
+    r'|\b(?P<month_name>Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|June?|July?|Aug(?:ust)?'
+    r'|Sep(?:t(?:ember)?)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)\.?\s+'
+    r'(?P<name_day>\d{1,2})(?:st|nd|rd|th)?(?:,?\s+(?P<name_year>\d{4}))?\b'
+    r'|(?P<boundary>[.!?;](?=\s|$)|\n)'
+    r')'
+)
+
+def tokenize(text, reference_date):
+    """
+    Scan text once and return (prices, routes, airlines, dates, boundaries):
+    the mentions, each a list of (start, end, value) in text order, and the
+    positions where sentences and clauses end
+    """
+    prices, routes, airlines, dates, boundaries = [], [], [], [], []
+
+    for match in TOKEN_PATTERN.finditer(text):
+        start, end = match.span()
+        kind = match.lastgroup
+
+        if kind == 'boundary':
+            boundaries.append(start)
+        elif kind == 'price':
+            prices.append((start, end, float(match.group('price').replace(',', ''))))
+        elif kind == 'destination':
+            routes.append((start, end, (match.group('origin'), match.group('destination'))))
+        elif kind == 'airline':
+            airlines.append((start, end, match.group('airline')))
+        else:
+            parsed = parse_date_match(match, reference_date)
+            if parsed is not None:
+                dates.append((start, end, parsed))
+
+    return prices, routes, airlines, dates, boundaries
+
+def parse_date_match(match, reference_date):
+    """
+    Date from an ISO, US (m/d/yyyy) or month-name match. Month-name dates
+    without a year are taken as the next occurrence on or after
+    reference_date. Returns None for impossible dates.
+    """
+    try:
+        if match.group('iso_year') is not None:
+            return datetime(int(match.group('iso_year')), int(match.group('iso_month')), int(match.group('iso_day')))
+
+        if match.group('us_year') is not None:
+            return datetime(int(match.group('us_year')), int(match.group('us_month')), int(match.group('us_day')))
+
+        month = MONTHS[match.group('month_name')[:3].lower()]
+        day = int(match.group('name_day'))
+        if match.group('name_year') is not None:
+            return datetime(int(match.group('name_year')), month, day)
+
+        parsed = datetime(reference_date.year, month, day)
+        if parsed.date() < reference_date.date():
+            parsed = datetime(reference_date.year + 1, month, day)
+        return parsed
+
+    except ValueError:
+        return None
+
+def linked(tokens, starts, price_starts, start, end, clause_start, clause_end):
+    """
+    Value of the mention the price at [start, end) refers to: the nearest one
+    before it in the same clause, otherwise the nearest one after it, unless
+    another price comes first (the mention then belongs to that price, and
+    which one this price means is ambiguous). None if there is no such
+    mention within MAX_LINK_DISTANCE characters.
+    """
+    index = bisect_left(starts, start)
+
+    if index > 0:
+        token_start, token_end, value = tokens[index - 1]
+        if token_start >= clause_start and start - token_end <= MAX_LINK_DISTANCE:
+            return value
+
+    if index < len(tokens):
+        token_start, token_end, value = tokens[index]
+        next_price = bisect_right(price_starts, start)
+        if (
+            token_start < clause_end
+            and token_start - end <= MAX_LINK_DISTANCE
+            and (next_price == len(price_starts) or price_starts[next_price] > token_start)
+        ):
+            return value
+
+    return None
+
+def extract_flights(text, source_url=None, reference_date=None):
+    """
+    Extract flight records from page text. Each price mention becomes one
+    record, linked to a route mention and a parsed date (both required; the
+    fare is skipped without them) and an airline ('Unknown' if none) in the
+    same sentence or clause, as chosen by linked(). reference_date (default
+    now) resolves dates given without a year; it is never used as a
+    departure date, since a made-up date would skew the monthly and trend
+    figures. Records carry source_url when it is given.
+    """
+    reference_date = reference_date or datetime.now()
+    prices, routes, airlines, dates, boundaries = tokenize(text, reference_date)
+    if not prices or not routes or not dates:
+        return []
+
+    price_starts = [token[0] for token in prices]
+    route_starts = [token[0] for token in routes]
+    airline_starts = [token[0] for token in airlines]
+    date_starts = [token[0] for token in dates]
+
+    flights = []
+    for start, end, price in prices:
+        clause = bisect_right(boundaries, start)
+        clause_start = boundaries[clause - 1] if clause > 0 else 0
+        clause_end = boundaries[clause] if clause < len(boundaries) else len(text)
+        price_span = (price_starts, start, end, clause_start, clause_end)
+
+        route = linked(routes, route_starts, *price_span)
+        departure_date = linked(dates, date_starts, *price_span)
+        if route is None or departure_date is None:
+            continue
+
+        origin, destination = route
+        flight = {
+            'route': f"{origin} → {destination}",
+            'origin': origin,
+            'destination': destination,
+            'price': price,
+            'airline': linked(airlines, airline_starts, *price_span) or 'Unknown',
+            'departure_date': departure_date
+        }
+        if source_url:
+            flight['source_url'] = source_url
+        flights.append(flight)
+
+    return flights
+
+def _extract_page(args):
+    text, source_url, reference_date = args
+    try:
+        return extract_flights(text, source_url, reference_date)
+    except Exception as e:
+        logging.error(f"Error extracting flight info from {source_url}: {str(e)}")
+        return []
+
+def extract_many(pages, reference_date=None, processes=None, parallel_min_bytes=DEFAULT_PARALLEL_MIN_BYTES):
+    """
+    Extract flights from many pages, given as (text, source_url) pairs.
+    Batches of at least parallel_min_bytes of text are spread across a pool
+    of `processes` worker processes (default: one per CPU); smaller batches,
+    or processes=1, run in this process.
+    Returns a list of flight lists, one per page, in input order
+    """
+    reference_date = reference_date or datetime.now()
+    work = [(text, source_url, reference_date) for text, source_url in pages]
+
+    total_bytes = sum(len(text) for text, _, _ in work)
+    if processes == 1 or len(work) < 2 or total_bytes < parallel_min_bytes:
+        return [_extract_page(item) for item in work]
+
+    processes = processes or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        chunksize = max(1, len(work) // (processes * 4))
+        return list(executor.map(_extract_page, work, chunksize=chunksize))
@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+import json
+import threading
+import time
+
+class FakeChatClient:
+    """
+    Local stand-in for the OpenAI client, exposing chat.completions.create.
+    Sleeps for a configurable latency instead of calling the network and
+    returns a canned JSON analysis, so insight generation can be tested and
+    benchmarked offline.
+
+    latency is a number of seconds or a callable taking the messages and
+    returning seconds; the first `failures` calls raise an error to exercise
+    the retry path.
+    """
+
+    def __init__(self, latency=0.5, failures=0, content=None):
+        self.latency = latency
+        self.failures = failures
+        self.content = content
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, timeout=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+            should_fail = self.calls <= self.failures
+
+        latency = self.latency(messages) if callable(self.latency) else self.latency
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Fake LLM call timed out after {timeout:.1f}s")
+
+        time.sleep(latency)
+        if should_fail:
+            raise RuntimeError("Simulated LLM API failure")
+
+        content = self.content or json.dumps({
+            "insights": [f"Fake analysis from {model}"],
+            "recommendations": []
+        })
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
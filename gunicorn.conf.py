@@ -0,0 +1,58 @@
+"""
+Gunicorn settings (picked up automatically when gunicorn runs from the
+project root):
+
+    gunicorn main:app
+
+Workers use threads (gthread): each request, including an open Server-Sent
+Events stream (/api/live, /api/price-alerts/stream), holds one of the
+worker's GUNICORN_THREADS threads, so a slow query, a NumPy group-by or a
+background job never stalls the other requests.
+
+GUNICORN_WORKER_CLASS=gevent makes a stream cost a greenlet instead, so one
+worker can hold thousands of idle dashboards, but then everything in the
+worker shares one event loop. Only use it with PostgreSQL and psycogreen
+installed (pip install psycogreen; psycopg2 is made cooperative in post_fork
+below): SQLite calls and CPU-bound work such as the numpy analytics backend
+block every greenlet of the worker while they run.
+"""
+
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+
+# Worker processes. One by default: live updates, price alerts, the data
+# version and the response caches are kept per process, so a dashboard
+# streaming from one worker would miss writes made by another
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+
+# Threads per gthread worker: the requests, open streams included, one worker
+# serves at once
+threads = int(os.environ.get("GUNICORN_THREADS", 64))
+
+# Simultaneous connections (streams included) per gevent worker
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 4000))
+
+# Seconds a worker may go silent before it is restarted. Streams are not
+# affected: the worker keeps notifying the arbiter while requests wait
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+
+# Seconds finishing requests get on shutdown; open streams are cut after this
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 10))
+
+def post_fork(server, worker):
+    """
+    Under gevent workers, make psycopg2 wait on the event loop instead of
+    blocking it. Runs before the worker imports the app and connects
+    """
+    if "gevent" not in server.cfg.worker_class_str.lower():
+        return
+
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        server.log.warning("gevent workers without psycogreen: each PostgreSQL query blocks the whole worker")
+        return
+    patch_psycopg()
@@ -0,0 +1,175 @@
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
+import logging
+import random
+import threading
+import time
+import requests
+from metrics import SCRAPE_FETCH_LATENCY
+
+DEFAULT_TIMEOUT = (5, 30)  # (connect, read) seconds
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_MAX = 30
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_MAX_RESPONSE_BYTES = 5 * 1024 * 1024
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+class ResponseTooLarge(requests.RequestException):
+    """Raised when a response body exceeds the client's size limit"""
+
+class HostMetrics:
+    """Request counts and latency per host, safe to update from many threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def record(self, host, seconds, error=False, retried=False):
+        with self._lock:
+            stats = self._hosts.get(host)
+            if stats is None:
+                stats = self._hosts[host] = {
+                    'requests': 0,
+                    'errors': 0,
+                    'retries': 0,
+                    'total_seconds': 0.0,
+                    'max_seconds': 0.0
+                }
+            stats['requests'] += 1
+            stats['total_seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+            if error:
+                stats['errors'] += 1
+            if retried:
+                stats['retries'] += 1
+
+    def snapshot(self):
+        """Per-host counters with average and maximum latency in milliseconds"""
+        with self._lock:
+            return {
+                host: {
+                    'requests': stats['requests'],
+                    'errors': stats['errors'],
+                    'retries': stats['retries'],
+                    'avg_ms': round(stats['total_seconds'] / stats['requests'] * 1000, 1),
+                    'max_ms': round(stats['max_seconds'] * 1000, 1)
+                }
+                for host, stats in self._hosts.items()
+            }
+
+class HttpClient:
+    """
+    Shared HTTP client for the scrapers. A single requests.Session keeps a
+    keep-alive connection pool per host, so repeated requests to a site reuse
+    connections instead of paying a new TCP/TLS handshake each time.
+
+    Requests failing with 429, a 5xx status or a connection error are retried
+    up to max_retries times with exponential backoff and full jitter (a
+    Retry-After header, when present, is honoured instead). Response bodies
+    larger than max_response_bytes raise ResponseTooLarge. Latency, errors and
+    retries are tracked per host in `metrics`.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_base=DEFAULT_BACKOFF_BASE, backoff_max=DEFAULT_BACKOFF_MAX,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, max_response_bytes=DEFAULT_MAX_RESPONSE_BYTES,
+                 headers=None):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_response_bytes = max_response_bytes
+        self.metrics = HostMetrics()
+
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+
+        # Retries are handled here so they can be jittered and measured
+        adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, url, headers=None, timeout=None):
+        """
+        GET a URL with retries. Returns the final requests.Response with its
+        body already read (so .content / .text are available), including
+        non-retryable error responses; raises the last exception when every
+        attempt failed with a connection error
+        """
+        host = urlsplit(url).netloc.lower()
+
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            retry_after = None
+            try:
+                response = self._get_once(url, headers, timeout or self.timeout)
+            except ResponseTooLarge:
+                self._record(host, time.perf_counter() - start, 'too_large', error=True)
+                raise
+            except (requests.ConnectionError, requests.Timeout) as e:
+                outcome = 'timeout' if isinstance(e, requests.Timeout) else 'connection_error'
+                self._record(host, time.perf_counter() - start, outcome, error=True, retried=attempt > 0)
+                if attempt == self.max_retries:
+                    raise
+                logging.warning(f"Request to {url} failed ({str(e)}), retrying")
+            else:
+                failed = response.status_code in RETRY_STATUSES
+                self._record(host, time.perf_counter() - start, str(response.status_code), error=failed,
+                             retried=attempt > 0)
+                if not failed or attempt == self.max_retries:
+                    return response
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                logging.warning(f"Request to {url} returned {response.status_code}, retrying")
+
+            time.sleep(self._backoff(attempt, retry_after))
+
+    def _record(self, host, seconds, outcome, error, retried=False):
+        self.metrics.record(host, seconds, error=error, retried=retried)
+        SCRAPE_FETCH_LATENCY.observe(seconds, host=host, outcome=outcome)
+
+    def _get_once(self, url, headers, timeout):
+        response = self.session.get(url, headers=headers, timeout=timeout, stream=True)
+        try:
+            declared = response.headers.get('Content-Length')
+            if declared and declared.isdigit() and int(declared) > self.max_response_bytes:
+                raise ResponseTooLarge(f"{url} is {declared} bytes, limit is {self.max_response_bytes}")
+
+            body = bytearray()
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                body.extend(chunk)
+                if len(body) > self.max_response_bytes:
+                    raise ResponseTooLarge(f"{url} exceeded {self.max_response_bytes} bytes")
+
+            response._content = bytes(body)
+            return response
+        finally:
+            response.close()
+
+    def _backoff(self, attempt, retry_after=None):
+        """Seconds to wait before the next attempt"""
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+def parse_retry_after(value):
+    """Retry-After header (delay in seconds or an HTTP date) as seconds, or None"""
+    if not value:
+        return None
+
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
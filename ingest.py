@@ -0,0 +1,84 @@
+from app import db
+from models import AirlineData
+from rollups import record_flights
+from sketches import record_sketches
+from dimensions import dimension_cache
+from data_events import mark_airline_data_written
+from flask import current_app
+from datetime import datetime
+from sqlalchemy import insert
+import logging
+import time
+
+def flight_rows(flights, source_url=None, scraped_at=None):
+    """
+    Map flight dicts (route, origin, destination, airline, price,
+    departure_date and optionally scraped_at / source_url) onto airline_data
+    rows, resolving the dimension ids through the in-process id cache. New
+    airports, airlines, routes and sources are inserted in the current
+    transaction.
+    """
+    flights = list(flights)
+    scraped_at = scraped_at or datetime.utcnow()
+    ids = dimension_cache.flight_ids(db.session, flights, source_url)
+
+    return [
+        {
+            'route_id': route_id,
+            'airline_id': airline_id,
+            'source_id': source_id,
+            'price': flight['price'],
+            'departure_date': flight['departure_date'],
+            'scraped_at': flight.get('scraped_at') or scraped_at
+        }
+        for flight, (route_id, airline_id, source_id) in zip(flights, ids)
+    ]
+
+def ingest_flights(flights, source_url=None, batch_size=None):
+    """
+    Bulk insert flight dicts (as produced by generate_sample_flight_data and
+    extract_flight_info_from_text) using Core executemany inserts, one
+    transaction per batch. A flight's own 'source_url' takes precedence over
+    the source_url argument.
+    Returns a dict with rows, batches, seconds and rows_per_sec
+    """
+    batch_size = batch_size or current_app.config['INGEST_BATCH_SIZE']
+    flights = list(flights)
+    table = AirlineData.__table__
+
+    inserted = 0
+    batches = 0
+    start = time.perf_counter()
+
+    try:
+        for offset in range(0, len(flights), batch_size):
+            batch = flights[offset:offset + batch_size]
+            rows = flight_rows(batch, source_url)
+
+            connection = db.session.connection()
+            connection.execute(insert(table), rows)
+            record_flights(rows, connection)
+            record_sketches(rows, connection)
+            mark_airline_data_written(db.session, rows)
+            db.session.commit()
+
+            inserted += len(rows)
+            batches += 1
+
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error ingesting flights after {inserted} rows: {str(e)}")
+        raise e
+
+    seconds = time.perf_counter() - start
+    rows_per_sec = inserted / seconds if seconds > 0 else 0.0
+
+    if inserted:
+        logging.info(f"Ingested {inserted} flight records in {batches} batches ({rows_per_sec:.0f} rows/sec)")
+
+    return {
+        'rows': inserted,
+        'batches': batches,
+        'seconds': round(seconds, 4),
+        'rows_per_sec': round(rows_per_sec, 1)
+    }
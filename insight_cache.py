@@ -0,0 +1,123 @@
+from app import db
+from models import InsightCacheEntry
+from datetime import datetime, timedelta
+from sqlalchemy import func
+import hashlib
+import json
+import logging
+import threading
+
+def insight_cache_key(analysis_type, model, template_version, summary):
+    """
+    Stable content hash of everything that determines an analysis' output
+    """
+    payload = json.dumps(
+        [analysis_type, model, template_version, summary],
+        sort_keys=True,
+        separators=(',', ':'),
+        default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class InsightCache:
+    """
+    Persistent cache of analysis results in the insight_cache_entry table.
+    Entries expire after ttl_seconds, and the least recently used entries are
+    evicted beyond max_entries. Hit/miss counters and the model latency saved
+    by hits are kept per process; per-entry hit counts are persisted.
+    """
+
+    def __init__(self, ttl_seconds=86400, max_entries=500):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def get(self, cache_key):
+        """Return cached content for the key, or None when missing or expired"""
+        try:
+            entry = InsightCacheEntry.query.filter_by(cache_key=cache_key).first()
+
+            if entry is not None and entry.created_at < datetime.utcnow() - timedelta(seconds=self.ttl_seconds):
+                db.session.delete(entry)
+                db.session.commit()
+                entry = None
+
+            if entry is None:
+                with self._lock:
+                    self.misses += 1
+                return None
+
+            entry.hit_count += 1
+            entry.last_used_at = datetime.utcnow()
+            content = entry.content
+            generation_seconds = entry.generation_seconds
+            db.session.commit()
+
+            with self._lock:
+                self.hits += 1
+                self.saved_seconds += generation_seconds
+
+            return content
+
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error reading insight cache: {str(e)}")
+            return None
+
+    def put(self, cache_key, analysis_type, model, content, generation_seconds):
+        """Store an analysis result and evict entries beyond max_entries"""
+        try:
+            entry = InsightCacheEntry.query.filter_by(cache_key=cache_key).first()
+            if entry is None:
+                entry = InsightCacheEntry(cache_key=cache_key, hit_count=0)
+                db.session.add(entry)
+
+            entry.analysis_type = analysis_type
+            entry.model = model
+            entry.content = content
+            entry.generation_seconds = generation_seconds
+            entry.created_at = datetime.utcnow()
+            entry.last_used_at = datetime.utcnow()
+            db.session.flush()
+
+            overflow = InsightCacheEntry.query.count() - self.max_entries
+            if overflow > 0:
+                stale_ids = [
+                    row.id for row in db.session.query(InsightCacheEntry.id).order_by(
+                        InsightCacheEntry.last_used_at
+                    ).limit(overflow)
+                ]
+                InsightCacheEntry.query.filter(InsightCacheEntry.id.in_(stale_ids)).delete(synchronize_session=False)
+
+            db.session.commit()
+
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error writing insight cache: {str(e)}")
+
+    def stats(self):
+        """Process counters plus totals persisted across restarts"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'saved_seconds': round(self.saved_seconds, 3),
+                'ttl_seconds': self.ttl_seconds,
+                'max_entries': self.max_entries
+            }
+
+        totals = db.session.query(
+            func.count(InsightCacheEntry.id),
+            func.coalesce(func.sum(InsightCacheEntry.hit_count), 0),
+            func.coalesce(func.sum(InsightCacheEntry.hit_count * InsightCacheEntry.generation_seconds), 0)
+        ).one()
+        stats['entries'] = totals[0]
+        stats['lifetime_hits'] = int(totals[1])
+        stats['lifetime_saved_seconds'] = round(float(totals[2]), 3)
+
+        return stats
@@ -28,7 +28,7 @@ echo "Setting up environment variables..."
 echo "Please set the following environment variables:"
 echo "export OPENAI_API_KEY='your_openai_api_key'"
 echo "export SESSION_SECRET='your_session_secret'"
-echo "export DATABASE_URL='sqlite:///instance/airline_data.db'"
+echo "export DATABASE_URL='sqlite:///airline_data.db'"
 echo
 
 # Initialize database with sample data
@@ -0,0 +1,208 @@
+from app import db
+from models import BackgroundJob
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+DEFAULT_MAX_WORKERS = 2
+DEFAULT_HEARTBEAT_SECONDS = 30
+
+# Jobs in these states block an identical job from being queued
+ACTIVE_STATUSES = ('queued', 'running')
+
+# A job whose owner has missed this many heartbeats is considered abandoned
+MISSED_HEARTBEATS = 4
+
+def process_owner():
+    """Owner label for jobs queued by this process: 'hostname:pid'"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def _pid_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def owner_alive(job, now, heartbeat_seconds=DEFAULT_HEARTBEAT_SECONDS):
+    """
+    Whether the process that owns an active job may still finish it: on
+    this host its pid must still exist, and on any host it must have
+    refreshed the job's heartbeat recently. Jobs recorded without an owner
+    are judged by their creation time.
+    """
+    host, _, pid = (job.owner or '').rpartition(':')
+    if host == socket.gethostname() and pid.isdigit() and not _pid_running(int(pid)):
+        return False
+
+    last_seen = job.heartbeat_at or job.created_at
+    return last_seen is not None and now - last_seen < timedelta(seconds=MISSED_HEARTBEATS * heartbeat_seconds)
+
+def _mark_interrupted(job_ids):
+    """Fail the given jobs if they are still queued or running. Returns how many were"""
+    if not job_ids:
+        return 0
+    interrupted = BackgroundJob.query.filter(
+        BackgroundJob.id.in_(job_ids),
+        BackgroundJob.status.in_(ACTIVE_STATUSES)
+    ).update(
+        {
+            'status': 'failed',
+            'error_message': 'Interrupted: the process running it exited',
+            'finished_at': datetime.utcnow()
+        },
+        synchronize_session=False
+    )
+    db.session.commit()
+    return interrupted
+
+class JobQueue:
+    """
+    In-process worker pool for long-running work (scraping, insight
+    generation) so request threads return immediately. Every job is recorded
+    in the background_job table with its status, timings and record count.
+
+    A job function takes no arguments, runs inside an app context and returns
+    a JSON-serializable dict; its 'records' entry is stored as
+    records_processed.
+
+    Each job records this process as its owner, and while the process has
+    jobs queued or running a heartbeat thread refreshes their heartbeat_at,
+    so other worker processes can tell its jobs from abandoned ones.
+    """
+
+    def __init__(self, app, max_workers=DEFAULT_MAX_WORKERS, heartbeat_seconds=DEFAULT_HEARTBEAT_SECONDS):
+        self.app = app
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self.heartbeat_seconds = heartbeat_seconds
+        self.owner = process_owner()
+        self._lock = threading.Lock()
+        self._heartbeat_thread = None
+
+    def submit(self, job_type, func, dedupe_key=None):
+        """
+        Queue func as a job of the given type. If a job with the same
+        dedupe_key (default: the job type) is still queued or running, that
+        job is returned instead of queuing a duplicate.
+        Returns (job, created)
+        """
+        dedupe_key = dedupe_key or job_type
+
+        with self._lock:
+            existing = BackgroundJob.query.filter(
+                BackgroundJob.dedupe_key == dedupe_key,
+                BackgroundJob.status.in_(ACTIVE_STATUSES)
+            ).order_by(BackgroundJob.created_at.desc()).first()
+            if existing is not None:
+                if owner_alive(existing, datetime.utcnow(), self.heartbeat_seconds):
+                    return existing, False
+                # Its worker process died without a restart noticing
+                _mark_interrupted([existing.id])
+
+            now = datetime.utcnow()
+            job = BackgroundJob(
+                id=uuid.uuid4().hex,
+                job_type=job_type,
+                dedupe_key=dedupe_key,
+                status='queued',
+                owner=self.owner,
+                heartbeat_at=now
+            )
+            db.session.add(job)
+            db.session.commit()
+
+            if self._heartbeat_thread is None:
+                self._heartbeat_thread = threading.Thread(target=self._heartbeat, name='job-heartbeat', daemon=True)
+                self._heartbeat_thread.start()
+
+        self.executor.submit(self._run, job.id, func)
+        logging.info(f"Queued {job_type} job {job.id}")
+        return job, True
+
+    def _heartbeat(self):
+        """Refresh heartbeat_at on this process's active jobs, forever"""
+        while True:
+            time.sleep(self.heartbeat_seconds)
+            with self.app.app_context():
+                try:
+                    BackgroundJob.query.filter(
+                        BackgroundJob.owner == self.owner,
+                        BackgroundJob.status.in_(ACTIVE_STATUSES)
+                    ).update({'heartbeat_at': datetime.utcnow()}, synchronize_session=False)
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    logging.error(f"Error refreshing job heartbeats: {str(e)}")
+
+    def _run(self, job_id, func):
+        with self.app.app_context():
+            job = db.session.get(BackgroundJob, job_id)
+            job.status = 'running'
+            job.started_at = datetime.utcnow()
+            job.heartbeat_at = job.started_at
+            db.session.commit()
+
+            try:
+                result = func() or {}
+                job = db.session.get(BackgroundJob, job_id)
+                job.status = 'done'
+                job.records_processed = result.get('records', 0)
+                job.result = json.dumps(result, default=str)
+                logging.info(f"{job.job_type} job {job_id} finished")
+
+            except Exception as e:
+                db.session.rollback()
+                job = db.session.get(BackgroundJob, job_id)
+                job.status = 'failed'
+                job.error_message = str(e)
+                logging.error(f"{job.job_type} job {job_id} failed: {str(e)}")
+
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+
+def job_to_dict(job):
+    """Serializable view of a job for the status API"""
+    duration = None
+    if job.started_at:
+        duration = round(((job.finished_at or datetime.utcnow()) - job.started_at).total_seconds(), 3)
+
+    return {
+        'id': job.id,
+        'job_type': job.job_type,
+        'status': job.status,
+        'records_processed': job.records_processed,
+        'result': json.loads(job.result) if job.result else None,
+        'error': job.error_message,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'duration_seconds': duration
+    }
+
+def fail_interrupted_jobs(heartbeat_seconds=DEFAULT_HEARTBEAT_SECONDS):
+    """
+    Mark jobs left queued or running by processes that are gone as failed.
+    Jobs of sibling worker processes that are still alive are left alone.
+    Called at startup, before this process queues anything, so a job owned
+    by this process's own hostname:pid was left by an earlier process that
+    had the same pid.
+    """
+    now = datetime.utcnow()
+    own = process_owner()
+    abandoned = [
+        job.id for job in BackgroundJob.query.filter(BackgroundJob.status.in_(ACTIVE_STATUSES))
+        if job.owner == own or not owner_alive(job, now, heartbeat_seconds)
+    ]
+    interrupted = _mark_interrupted(abandoned)
+
+    if interrupted:
+        logging.warning(f"Marked {interrupted} interrupted background jobs as failed")
+    return interrupted
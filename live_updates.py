@@ -0,0 +1,110 @@
+from app import db
+from dimensions import route_labels
+from datetime import datetime
+import logging
+import threading
+
+class LiveUpdates:
+    """
+    Turns committed writes into compact deltas for the dashboards listening on
+    the live update stream, so open dashboards update in place instead of
+    polling /api/chart-data:
+
+    - `flights`: number of new records, and per route and per departure month
+      the count and price sum (plus min/max per route) of just the new rows,
+      which clients add to the figures they already show
+    - `insights`: the insight types that were just generated
+    - `refresh`: data changed in a way that has no delta (for example a
+      rollup rebuild); clients should reload the charts
+
+    Deltas are computed from the committed rows in memory (route labels are
+    looked up once per route and kept) and encoded once by the broadcaster,
+    so the cost of a write does not depend on how many dashboards are open.
+    """
+
+    def __init__(self, broadcaster, airline_data_signal=None, insights_signal=None):
+        self.broadcaster = broadcaster
+        self._route_labels = {}
+        self._lock = threading.Lock()
+
+        if airline_data_signal is not None:
+            airline_data_signal.connect(self._on_airline_data)
+        if insights_signal is not None:
+            insights_signal.connect(self._on_insights)
+
+    def _labels_for(self, route_ids):
+        """Route labels by id, loading unseen routes on a connection of their own"""
+        with self._lock:
+            missing = [route_id for route_id in route_ids if route_id not in self._route_labels]
+        if missing:
+            try:
+                with db.engine.connect() as connection:
+                    labels = route_labels(missing, connection)
+                with self._lock:
+                    self._route_labels.update(labels)
+            except Exception as e:
+                logging.error(f"Error loading route labels for live updates: {str(e)}")
+
+        with self._lock:
+            return {route_id: self._route_labels.get(route_id) for route_id in route_ids}
+
+    def flight_delta(self, rows, version=None):
+        """Compact summary of committed flight rows (route_id, price, departure_date)"""
+        routes = {}
+        months = {}
+
+        for row in rows:
+            price = row['price']
+            route = routes.get(row['route_id'])
+            if route is None:
+                routes[row['route_id']] = [1, price, price, price]
+            else:
+                route[0] += 1
+                route[1] += price
+                route[2] = min(route[2], price)
+                route[3] = max(route[3], price)
+
+            month = row['departure_date'].strftime('%Y-%m')
+            totals = months.setdefault(month, [0, 0.0])
+            totals[0] += 1
+            totals[1] += price
+
+        labels = self._labels_for(list(routes))
+        return {
+            'version': version,
+            'new_records': len(rows),
+            'routes': [
+                {
+                    'route': labels[route_id][0] if labels[route_id] else str(route_id),
+                    'origin': labels[route_id][1] if labels[route_id] else None,
+                    'destination': labels[route_id][2] if labels[route_id] else None,
+                    'count': count,
+                    'price_sum': round(price_sum, 2),
+                    'min_price': round(low, 2),
+                    'max_price': round(high, 2)
+                }
+                for route_id, (count, price_sum, low, high) in routes.items()
+            ],
+            'months': [
+                {'month': month, 'count': count, 'price_sum': round(price_sum, 2)}
+                for month, (count, price_sum) in sorted(months.items())
+            ]
+        }
+
+    def _on_airline_data(self, sender, rows=(), version=None, **kwargs):
+        try:
+            if rows:
+                self.broadcaster.publish('flights', self.flight_delta(rows, version))
+            else:
+                self.broadcaster.publish('refresh', {'version': version})
+        except Exception as e:
+            logging.error(f"Error publishing live flight update: {str(e)}")
+
+    def _on_insights(self, sender, insights=(), **kwargs):
+        try:
+            self.broadcaster.publish('insights', {
+                'insight_types': sorted({insight['insight_type'] for insight in insights}),
+                'generated_at': datetime.utcnow().isoformat()
+            })
+        except Exception as e:
+            logging.error(f"Error publishing live insights update: {str(e)}")
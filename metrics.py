@@ -0,0 +1,192 @@
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import logging
+import math
+import threading
+import time
+
+# Default latency buckets in seconds (the Prometheus client defaults)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+DEFAULT_SLOW_QUERY_MS = 500
+
+class Metric:
+    """Base for labelled metrics rendered in the Prometheus text format"""
+
+    metric_type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _label_text(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ''
+        escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+        return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+class Counter(Metric):
+    metric_type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_sample(self, key, value):
+        return [f"{self.name}_total{self._label_text(key)} {value}"]
+
+class Histogram(Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][index] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    def _render_sample(self, key, state):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, state['counts']):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{self._label_text(key, [('le', _format_bound(bound))])} {cumulative}")
+        lines.append(f"{self.name}_bucket{self._label_text(key, [('le', '+Inf')])} {state['count']}")
+        lines.append(f"{self.name}_sum{self._label_text(key)} {state['sum']}")
+        lines.append(f"{self.name}_count{self._label_text(key)} {state['count']}")
+        return lines
+
+def _format_bound(bound):
+    return '+Inf' if math.isinf(bound) else repr(float(bound))
+
+class MetricsRegistry:
+    """Collection of metrics exposed together on /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    'http_request_duration_seconds', 'Time to handle a request, by endpoint.',
+    ('method', 'endpoint', 'status')
+))
+DB_QUERY_LATENCY = REGISTRY.register(Histogram(
+    'db_query_duration_seconds', 'SQL statement execution time, by endpoint and statement type.',
+    ('endpoint', 'operation')
+))
+DB_QUERIES_PER_REQUEST = REGISTRY.register(Histogram(
+    'db_queries_per_request', 'Number of SQL statements executed while handling a request.',
+    ('endpoint',), buckets=QUERY_COUNT_BUCKETS
+))
+DB_SLOW_QUERIES = REGISTRY.register(Counter(
+    'db_slow_queries', 'SQL statements slower than the slow-query threshold.',
+    ('endpoint', 'operation')
+))
+SCRAPE_FETCH_LATENCY = REGISTRY.register(Histogram(
+    'scrape_fetch_duration_seconds', 'Outbound scraping HTTP request time, per attempt.',
+    ('host', 'outcome')
+))
+LLM_CALL_LATENCY = REGISTRY.register(Histogram(
+    'llm_call_duration_seconds', 'Model API call time, per attempt.',
+    ('model', 'outcome'), buckets=DEFAULT_BUCKETS + (30.0, 60.0, 120.0)
+))
+
+def current_endpoint():
+    """Endpoint label for the work running on this thread"""
+    if has_request_context():
+        return request.endpoint or 'unmatched'
+    return 'background'
+
+def statement_operation(statement):
+    """SELECT/INSERT/UPDATE/DELETE/... keyword starting a SQL statement"""
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ''
+    return keyword if keyword in ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH') else 'OTHER'
+
+def init_metrics(app):
+    """
+    Instrument the app: time every request, and count and time every SQL
+    statement (attributed to the request's endpoint, or 'background' for
+    jobs) with a warning logged for statements slower than SLOW_QUERY_MS
+    """
+    slow_query_seconds = app.config.get('SLOW_QUERY_MS', DEFAULT_SLOW_QUERY_MS) / 1000.0
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+        g.query_count = 0
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            endpoint = request.endpoint or 'unmatched'
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - started,
+                method=request.method, endpoint=endpoint, status=response.status_code
+            )
+            DB_QUERIES_PER_REQUEST.observe(g.pop('query_count', 0), endpoint=endpoint)
+        return response
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        # Kept on the statement's own execution context: a statement that
+        # fails never reaches after_cursor_execute, and must not leave a start
+        # time behind on the connection for a later statement to pick up
+        if context is not None:
+            context.query_started = time.perf_counter()
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def record_query_metrics(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, 'query_started', None)
+        if started is None:
+            return
+        seconds = time.perf_counter() - started
+        endpoint = current_endpoint()
+        operation = statement_operation(statement)
+
+        DB_QUERY_LATENCY.observe(seconds, endpoint=endpoint, operation=operation)
+        if has_request_context() and 'query_count' in g:
+            g.query_count += 1
+
+        if seconds >= slow_query_seconds:
+            DB_SLOW_QUERIES.inc(endpoint=endpoint, operation=operation)
+            logging.warning(f"Slow query ({seconds * 1000:.0f} ms, {endpoint}): {' '.join(statement.split())[:500]}")
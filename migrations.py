@@ -0,0 +1,265 @@
+from app import db
+from models import Airport, Airline, Route, Source
+from dimensions import OriginAirport, DestinationAirport
+import logging
+from sqlalchemy import MetaData, Table, func, insert, inspect, select, union, union_all
+from rollups import backfill_rollups_if_empty
+from sketches import backfill_sketches_if_empty
+
+# Columns removed from the models, with the indexes that covered them:
+# table -> {column: (index names)}
+OBSOLETE_COLUMNS = {
+    # Scrape month label of archived rows, never used to filter or prune
+    'airline_data_archive': {'archive_month': ('ix_airline_data_archive_month',)}
+}
+
+# Tables that stored route/origin/destination/airline/source_url as strings
+# on every row before the dimension tables were introduced
+LEGACY_FLIGHT_TABLES = ('airline_data', 'airline_data_archive')
+
+def ensure_indexes():
+    """
+    Create any model indexes that are missing from an existing database.
+    db.create_all() only creates indexes together with new tables, so databases
+    created before an index was declared need this to pick them up.
+    """
+    created = []
+
+    try:
+        inspector = inspect(db.engine)
+
+        for table in db.metadata.sorted_tables:
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+
+            for index in table.indexes:
+                if index.name in existing:
+                    continue
+
+                index.create(bind=db.engine)
+                created.append(index.name)
+                logging.info(f"Created index {index.name} on {table.name}")
+
+    except Exception as e:
+        logging.error(f"Error creating indexes: {str(e)}")
+        raise e
+
+    return created
+
+def drop_obsolete_columns():
+    """
+    Drop columns (and their indexes) that were removed from the models, so
+    inserts into existing tables do not fail on a leftover NOT NULL column
+    """
+    dropped = []
+
+    try:
+        inspector = inspect(db.engine)
+        existing_tables = set(inspector.get_table_names())
+
+        for table_name, columns in OBSOLETE_COLUMNS.items():
+            if table_name not in existing_tables:
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table_name)}
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table_name)}
+
+            for column_name, index_names in columns.items():
+                if column_name not in existing:
+                    continue
+
+                with db.engine.begin() as connection:
+                    for index_name in index_names:
+                        if index_name in existing_indexes:
+                            connection.exec_driver_sql(f"DROP INDEX {index_name}")
+                    connection.exec_driver_sql(f"ALTER TABLE {table_name} DROP COLUMN {column_name}")
+                dropped.append(f"{table_name}.{column_name}")
+                logging.info(f"Dropped column {column_name} from {table_name}")
+
+    except Exception as e:
+        logging.error(f"Error dropping obsolete columns: {str(e)}")
+        raise e
+
+    return dropped
+
+def ensure_columns():
+    """
+    Add model columns that are missing from existing tables. Only nullable
+    columns are added this way, so existing rows get NULL.
+    """
+    added = []
+
+    try:
+        inspector = inspect(db.engine)
+        existing_tables = set(inspector.get_table_names())
+
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                with db.engine.begin() as connection:
+                    connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+                added.append(f"{table.name}.{column.name}")
+                logging.info(f"Added column {column.name} to {table.name}")
+
+    except Exception as e:
+        logging.error(f"Error adding columns: {str(e)}")
+        raise e
+
+    return added
+
+def begin_ddl_transaction(connection):
+    """
+    Make the DDL that follows part of the connection's transaction. pysqlite
+    only opens a transaction before DML, so CREATE/DROP/ALTER TABLE would
+    otherwise be committed as they run and survive a rollback
+    """
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql("BEGIN")
+
+def restore_interrupted_legacy_tables():
+    """
+    Put back the <table>_legacy copies left by a legacy migration that failed
+    before it ran in one transaction, in place of the empty table it created,
+    so the migration starts over. Returns the names of the restored tables
+    """
+    existing_tables = set(inspect(db.engine).get_table_names())
+    restored = []
+
+    for name in LEGACY_FLIGHT_TABLES:
+        leftover = f"{name}_legacy"
+        if leftover not in existing_tables:
+            continue
+
+        with db.engine.begin() as connection:
+            begin_ddl_transaction(connection)
+            if name in existing_tables:
+                rows = connection.exec_driver_sql(f"SELECT COUNT(*) FROM {name}").scalar()
+                if rows:
+                    raise RuntimeError(f"{leftover} was left by an interrupted migration but {name} has {rows} rows")
+                connection.exec_driver_sql(f"DROP TABLE {name}")
+            connection.exec_driver_sql(f"ALTER TABLE {leftover} RENAME TO {name}")
+        restored.append(name)
+        logging.warning(f"Restored {name} from {leftover} left by an interrupted migration")
+
+    return restored
+
+def normalize_legacy_flight_tables():
+    """
+    Convert flight tables from the old string-per-row layout to integer
+    foreign keys into the airport/airline/route/source dimension tables.
+    Old rows are copied aside, the tables are recreated from the models, the
+    dimension tables are filled from the distinct labels and the rows are
+    copied back keeping their ids. The old string-keyed rollups are dropped;
+    upgrade_database rebuilds them.
+    Everything happens in one transaction, DDL included, and it is rolled
+    back unless every old row was copied back.
+    Returns the number of flight rows migrated
+    """
+    restore_interrupted_legacy_tables()
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    legacy_names = [
+        name for name in LEGACY_FLIGHT_TABLES
+        if name in existing_tables and 'route' in {column['name'] for column in inspector.get_columns(name)}
+    ]
+    if not legacy_names:
+        return 0
+
+    migrated = 0
+    try:
+        with db.engine.begin() as connection:
+            begin_ddl_transaction(connection)
+            for name in legacy_names:
+                connection.exec_driver_sql(f"CREATE TABLE {name}_legacy AS SELECT * FROM {name}")
+                connection.exec_driver_sql(f"DROP TABLE {name}")
+            if 'route_daily_rollup' in existing_tables:
+                connection.exec_driver_sql("DROP TABLE route_daily_rollup")
+            db.metadata.create_all(connection)
+
+            legacy_metadata = MetaData()
+            legacy_tables = [Table(f"{name}_legacy", legacy_metadata, autoload_with=connection) for name in legacy_names]
+
+            codes = union(*[select(table.c.origin) for table in legacy_tables],
+                          *[select(table.c.destination) for table in legacy_tables]).subquery()
+            connection.execute(insert(Airport).from_select(['code'], select(codes.c[0]).distinct()))
+
+            # DISTINCT again on top of the unions: a union of a single
+            # select is compiled as that select and does not dedupe
+            airlines = union(*[select(table.c.airline) for table in legacy_tables]).subquery()
+            connection.execute(insert(Airline).from_select(['name'], select(airlines.c[0]).distinct()))
+
+            urls = union(*[select(table.c.source_url).where(table.c.source_url.isnot(None))
+                           for table in legacy_tables]).subquery()
+            connection.execute(insert(Source).from_select(['url'], select(urls.c[0]).distinct()))
+
+            # A route label is expected to have one origin and destination;
+            # should old rows disagree, the first in sort order wins
+            route_rows = union_all(*[select(table.c.route, table.c.origin, table.c.destination)
+                                     for table in legacy_tables]).subquery()
+            endpoints = select(
+                route_rows.c.route,
+                func.min(route_rows.c.origin).label('origin'),
+                func.min(route_rows.c.destination).label('destination')
+            ).group_by(route_rows.c.route).subquery()
+            connection.execute(insert(Route).from_select(
+                ['name', 'origin_id', 'destination_id'],
+                select(endpoints.c.route, OriginAirport.id, DestinationAirport.id)
+                .join(OriginAirport, OriginAirport.code == endpoints.c.origin)
+                .join(DestinationAirport, DestinationAirport.code == endpoints.c.destination)
+            ))
+
+            for name, legacy in zip(legacy_names, legacy_tables):
+                target = db.metadata.tables[name]
+                extra_columns = [column.name for column in target.columns
+                                 if column.name in legacy.c and column.name not in ('id', 'price', 'departure_date', 'scraped_at')]
+                rows = select(
+                    legacy.c.id, Route.id, Airline.id, legacy.c.price, legacy.c.departure_date,
+                    legacy.c.scraped_at, Source.id, *[legacy.c[column] for column in extra_columns]
+                ).select_from(legacy).join(
+                    Route, Route.name == legacy.c.route
+                ).join(
+                    Airline, Airline.name == legacy.c.airline
+                ).outerjoin(
+                    Source, Source.url == legacy.c.source_url
+                )
+                connection.execute(insert(target).from_select(
+                    ['id', 'route_id', 'airline_id', 'price', 'departure_date', 'scraped_at', 'source_id', *extra_columns],
+                    rows
+                ))
+                copied = connection.execute(select(func.count()).select_from(target)).scalar()
+                expected = connection.execute(select(func.count()).select_from(legacy)).scalar()
+                if copied != expected:
+                    raise RuntimeError(f"{name}: {copied} of {expected} rows copied to the dimension-keyed table")
+                migrated += copied
+                connection.exec_driver_sql(f"DROP TABLE {name}_legacy")
+
+                if connection.dialect.name == 'postgresql' and target.c.id.autoincrement is not False:
+                    # Rows were inserted with explicit ids; move the sequence past them
+                    connection.exec_driver_sql(
+                        f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), COALESCE(MAX(id), 1)) FROM {name}"
+                    )
+
+    except Exception as e:
+        logging.error(f"Error migrating flight tables to dimension keys: {str(e)}")
+        raise e
+
+    logging.info(f"Migrated {migrated} flight records to dimension tables")
+    return migrated
+
+def upgrade_database():
+    """
+    Bring an existing database up to date with the current models
+    """
+    normalize_legacy_flight_tables()
+    db.create_all()
+    drop_obsolete_columns()
+    ensure_columns()
+    created_indexes = ensure_indexes()
+    backfill_rollups_if_empty()
+    backfill_sketches_if_empty()
+    return created_indexes
@@ -1,22 +1,178 @@
 from app import db
 from datetime import datetime
-from sqlalchemy import Text, Float, Integer, String, DateTime
+from sqlalchemy import Text, Float, Integer, String, DateTime, Date, LargeBinary
+
+class Airport(db.Model):
+    """Airport dimension: one row per airport code seen in the flight data"""
+    id = db.Column(Integer, primary_key=True)
+    code = db.Column(String(100), nullable=False, unique=True)
+
+    def __repr__(self):
+        return f'<Airport {self.code}>'
+
+class Airline(db.Model):
+    """Airline dimension"""
+    id = db.Column(Integer, primary_key=True)
+    name = db.Column(String(100), nullable=False, unique=True)
+
+    def __repr__(self):
+        return f'<Airline {self.name}>'
+
+class Route(db.Model):
+    """Route dimension: the route label (e.g. 'JFK → LAX') and its endpoints"""
+    id = db.Column(Integer, primary_key=True)
+    name = db.Column(String(200), nullable=False, unique=True)
+    origin_id = db.Column(Integer, db.ForeignKey('airport.id'), nullable=False)
+    destination_id = db.Column(Integer, db.ForeignKey('airport.id'), nullable=False)
+
+    origin_airport = db.relationship(Airport, foreign_keys=[origin_id])
+    destination_airport = db.relationship(Airport, foreign_keys=[destination_id])
+
+    def __repr__(self):
+        return f'<Route {self.name}>'
+
+class Source(db.Model):
+    """Source dimension: the page a flight record was scraped from"""
+    id = db.Column(Integer, primary_key=True)
+    url = db.Column(String(500), nullable=False, unique=True)
+
+    def __repr__(self):
+        return f'<Source {self.url}>'
 
 class AirlineData(db.Model):
+    """
+    Flight price fact table. Route, airline and source are integer foreign
+    keys into the dimension tables (see dimensions.py for the id cache used
+    when ingesting); the route/origin/destination/airline/source_url
+    properties read the labels through the relationships.
+    """
+    __table_args__ = (
+        # Composite indexes backing the route/airline filters and the
+        # departure-date range scans in data_processor and /api/filter-data
+        db.Index('ix_airline_data_route_departure', 'route_id', 'departure_date'),
+        db.Index('ix_airline_data_airline_departure', 'airline_id', 'departure_date'),
+        db.Index('ix_airline_data_scraped_at', 'scraped_at'),
+        # Latest/oldest record lookups in get_route_statistics
+        db.Index('ix_airline_data_route_scraped_at', 'route_id', 'scraped_at'),
+        # Keyset pagination order for /api/filter-data
+        db.Index('ix_airline_data_departure_id', 'departure_date', 'id'),
+    )
+
     id = db.Column(Integer, primary_key=True)
-    route = db.Column(String(200), nullable=False)
-    origin = db.Column(String(100), nullable=False)
-    destination = db.Column(String(100), nullable=False)
+    route_id = db.Column(Integer, db.ForeignKey('route.id'), nullable=False)
+    airline_id = db.Column(Integer, db.ForeignKey('airline.id'), nullable=False)
     price = db.Column(Float, nullable=False)
-    airline = db.Column(String(100), nullable=False)
     departure_date = db.Column(DateTime, nullable=False)
     scraped_at = db.Column(DateTime, default=datetime.utcnow)
-    source_url = db.Column(String(500))
+    source_id = db.Column(Integer, db.ForeignKey('source.id'))
+
+    route_ref = db.relationship(Route)
+    airline_ref = db.relationship(Airline)
+    source_ref = db.relationship(Source)
+
+    @property
+    def route(self):
+        return self.route_ref.name
+
+    @property
+    def origin(self):
+        return self.route_ref.origin_airport.code
+
+    @property
+    def destination(self):
+        return self.route_ref.destination_airport.code
+
+    @property
+    def airline(self):
+        return self.airline_ref.name
+
+    @property
+    def source_url(self):
+        return self.source_ref.url if self.source_ref else None
+    
+    def __repr__(self):
+        return f'<AirlineData route {self.route_id}: ${self.price}>'
+
+class AirlineDataArchive(db.Model):
+    """
+    Cold tier of AirlineData: rows scraped before the hot retention horizon
+    are moved here by tiering.archive_old_rows, keeping their original ids.
+    It is one ordinary (unpartitioned) table; the point is keeping the hot
+    table small, not pruning the archive. Queries needing
+    full history read both tables through tiering.flight_history.
+    """
+    __tablename__ = 'airline_data_archive'
+    __table_args__ = (
+        db.Index('ix_airline_data_archive_route_scraped_at', 'route_id', 'scraped_at'),
+        db.Index('ix_airline_data_archive_departure_id', 'departure_date', 'id'),
+    )
+
+    id = db.Column(Integer, primary_key=True, autoincrement=False)
+    route_id = db.Column(Integer, db.ForeignKey('route.id'), nullable=False)
+    airline_id = db.Column(Integer, db.ForeignKey('airline.id'), nullable=False)
+    price = db.Column(Float, nullable=False)
+    departure_date = db.Column(DateTime, nullable=False)
+    scraped_at = db.Column(DateTime)
+    source_id = db.Column(Integer, db.ForeignKey('source.id'))
+    archived_at = db.Column(DateTime, default=datetime.utcnow)
     
     def __repr__(self):
-        return f'<AirlineData {self.route}: ${self.price}>'
+        return f'<AirlineDataArchive route {self.route_id}: ${self.price}>'
+
+class RouteDailyRollup(db.Model):
+    """
+    Per (route, airline, departure day) aggregates of AirlineData, maintained
+    incrementally on insert (see rollups.py) so dashboard aggregates do not
+    have to scan the raw table. Keyed by dimension ids; labels are joined in
+    after aggregating.
+    """
+    __table_args__ = (
+        db.UniqueConstraint('route_id', 'airline_id', 'day', name='uq_route_daily_rollup_key'),
+        db.Index('ix_route_daily_rollup_day', 'day'),
+        db.Index('ix_route_daily_rollup_airline', 'airline_id'),
+    )
+
+    id = db.Column(Integer, primary_key=True)
+    route_id = db.Column(Integer, db.ForeignKey('route.id'), nullable=False)
+    airline_id = db.Column(Integer, db.ForeignKey('airline.id'), nullable=False)
+    day = db.Column(Date, nullable=False)
+    booking_count = db.Column(Integer, nullable=False, default=0)
+    price_sum = db.Column(Float, nullable=False, default=0)
+    price_sum_sq = db.Column(Float, nullable=False, default=0)
+    price_min = db.Column(Float, nullable=False)
+    price_max = db.Column(Float, nullable=False)
+
+    def __repr__(self):
+        return f'<RouteDailyRollup route {self.route_id} airline {self.airline_id} {self.day}: {self.booking_count}>'
+
+class Sketch(db.Model):
+    """
+    A serialized streaming sketch over the flight data (both tiers) of one
+    route or airline: a t-digest of prices ('price_digest') or a HyperLogLog
+    of the routes flown ('route_hll'). Updated in the same transaction as
+    new flight records (see sketches.py).
+    """
+    __table_args__ = (
+        db.UniqueConstraint('sketch_type', 'scope', 'scope_id', name='uq_sketch_key'),
+    )
+
+    id = db.Column(Integer, primary_key=True)
+    sketch_type = db.Column(String(30), nullable=False)  # 'price_digest', 'route_hll'
+    scope = db.Column(String(20), nullable=False)  # 'route', 'airline'
+    scope_id = db.Column(Integer, nullable=False)
+    data = db.Column(LargeBinary, nullable=False)
+    item_count = db.Column(Integer, nullable=False, default=0)
+    updated_at = db.Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Sketch {self.sketch_type} {self.scope} {self.scope_id}: {self.item_count}>'
 
 class MarketInsight(db.Model):
+    __table_args__ = (
+        # Latest insight per type (see dashboard.get_latest_insights)
+        db.Index('ix_market_insight_type_generated', 'insight_type', 'generated_at'),
+    )
+
     id = db.Column(Integer, primary_key=True)
     insight_type = db.Column(String(100), nullable=False)  # 'popular_routes', 'price_trends', 'demand_analysis'
     content = db.Column(Text, nullable=False)
@@ -27,6 +183,63 @@ class MarketInsight(db.Model):
     def __repr__(self):
         return f'<MarketInsight {self.insight_type}>'
 
+class InsightCacheEntry(db.Model):
+    """
+    Cached model output for an analysis, keyed by a hash of the analysis
+    type, model, prompt template version and summary payload (see insight_cache.py)
+    """
+    id = db.Column(Integer, primary_key=True)
+    cache_key = db.Column(String(64), nullable=False, unique=True)
+    analysis_type = db.Column(String(100), nullable=False)
+    model = db.Column(String(100), nullable=False)
+    content = db.Column(Text, nullable=False)
+    generation_seconds = db.Column(Float, nullable=False, default=0)
+    hit_count = db.Column(Integer, nullable=False, default=0)
+    created_at = db.Column(DateTime, default=datetime.utcnow, index=True)
+    last_used_at = db.Column(DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<InsightCacheEntry {self.analysis_type} {self.cache_key[:12]}>'
+
+class BackgroundJob(db.Model):
+    """
+    A scrape or insight generation run executed by the background job queue
+    (see jobs.py). Jobs with the same dedupe_key are not queued twice while
+    one is still queued or running and its owning process is alive.
+    """
+    id = db.Column(String(32), primary_key=True)
+    job_type = db.Column(String(50), nullable=False)
+    dedupe_key = db.Column(String(200), nullable=False, index=True)
+    status = db.Column(String(20), nullable=False, default='queued', index=True)  # 'queued', 'running', 'done', 'failed'
+    records_processed = db.Column(Integer, default=0)
+    result = db.Column(Text)  # JSON summary returned by the job
+    error_message = db.Column(Text)
+    created_at = db.Column(DateTime, default=datetime.utcnow, index=True)
+    started_at = db.Column(DateTime)
+    finished_at = db.Column(DateTime)
+    owner = db.Column(String(200))  # 'hostname:pid' of the process whose worker pool holds the job
+    heartbeat_at = db.Column(DateTime)  # Last time the owner reported the job still alive
+    
+    def __repr__(self):
+        return f'<BackgroundJob {self.job_type} {self.id}: {self.status}>'
+
+class FetchState(db.Model):
+    """
+    Validators for the last successful download of a scraped page, used to
+    send conditional requests and skip pages that have not changed
+    """
+    id = db.Column(Integer, primary_key=True)
+    url = db.Column(String(500), nullable=False, unique=True)
+    etag = db.Column(String(500))
+    last_modified = db.Column(String(100))
+    content_hash = db.Column(String(64))
+    content_length = db.Column(Integer, default=0)
+    last_fetched_at = db.Column(DateTime, default=datetime.utcnow)
+    last_changed_at = db.Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<FetchState {self.url}>'
+
 class ScrapingLog(db.Model):
     id = db.Column(Integer, primary_key=True)
     source = db.Column(String(200), nullable=False)
@@ -3,7 +3,10 @@ Script to populate the database with sample airline data for testing
 """
 
 from app import app, db
-from models import AirlineData, ScrapingLog
+from models import AirlineData, AirlineDataArchive, ScrapingLog
+from rollups import rebuild_rollups
+from sketches import rebuild_sketches
+from ingest import ingest_flights
 from datetime import datetime, timedelta
 import random
 
@@ -11,8 +14,10 @@ def populate_sample_data():
     """Generate and insert sample airline data into the database"""
     
     with app.app_context():
-        # Clear existing data
+        # Clear existing data, archived rows included: the rollups and
+        # sketches are rebuilt below from both tiers
         AirlineData.query.delete()
+        AirlineDataArchive.query.delete()
         ScrapingLog.query.delete()
         
         airlines = ['United', 'American', 'Delta', 'Southwest', 'JetBlue', 'Alaska', 'Spirit', 'Frontier']
@@ -53,21 +58,21 @@ def populate_sample_data():
             # Generate random scraped_at date within past 60 days
             scraped_at = start_date + timedelta(days=random.randint(0, 59))
             
-            flight_record = AirlineData(
-                route=f"{origin_code} → {dest_code}",
-                origin=origin_code,
-                destination=dest_code,
-                price=price,
-                airline=airline,
-                departure_date=departure_date,
-                scraped_at=scraped_at,
-                source_url=f"https://example-travel-site.com/flights/{origin_code}-{dest_code}"
-            )
+            flight_record = {
+                'route': f"{origin_code} → {dest_code}",
+                'origin': origin_code,
+                'destination': dest_code,
+                'price': price,
+                'airline': airline,
+                'departure_date': departure_date,
+                'scraped_at': scraped_at,
+                'source_url': f"https://example-travel-site.com/flights/{origin_code}-{dest_code}"
+            }
             
             sample_data.append(flight_record)
         
-        # Bulk insert the data
-        db.session.bulk_save_objects(sample_data)
+        # Bulk insert the data (resolving airport/airline/route ids)
+        ingest_flights(sample_data)
         
         # Add some scraping log entries
         sources = ['https://www.kayak.com/flights', 'https://www.expedia.com/Flights', 'https://www.skyscanner.com']
@@ -81,6 +86,11 @@ def populate_sample_data():
             db.session.add(log_entry)
         
         db.session.commit()
+        
+        # The old rows were deleted without touching the rollups and sketches,
+        # so rebuild them from scratch
+        rebuild_rollups()
+        rebuild_sketches()
         print(f"Successfully populated database with {len(sample_data)} sample flight records")
 
 if __name__ == '__main__':
@@ -0,0 +1,322 @@
+from app import db
+from models import Route, RouteDailyRollup
+from data_events import data_version
+from sqlalchemy import func, select
+from datetime import datetime, timedelta
+import logging
+import threading
+import time
+
+# Length in days of each of the two windows compared (recent vs previous)
+WINDOW_DAYS = 7
+
+def departure_day(departure_date):
+    return departure_date.date() if hasattr(departure_date, 'date') else departure_date
+
+class PriceAlertEngine:
+    """
+    Incremental version of data_processor.get_price_alerts: per route, the
+    count and price sum of departures in the recent window (departing from
+    WINDOW_DAYS days ago onwards) and in the WINDOW_DAYS days before it.
+
+    The sums are seeded from the daily rollups and then kept up to date from
+    the rows of every committed write (airline_data_committed), so each new
+    row costs a couple of additions and re-checking its route, however much
+    data there is. When a route's average moves across the threshold (or
+    back) an event is published on `broadcaster` right away.
+
+    Windows are aligned to whole UTC departure days (the rollup granularity)
+    and slide when the date changes. Writes this process cannot see (other
+    worker processes, rebuilt rollups) are picked up by reseeding from the
+    rollups every `resync_seconds`, or straight away after a write whose rows
+    are unknown.
+    """
+
+    def __init__(self, threshold_percentage=10, broadcaster=None, resync_seconds=300, signal=None):
+        self.threshold_percentage = threshold_percentage
+        self.broadcaster = broadcaster
+        self.resync_seconds = resync_seconds
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._reset()
+        self.rows_applied = 0
+        self.syncs = 0
+
+        if signal is not None:
+            signal.connect(self._on_commit)
+
+    def _reset(self):
+        self._synced_at = None
+        self._synced_version = None
+        self._cutoff = None
+        # route id -> {departure day: [count, price sum]}, for days still in a window
+        self._days = {}
+        # route id -> [count, price sum] of each window
+        self._recent = {}
+        self._previous = {}
+        self._route_names = {}
+        # route id -> alert dict of the routes currently over the threshold
+        self._alerts = {}
+        # commits received while a resync is reading the rollups
+        self._pending = None
+
+    def _today(self):
+        return datetime.utcnow().date()
+
+    def _window_of(self, day):
+        """'recent', 'previous' or None for a departure day"""
+        if day >= self._cutoff:
+            return 'recent'
+        if day >= self._cutoff - timedelta(days=WINDOW_DAYS):
+            return 'previous'
+        return None
+
+    def _add(self, route_id, day, count, price_sum):
+        window = self._window_of(day)
+        if window is None:
+            return
+        bucket = self._days.setdefault(route_id, {}).setdefault(day, [0, 0.0])
+        bucket[0] += count
+        bucket[1] += price_sum
+        totals = (self._recent if window == 'recent' else self._previous).setdefault(route_id, [0, 0.0])
+        totals[0] += count
+        totals[1] += price_sum
+
+    def _change(self, route_id):
+        """(old average, new average, percentage change) for a route, or None"""
+        previous = self._previous.get(route_id)
+        recent = self._recent.get(route_id)
+        if not previous or not recent or previous[0] == 0 or recent[0] == 0:
+            return None
+
+        old_price = previous[1] / previous[0]
+        new_price = recent[1] / recent[0]
+        if old_price <= 0:
+            return None
+        return old_price, new_price, (new_price - old_price) / old_price * 100
+
+    def _alert(self, route_id, change):
+        old_price, new_price, percentage_change = change
+        return {
+            'route': self._route_names.get(route_id, str(route_id)),
+            'old_price': round(old_price, 2),
+            'new_price': round(new_price, 2),
+            'percentage_change': round(percentage_change, 2),
+            'alert_type': 'price_increase' if percentage_change > 0 else 'price_decrease'
+        }
+
+    def _evaluate(self, route_ids):
+        """
+        Re-check routes against the threshold, returning the (event, data)
+        pairs to publish for routes that started or stopped alerting
+        """
+        events = []
+        for route_id in route_ids:
+            change = self._change(route_id)
+            active = self._alerts.get(route_id)
+
+            if change is not None and abs(change[2]) >= self.threshold_percentage:
+                alert = self._alert(route_id, change)
+                self._alerts[route_id] = alert
+                if active is None or active['alert_type'] != alert['alert_type']:
+                    events.append(('price_alert', dict(alert, detected_at=datetime.utcnow().isoformat())))
+            elif active is not None:
+                del self._alerts[route_id]
+                events.append(('price_alert_cleared', {'route': active['route']}))
+        return events
+
+    def _advance(self):
+        """
+        Slide the windows up to today: each day leaving the recent window
+        moves into the previous one and the day leaving that is dropped.
+        Returns False when the gap is too long to slide and a resync is needed
+        """
+        cutoff = self._today() - timedelta(days=WINDOW_DAYS)
+        if self._cutoff is None or cutoff <= self._cutoff:
+            return True
+        if (cutoff - self._cutoff).days > 2 * WINDOW_DAYS:
+            return False
+
+        while self._cutoff < cutoff:
+            leaving_recent = self._cutoff
+            leaving_previous = self._cutoff - timedelta(days=WINDOW_DAYS)
+            for route_id, days in self._days.items():
+                moved = days.get(leaving_recent)
+                if moved:
+                    self._recent[route_id][0] -= moved[0]
+                    self._recent[route_id][1] -= moved[1]
+                    previous = self._previous.setdefault(route_id, [0, 0.0])
+                    previous[0] += moved[0]
+                    previous[1] += moved[1]
+                dropped = days.pop(leaving_previous, None)
+                if dropped:
+                    self._previous[route_id][0] -= dropped[0]
+                    self._previous[route_id][1] -= dropped[1]
+            self._cutoff += timedelta(days=1)
+
+        self._publish(self._evaluate(list(self._days)))
+        return True
+
+    def _publish(self, events):
+        if self.broadcaster is None:
+            return
+        for event, data in events:
+            self.broadcaster.publish(event, data)
+
+    def _load_route_names(self, route_ids):
+        """Names of routes first seen in a commit, read on a connection of their own"""
+        try:
+            with db.engine.connect() as connection:
+                rows = connection.execute(select(Route.id, Route.name).where(Route.id.in_(route_ids)))
+                return dict(rows.all())
+        except Exception as e:
+            logging.error(f"Error loading route names for price alerts: {str(e)}")
+            return {}
+
+    def _on_commit(self, sender, rows=(), version=None, **kwargs):
+        try:
+            with self._lock:
+                # Until the alerts are first asked for there is nothing to
+                # keep up to date; the first request seeds the windows
+                if not self.syncs:
+                    return
+                if rows and self._pending is not None:
+                    self._pending.append((version, rows))
+                    return
+                if rows and self._synced_at is not None and version is not None and version <= self._synced_version:
+                    return
+                # A write whose rows are unknown (rollup rebuild, edits) or
+                # windows that could not be kept: reseed right away, so
+                # stream subscribers hear about the alerts it changed
+                resync = not rows or self._synced_at is None
+                unknown = set() if resync else {row['route_id'] for row in rows} - set(self._route_names)
+
+            if not resync:
+                names = self._load_route_names(unknown) if unknown else {}
+                with self._lock:
+                    self._route_names.update(names)
+                    if self._synced_at is not None:
+                        self._publish(self.apply(rows))
+                    resync = self._synced_at is None
+
+            if resync:
+                self.sync()
+
+        except Exception as e:
+            logging.error(f"Error updating price alerts after a commit: {str(e)}")
+
+    def apply(self, rows):
+        """
+        Add committed flight rows (route_id, price and departure_date) to the
+        window sums. Returns the alert events raised, for publishing
+        """
+        with self._lock:
+            if not self._advance():
+                self._synced_at = None
+                return []
+
+            touched = set()
+            for row in rows:
+                self._add(row['route_id'], departure_day(row['departure_date']), 1, row['price'])
+                touched.add(row['route_id'])
+            self.rows_applied += len(rows)
+            return self._evaluate(touched)
+
+    def sync(self):
+        """
+        Reseed the window sums from the daily rollups (both tiers) and
+        publish the alerts that changed. Reads on a connection of its own, so
+        it can run from the commit signal, where the session cannot be used
+        """
+        with self._sync_lock:
+            with self._lock:
+                self._pending = []
+            try:
+                version = data_version()
+                cutoff = self._today() - timedelta(days=WINDOW_DAYS)
+                with db.engine.connect() as connection:
+                    rows = connection.execute(
+                        select(
+                            RouteDailyRollup.route_id,
+                            RouteDailyRollup.day,
+                            func.sum(RouteDailyRollup.booking_count),
+                            func.sum(RouteDailyRollup.price_sum)
+                        ).where(
+                            RouteDailyRollup.day >= cutoff - timedelta(days=WINDOW_DAYS)
+                        ).group_by(
+                            RouteDailyRollup.route_id,
+                            RouteDailyRollup.day
+                        )
+                    ).all()
+                    route_names = dict(connection.execute(select(Route.id, Route.name)).all())
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+
+            with self._lock:
+                active = self._alerts
+                pending = self._pending
+                self._reset()
+                self._alerts = active
+                self._cutoff = cutoff
+                self._route_names = route_names
+                for route_id, day, count, price_sum in rows:
+                    self._add(route_id, day, count, price_sum)
+
+                self._synced_at = time.monotonic()
+                self._synced_version = version
+                self.syncs += 1
+
+                # Commits that arrived while the rollups were being read and
+                # are newer than the version read beforehand
+                for pending_version, pending_rows in pending:
+                    if pending_version is not None and pending_version > version:
+                        for row in pending_rows:
+                            self._add(row['route_id'], departure_day(row['departure_date']), 1, row['price'])
+
+                unknown = set(self._days) - set(route_names)
+                if unknown:
+                    self._route_names.update(self._load_route_names(unknown))
+
+                self._publish(self._evaluate(set(self._days) | set(self._alerts)))
+
+    def _ensure_synced(self):
+        with self._lock:
+            fresh = (
+                self._synced_at is not None
+                and (not self.resync_seconds or time.monotonic() - self._synced_at < self.resync_seconds)
+                and self._advance()
+            )
+        if not fresh:
+            self.sync()
+
+    def alerts(self, threshold_percentage=None):
+        """
+        Routes whose recent average price moved by at least the threshold
+        (default: the engine's), largest change first, in the format of
+        data_processor.get_price_alerts
+        """
+        self._ensure_synced()
+        threshold = self.threshold_percentage if threshold_percentage is None else threshold_percentage
+
+        with self._lock:
+            alerts = []
+            for route_id in self._days:
+                change = self._change(route_id)
+                if change is not None and abs(change[2]) >= threshold:
+                    alerts.append(self._alert(route_id, change))
+
+        alerts.sort(key=lambda alert: abs(alert['percentage_change']), reverse=True)
+        return alerts
+
+    def stats(self):
+        with self._lock:
+            return {
+                'threshold_percentage': self.threshold_percentage,
+                'routes': len(self._days),
+                'active_alerts': len(self._alerts),
+                'rows_applied': self.rows_applied,
+                'syncs': self.syncs,
+                'synced': self._synced_at is not None
+            }
@@ -0,0 +1,258 @@
+from app import db
+from models import AirlineData, RouteDailyRollup
+from sqlalchemy import event, func, select, insert, update, delete
+from sqlalchemy.orm import Session
+from data_events import mark_airline_data_written
+from tiering import flight_history
+from datetime import datetime, time, timedelta
+import logging
+
+ROLLUP_KEY = ('route_id', 'airline_id', 'day')
+ROLLUP_COLUMNS = ROLLUP_KEY + ('booking_count', 'price_sum', 'price_sum_sq', 'price_min', 'price_max')
+FLIGHT_COLUMNS = ('route_id', 'airline_id', 'price', 'departure_date')
+
+def rollup_key(route_id, airline_id, departure_date):
+    """(route id, airline id, departure day) rollup key of a flight"""
+    day = departure_date.date() if hasattr(departure_date, 'date') else departure_date
+    return (route_id, airline_id, day)
+
+def aggregate_flights(flights):
+    """
+    Fold flight records (airline_data row dicts or AirlineData objects) into
+    rollup rows keyed by (route id, airline id, departure day)
+    """
+    rollups = {}
+
+    for flight in flights:
+        if isinstance(flight, dict):
+            route_id, airline_id = flight['route_id'], flight['airline_id']
+            price, departure_date = flight['price'], flight['departure_date']
+        else:
+            route_id, airline_id = flight.route_id, flight.airline_id
+            price, departure_date = flight.price, flight.departure_date
+
+        key = rollup_key(route_id, airline_id, departure_date)
+        day = key[2]
+
+        if key not in rollups:
+            rollups[key] = {
+                'route_id': route_id,
+                'airline_id': airline_id,
+                'day': day,
+                'booking_count': 0,
+                'price_sum': 0.0,
+                'price_sum_sq': 0.0,
+                'price_min': price,
+                'price_max': price
+            }
+
+        rollup = rollups[key]
+        rollup['booking_count'] += 1
+        rollup['price_sum'] += price
+        rollup['price_sum_sq'] += price * price
+        rollup['price_min'] = min(rollup['price_min'], price)
+        rollup['price_max'] = max(rollup['price_max'], price)
+
+    return list(rollups.values())
+
+def _upsert_statement(dialect_name):
+    """
+    Build an INSERT ... ON CONFLICT statement that merges a rollup row into
+    the existing one, or None when the dialect has no native upsert
+    """
+    table = RouteDailyRollup.__table__
+
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        least, greatest = func.min, func.max
+    elif dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        least, greatest = func.least, func.greatest
+    else:
+        return None
+
+    stmt = dialect_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=list(ROLLUP_KEY),
+        set_={
+            'booking_count': table.c.booking_count + stmt.excluded.booking_count,
+            'price_sum': table.c.price_sum + stmt.excluded.price_sum,
+            'price_sum_sq': table.c.price_sum_sq + stmt.excluded.price_sum_sq,
+            'price_min': least(table.c.price_min, stmt.excluded.price_min),
+            'price_max': greatest(table.c.price_max, stmt.excluded.price_max)
+        }
+    )
+
+def _merge_rollups_generic(connection, rows):
+    """
+    Fallback merge for dialects without INSERT ... ON CONFLICT
+    """
+    table = RouteDailyRollup.__table__
+
+    for row in rows:
+        key_filter = [table.c[column] == row[column] for column in ROLLUP_KEY]
+        result = connection.execute(
+            update(table).where(*key_filter).values(
+                booking_count=table.c.booking_count + row['booking_count'],
+                price_sum=table.c.price_sum + row['price_sum'],
+                price_sum_sq=table.c.price_sum_sq + row['price_sum_sq'],
+                price_min=func.least(table.c.price_min, row['price_min']),
+                price_max=func.greatest(table.c.price_max, row['price_max'])
+            )
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table), [row])
+
+def record_flights(flights, connection=None):
+    """
+    Add newly inserted flights to the rollup tables. Runs on the caller's
+    connection so the rollups commit or roll back together with the raw rows.
+    Returns the number of rollup rows touched.
+    """
+    rows = aggregate_flights(flights)
+    if not rows:
+        return 0
+
+    connection = connection if connection is not None else db.session.connection()
+    stmt = _upsert_statement(connection.dialect.name)
+
+    if stmt is not None:
+        connection.execute(stmt, rows)
+    else:
+        _merge_rollups_generic(connection, rows)
+
+    return len(rows)
+
+def _aggregate_history(where=None):
+    """
+    SELECT computing rollup rows (in ROLLUP_COLUMNS order) from the raw
+    airline data, hot and archived, filtered by where as in flight_history
+    """
+    history = flight_history(FLIGHT_COLUMNS, where=where)
+    day = func.date(history.c.departure_date)
+    return select(
+        history.c.route_id,
+        history.c.airline_id,
+        day,
+        func.count(),
+        func.sum(history.c.price),
+        func.sum(history.c.price * history.c.price),
+        func.min(history.c.price),
+        func.max(history.c.price)
+    ).group_by(
+        history.c.route_id,
+        history.c.airline_id,
+        day
+    )
+
+def rebuild_rollup_buckets(keys, connection=None):
+    """
+    Recompute the rollup rows of the given (route id, airline id, day) keys
+    from the raw airline data, for changes that cannot be applied as a delta
+    (a removed price cannot be taken back out of min/max). Buckets left with
+    no flights are deleted. Runs on the caller's connection like
+    record_flights.
+    Returns the number of buckets rebuilt
+    """
+    table = RouteDailyRollup.__table__
+    connection = connection if connection is not None else db.session.connection()
+
+    for route_id, airline_id, day in keys:
+        start = datetime.combine(day, time.min)
+        bucket = lambda model: [
+            model.route_id == route_id,
+            model.airline_id == airline_id,
+            model.departure_date >= start,
+            model.departure_date < start + timedelta(days=1)
+        ]
+        connection.execute(delete(table).where(
+            table.c.route_id == route_id,
+            table.c.airline_id == airline_id,
+            table.c.day == day
+        ))
+        connection.execute(insert(table).from_select(list(ROLLUP_COLUMNS), _aggregate_history(bucket)))
+
+    return len(keys)
+
+def rebuild_rollups():
+    """
+    Recompute all rollup rows from the raw airline data, hot and archived
+    Returns the number of rollup rows written
+    """
+    try:
+        db.session.query(RouteDailyRollup).delete()
+        mark_airline_data_written(db.session)
+        db.session.execute(
+            insert(RouteDailyRollup).from_select(list(ROLLUP_COLUMNS), _aggregate_history())
+        )
+        db.session.commit()
+
+        rollup_count = db.session.query(func.count(RouteDailyRollup.id)).scalar()
+        logging.info(f"Rebuilt {rollup_count} rollup rows from raw airline data")
+
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error rebuilding rollups: {str(e)}")
+        raise e
+
+    return rollup_count
+
+def backfill_rollups_if_empty():
+    """
+    Populate the rollups for databases that have raw data but were created
+    before the rollup tables existed
+    """
+    has_rollups = db.session.query(RouteDailyRollup.id).first() is not None
+    has_raw_data = db.session.query(AirlineData.id).first() is not None
+
+    if has_raw_data and not has_rollups:
+        return rebuild_rollups()
+    return 0
+
+@event.listens_for(Session, 'before_flush')
+def _note_changed_airline_data(session, flush_context, instances):
+    """
+    Read the stored rollup keys of AirlineData rows about to be updated or
+    deleted, while the database still holds their old values
+    """
+    ids = [obj.id for obj in session.dirty | session.deleted if isinstance(obj, AirlineData) and obj.id is not None]
+    if not ids:
+        session.info.pop('stale_rollup_keys', None)
+        return
+
+    table = AirlineData.__table__
+    rows = session.connection().execute(
+        select(table.c.route_id, table.c.airline_id, table.c.departure_date).where(table.c.id.in_(ids))
+    )
+    session.info['stale_rollup_keys'] = {rollup_key(*row) for row in rows}
+
+@event.listens_for(Session, 'after_flush')
+def _rollup_flushed_airline_data(session, flush_context):
+    """
+    Keep rollups in step with AirlineData rows added, updated or deleted
+    through the ORM session: new rows are merged in as a delta, and the
+    buckets an updated or deleted row was in (or moved to) are rebuilt.
+    Bulk Query.update()/delete() bypass the flush and need rebuild_rollups.
+    """
+    new_flights = [obj for obj in session.new if isinstance(obj, AirlineData)]
+    if new_flights:
+        record_flights(new_flights, session.connection())
+
+    changed = [obj for obj in session.dirty | session.deleted if isinstance(obj, AirlineData)]
+    stale_keys = session.info.pop('stale_rollup_keys', set())
+    stale_keys |= {
+        rollup_key(obj.route_id, obj.airline_id, obj.departure_date)
+        for obj in session.dirty if isinstance(obj, AirlineData)
+    }
+    if stale_keys:
+        rebuild_rollup_buckets(sorted(stale_keys), session.connection())
+
+    if changed:
+        # Edits and deletes have no row-by-row delta
+        mark_airline_data_written(session)
+    elif new_flights:
+        rows = [
+            {column: getattr(flight, column) for column in FLIGHT_COLUMNS}
+            for flight in new_flights
+        ]
+        mark_airline_data_written(session, rows)
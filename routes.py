@@ -1,205 +1,505 @@
-from flask import render_template, request, jsonify, flash, redirect, url_for
+from flask import render_template, request, jsonify, flash, redirect, url_for, stream_with_context, Response
 from app import app, db
-from models import AirlineData, MarketInsight, ScrapingLog
-from data_scraper import scrape_airline_data
-from ai_analyzer import analyze_market_trends
-from data_processor import process_airline_data, get_popular_routes, get_price_trends
-from datetime import datetime, timedelta
+from models import BackgroundJob, Route, Airline
+from dimensions import OriginAirport, DestinationAirport
+from data_scraper import run_scrape, get_http_client
+from ai_analyzer import generate_and_store_insights
+from data_processor import get_popular_routes, get_price_trends, get_demand_by_month
+from cache import ResponseCache, SnapshotCache
+from insight_cache import InsightCache
+from jobs import JobQueue, job_to_dict
+from data_events import data_version, airline_data_committed, market_insights_committed
+from tiering import flight_history
+from metrics import REGISTRY
+from dashboard import build_dashboard_snapshot, build_insights_page
+from price_alerts import PriceAlertEngine
+from sketches import price_percentiles, DEFAULT_QUANTILES, DIGEST_COMPRESSION
+from live_updates import LiveUpdates
+from sse import EventBroadcaster, event_stream_response, parse_last_event_id
+from datetime import datetime
+import base64
+import binascii
+import hashlib
 import logging
 
+# Persistent cache of model output for unchanged analysis summaries
+insight_cache = InsightCache(
+    ttl_seconds=app.config['INSIGHT_CACHE_TTL'],
+    max_entries=app.config['INSIGHT_CACHE_MAX_ENTRIES']
+)
+
+# Index page figures, kept in memory between writes
+dashboard_cache = SnapshotCache(
+    build_dashboard_snapshot,
+    ttl=app.config['DASHBOARD_CACHE_TTL'],
+    signals=(airline_data_committed, market_insights_committed)
+)
+
+# Latest parsed insights, kept until new insights are saved
+insights_page_cache = SnapshotCache(
+    build_insights_page,
+    ttl=app.config['INSIGHTS_PAGE_CACHE_TTL'],
+    signals=(market_insights_committed,)
+)
+
+# Price alerts, kept up to date as flights are ingested and pushed to
+# /api/price-alerts/stream subscribers as routes cross the threshold
+price_alert_events = EventBroadcaster(buffer_size=app.config['SSE_BUFFER_SIZE'])
+price_alert_engine = PriceAlertEngine(
+    threshold_percentage=app.config['PRICE_ALERT_THRESHOLD'],
+    broadcaster=price_alert_events,
+    resync_seconds=app.config['PRICE_ALERT_RESYNC_SECONDS'],
+    signal=airline_data_committed
+)
+
+# Deltas pushed to the dashboards subscribed to /api/live as writes commit
+live_events = EventBroadcaster(buffer_size=app.config['SSE_BUFFER_SIZE'])
+live_updates = LiveUpdates(
+    live_events,
+    airline_data_signal=airline_data_committed,
+    insights_signal=market_insights_committed
+)
+
+# Worker pool running scrapes and insight generation off the request thread
+job_queue = JobQueue(
+    app,
+    max_workers=app.config['JOB_MAX_WORKERS'],
+    heartbeat_seconds=app.config['JOB_HEARTBEAT_SECONDS']
+)
+
 @app.route('/')
 def index():
     """Main dashboard showing overview of airline market data"""
-    # Get recent data stats
-    total_records = AirlineData.query.count()
-    recent_records = AirlineData.query.filter(
-        AirlineData.scraped_at >= datetime.utcnow() - timedelta(days=7)
-    ).count()
-    
-    # Get latest insights
-    latest_insights = MarketInsight.query.order_by(
-        MarketInsight.generated_at.desc()
-    ).limit(3).all()
-    
-    # Get popular routes
-    popular_routes = get_popular_routes(limit=10)
+    # Totals, recent counts, insights and popular routes come from an
+    # in-memory snapshot rebuilt only after new data or on expiry
+    snapshot = dashboard_cache.get()
     
     return render_template('index.html', 
-                         total_records=total_records,
-                         recent_records=recent_records,
-                         latest_insights=latest_insights,
-                         popular_routes=popular_routes)
+                         total_records=snapshot.total_records,
+                         recent_records=snapshot.recent_records,
+                         latest_insights=snapshot.latest_insights,
+                         popular_routes=snapshot.popular_routes)
+
+def wants_json():
+    """True when the client asked for a JSON response rather than a page"""
+    return request.is_json or request.accept_mimetypes.best == 'application/json'
+
+def job_started_response(job, created, label, redirect_endpoint):
+    """
+    Answer a job-starting POST: 202 with the job status for API clients,
+    or a flash message and redirect for browser form posts
+    """
+    if wants_json():
+        payload = job_to_dict(job)
+        payload['deduplicated'] = not created
+        response = jsonify(payload)
+        response.status_code = 202
+        response.headers['Location'] = url_for('job_status', job_id=job.id)
+        return response
+    
+    if created:
+        flash(f'{label} started in the background (job {job.id})', 'info')
+    else:
+        flash(f'{label} is already in progress (job {job.id})', 'info')
+    return redirect(url_for(redirect_endpoint))
 
 @app.route('/scrape-data', methods=['POST'])
 def scrape_data():
-    """Endpoint to trigger data scraping"""
+    """Endpoint to trigger data scraping as a background job"""
     try:
-        # Scrape data from multiple sources
-        sources = [
-            'https://www.kayak.com/flights',
-            'https://www.expedia.com/Flights',
-            'https://www.skyscanner.com'
-        ]
-        
-        total_scraped = 0
-        for source in sources:
-            try:
-                scraped_count = scrape_airline_data(source)
-                total_scraped += scraped_count
-                
-                # Log successful scraping
-                log_entry = ScrapingLog(
-                    source=source,
-                    status='success',
-                    records_scraped=scraped_count
-                )
-                db.session.add(log_entry)
-                
-            except Exception as e:
-                logging.error(f"Error scraping {source}: {str(e)}")
-                log_entry = ScrapingLog(
-                    source=source,
-                    status='error',
-                    error_message=str(e)
-                )
-                db.session.add(log_entry)
-        
-        db.session.commit()
-        flash(f'Successfully scraped {total_scraped} records from {len(sources)} sources', 'success')
+        job, created = job_queue.submit('scrape', run_scrape)
+        return job_started_response(job, created, 'Scraping', 'index')
         
     except Exception as e:
-        flash(f'Error during scraping: {str(e)}', 'error')
         logging.error(f"Scraping error: {str(e)}")
-    
-    return redirect(url_for('index'))
+        if wants_json():
+            return jsonify({'error': str(e)}), 500
+        flash(f'Error during scraping: {str(e)}', 'error')
+        return redirect(url_for('index'))
 
 @app.route('/generate-insights', methods=['POST'])
 def generate_insights():
-    """Generate AI-powered market insights"""
+    """Generate AI-powered market insights as a background job"""
     try:
-        # Get recent data for analysis
-        recent_data = AirlineData.query.filter(
-            AirlineData.scraped_at >= datetime.utcnow() - timedelta(days=30)
-        ).all()
-        
-        if not recent_data:
-            flash('No recent data available for analysis', 'warning')
-            return redirect(url_for('index'))
-        
-        # Process data and generate insights
-        processed_data = process_airline_data(recent_data)
-        insights = analyze_market_trends(processed_data)
-        
-        # Save insights to database
-        for insight_type, content in insights.items():
-            insight = MarketInsight(
-                insight_type=insight_type,
-                content=content,
-                data_period_start=datetime.utcnow() - timedelta(days=30),
-                data_period_end=datetime.utcnow()
-            )
-            db.session.add(insight)
-        
-        db.session.commit()
-        flash('Market insights generated successfully', 'success')
+        job, created = job_queue.submit(
+            'generate_insights',
+            lambda: generate_and_store_insights(cache=insight_cache)
+        )
+        return job_started_response(job, created, 'Insight generation', 'insights')
         
     except Exception as e:
-        flash(f'Error generating insights: {str(e)}', 'error')
         logging.error(f"Insight generation error: {str(e)}")
-    
-    return redirect(url_for('insights'))
+        if wants_json():
+            return jsonify({'error': str(e)}), 500
+        flash(f'Error generating insights: {str(e)}', 'error')
+        return redirect(url_for('insights'))
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    """API endpoint reporting the status of a background job"""
+    job = db.session.get(BackgroundJob, job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_to_dict(job))
 
 @app.route('/insights')
 def insights():
     """Show AI-generated market insights"""
-    # Get all insights grouped by type
-    insights_data = {}
-    insight_types = ['popular_routes', 'price_trends', 'demand_analysis']
+    # Latest insight of each type, already parsed, from memory
+    page = insights_page_cache.get()
     
-    for insight_type in insight_types:
-        latest_insight = MarketInsight.query.filter_by(
-            insight_type=insight_type
-        ).order_by(MarketInsight.generated_at.desc()).first()
-        
-        if latest_insight:
-            insights_data[insight_type] = latest_insight.content
-    
-    return render_template('insights.html', insights=insights_data)
+    return render_template('insights.html', insights=page.insights, parsed_insights=page.parsed_insights)
+
+# Chart responses keyed by chart type, parameters and data version
+chart_cache = ResponseCache(
+    max_entries=app.config['CHART_CACHE_MAX_ENTRIES'],
+    ttl=app.config['CHART_CACHE_TTL']
+)
+
+def build_chart_data(chart_type, params):
+    """Compute the payload for a chart type"""
+    if chart_type == 'price_trends':
+        return get_price_trends(days=params['days'])
+    elif chart_type == 'popular_routes':
+        return get_popular_routes(limit=params['limit'])
+    elif chart_type == 'demand_by_month':
+        # Get demand data by month
+        return [
+            {'month': row['month'], 'bookings': row['booking_count']}
+            for row in get_demand_by_month()
+        ]
+    return None
 
 @app.route('/api/chart-data/<chart_type>')
 def chart_data(chart_type):
     """API endpoint to provide chart data"""
     try:
-        if chart_type == 'price_trends':
-            data = get_price_trends()
-        elif chart_type == 'popular_routes':
-            data = get_popular_routes(limit=20)
-        elif chart_type == 'demand_by_month':
-            # Get demand data by month
-            data = db.session.query(
-                db.func.strftime('%Y-%m', AirlineData.departure_date).label('month'),
-                db.func.count(AirlineData.id).label('bookings')
-            ).group_by(
-                db.func.strftime('%Y-%m', AirlineData.departure_date)
-            ).order_by('month').all()
-            
-            data = [{'month': row.month, 'bookings': row.bookings} for row in data]
-        else:
+        if chart_type not in ('price_trends', 'popular_routes', 'demand_by_month'):
             return jsonify({'error': 'Invalid chart type'}), 400
         
-        return jsonify(data)
+        params = {
+            'days': request.args.get('days', 30, type=int),
+            'limit': request.args.get('limit', 20, type=int)
+        }
+        cache_key = (chart_type, tuple(sorted(params.items())), data_version())
+        
+        cached = chart_cache.get(cache_key)
+        if cached is None:
+            data = build_chart_data(chart_type, params)
+            body = app.json.dumps(data)
+            cached = (body, hashlib.sha1(body.encode('utf-8')).hexdigest())
+            
+            # Don't pin empty results, they may come from a swallowed query error
+            if data:
+                chart_cache.put(cache_key, cached)
+        
+        body, etag = cached
+        response = app.response_class(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        
+        # Answers If-None-Match with a bodyless 304 when the ETag still matches
+        return response.make_conditional(request)
         
     except Exception as e:
         logging.error(f"Chart data error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/price-alerts')
+def price_alerts():
+    """
+    API endpoint listing routes whose average price over the last 7 days moved
+    by at least ?threshold= percent (default PRICE_ALERT_THRESHOLD) against
+    the 7 days before, largest change first
+    """
+    try:
+        threshold = request.args.get('threshold', type=float)
+        alerts = price_alert_engine.alerts(threshold)
+        return jsonify({
+            'threshold_percentage': price_alert_engine.threshold_percentage if threshold is None else threshold,
+            'alerts': alerts
+        })
+    except Exception as e:
+        logging.error(f"Price alerts error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/price-alerts/stream')
+def price_alerts_stream():
+    """
+    Server-Sent Events stream of price alerts: a `price_alerts` event with the
+    current alerts, then `price_alert` / `price_alert_cleared` events as routes
+    cross the threshold. Reconnecting clients (Last-Event-ID) get the events
+    they missed instead of the full list.
+    """
+    last_event_id = parse_last_event_id(
+        request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    )
+    def current_alerts():
+        try:
+            return 'price_alerts', price_alert_engine.alerts()
+        finally:
+            # Don't hold a read transaction open for the life of the stream
+            db.session.remove()
+
+    stream = price_alert_events.stream(
+        last_event_id=last_event_id,
+        snapshot=current_alerts,
+        heartbeat=app.config['SSE_HEARTBEAT_SECONDS']
+    )
+    return event_stream_response(stream)
+
+@app.route('/api/price-percentiles')
+def price_percentiles_api():
+    """
+    API endpoint with estimated price percentiles per route (?by=route, the
+    default) or airline (?by=airline), optionally for one ?name=, at the
+    percentiles in ?q= (comma separated, default 50,90,99). Answered from
+    the stored t-digests, so no flight rows are read
+    """
+    try:
+        scope = request.args.get('by', 'route')
+        if scope not in ('route', 'airline'):
+            return jsonify({'error': 'by must be route or airline'}), 400
+        
+        quantiles = DEFAULT_QUANTILES
+        if request.args.get('q'):
+            try:
+                quantiles = tuple(float(value) / 100 for value in request.args['q'].split(','))
+            except ValueError:
+                return jsonify({'error': 'q must be comma separated percentiles'}), 400
+            if not all(0 <= q <= 1 for q in quantiles):
+                return jsonify({'error': 'percentiles must be between 0 and 100'}), 400
+        
+        return jsonify({
+            'by': scope,
+            'method': 't-digest',
+            'compression': DIGEST_COMPRESSION,
+            'results': price_percentiles(scope, request.args.get('name'), quantiles)
+        })
+    except Exception as e:
+        logging.error(f"Price percentiles error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/live')
+def live_stream():
+    """
+    Server-Sent Events stream of dashboard updates: a `state` event with the
+    current totals on connect, then `flights`, `insights` and `refresh` deltas
+    as scrapes and insight generation commit (see live_updates.LiveUpdates).
+    Reconnecting clients (Last-Event-ID) get the deltas they missed instead.
+    """
+    last_event_id = parse_last_event_id(
+        request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    )
+
+    def current_state():
+        try:
+            snapshot = dashboard_cache.get()
+            return 'state', {
+                'version': data_version(),
+                'total_records': snapshot.total_records,
+                'recent_records': snapshot.recent_records
+            }
+        finally:
+            db.session.remove()
+
+    stream = live_events.stream(
+        last_event_id=last_event_id,
+        snapshot=current_state,
+        heartbeat=app.config['SSE_HEARTBEAT_SECONDS']
+    )
+    return event_stream_response(stream)
+
+@app.route('/api/cache-stats')
+def cache_stats():
+    """API endpoint exposing response cache counters"""
+    return jsonify({
+        'data_version': data_version(),
+        'chart_data': chart_cache.stats(),
+        'insights': insight_cache.stats(),
+        'dashboard': dashboard_cache.stats(),
+        'insights_page': insights_page_cache.stats(),
+        'price_alerts': dict(price_alert_engine.stats(), stream=price_alert_events.stats()),
+        'live': live_events.stats()
+    })
+
+@app.route('/api/http-stats')
+def http_stats():
+    """API endpoint exposing per-host scraping request counts and latency"""
+    return jsonify(get_http_client().metrics.snapshot())
+
+@app.route('/metrics')
+def metrics():
+    """Request, SQL, scrape and model call latency histograms in the Prometheus text format"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+MATCH_MODES = ('exact', 'prefix', 'contains')
+
+def text_match_filter(column, value, match, case_sensitive=True):
+    """
+    Build a filter for a text column. 'contains' is the original
+    case-insensitive substring search and always scans (the dimension table
+    only, not the flight data). 'exact' and 'prefix' are expressed as
+    equality / range predicates so they can use the unique indexes on the
+    dimension tables; with case_sensitive=False they compare lowercased
+    values instead, which scans the (small) dimension table.
+    """
+    if match == 'contains':
+        return column.ilike(f'%{value}%')
+    if not case_sensitive:
+        column, value = db.func.lower(column), value.lower()
+    if match == 'exact':
+        return column == value
+    # col >= 'AB' AND col < 'AC' is the index-friendly form of LIKE 'AB%'
+    upper_bound = value[:-1] + chr(ord(value[-1]) + 1)
+    return db.and_(column >= value, column < upper_bound)
+
+FILTER_COLUMNS = ('id', 'route', 'origin', 'destination', 'price', 'airline', 'departure_date', 'scraped_at')
+FILTER_DEFAULT_LIMIT = 100
+FILTER_MAX_LIMIT = 1000
+
+def encode_cursor(departure_date, record_id):
+    """Opaque keyset cursor for the (departure_date, id) position of a row"""
+    raw = f"{departure_date.isoformat()}|{record_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor, raises ValueError for malformed cursors"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        departure_date, record_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(departure_date), int(record_id)
+    except (UnicodeError, TypeError, ValueError, binascii.Error):
+        raise ValueError('Invalid cursor')
+
+def flight_to_dict(record):
+    """Serialize an airline_data row for the filter API"""
+    return {
+        'route': record.route,
+        'origin': record.origin,
+        'destination': record.destination,
+        'price': record.price,
+        'airline': record.airline,
+        'departure_date': record.departure_date.strftime('%Y-%m-%d'),
+        'scraped_at': record.scraped_at.strftime('%Y-%m-%d %H:%M')
+    }
+
 @app.route('/api/filter-data')
 def filter_data():
-    """API endpoint to filter airline data based on parameters"""
+    """
+    API endpoint to filter airline data based on parameters
+    Results are ordered newest departure first and paginated by keyset: pass the
+    X-Next-Cursor header of one page as ?cursor= to get the next. With
+    format=ndjson the matching rows are streamed one JSON object per line.
+    """
     try:
         # Get filter parameters
-        origin = request.args.get('origin')
-        destination = request.args.get('destination')
-        airline = request.args.get('airline')
+        origin = request.args.get('origin', '').strip()
+        destination = request.args.get('destination', '').strip()
+        airline = request.args.get('airline', '').strip()
         min_price = request.args.get('min_price', type=float)
         max_price = request.args.get('max_price', type=float)
         date_from = request.args.get('date_from')
         date_to = request.args.get('date_to')
+        match = request.args.get('match', 'contains')
+        output_format = request.args.get('format', 'json')
+        cursor = request.args.get('cursor')
+        limit = request.args.get('limit', type=int)
+        
+        if match not in MATCH_MODES:
+            return jsonify({'error': f"Invalid match mode, expected one of: {', '.join(MATCH_MODES)}"}), 400
+        if output_format not in ('json', 'ndjson'):
+            return jsonify({'error': 'Invalid format, expected json or ndjson'}), 400
+        if limit is not None and limit < 1:
+            return jsonify({'error': 'limit must be a positive integer'}), 400
+        
+        if cursor:
+            try:
+                cursor_date, cursor_id = decode_cursor(cursor)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        
+        # Text filters match the small dimension tables; the fact tables are
+        # then filtered on the matching integer ids
+        matching_route_ids = None
+        if origin or destination:
+            matching_route_ids = db.select(Route.id)
+            if origin:
+                matching_route_ids = matching_route_ids.join(OriginAirport, OriginAirport.id == Route.origin_id).where(
+                    text_match_filter(OriginAirport.code, origin.upper(), match)
+                )
+            if destination:
+                matching_route_ids = matching_route_ids.join(
+                    DestinationAirport, DestinationAirport.id == Route.destination_id
+                ).where(text_match_filter(DestinationAirport.code, destination.upper(), match))
+        # Airline names are matched case-insensitively in every mode
+        matching_airline_ids = db.select(Airline.id).where(
+            text_match_filter(Airline.name, airline, match, case_sensitive=False)
+        ) if airline else None
+        
+        def filter_criteria(model):
+            """Filters for one storage tier (AirlineData or its archive)"""
+            criteria = []
+            if matching_route_ids is not None:
+                criteria.append(model.route_id.in_(matching_route_ids))
+            if matching_airline_ids is not None:
+                criteria.append(model.airline_id.in_(matching_airline_ids))
+            if min_price:
+                criteria.append(model.price >= min_price)
+            if max_price:
+                criteria.append(model.price <= max_price)
+            if date_from:
+                criteria.append(model.departure_date >= datetime.strptime(date_from, '%Y-%m-%d'))
+            if date_to:
+                criteria.append(model.departure_date <= datetime.strptime(date_to, '%Y-%m-%d'))
+            
+            if cursor:
+                # Seek past the last row of the previous page instead of using OFFSET
+                criteria.append(db.or_(
+                    model.departure_date < cursor_date,
+                    db.and_(model.departure_date == cursor_date, model.id < cursor_id)
+                ))
+            return criteria
+        
+        def newest_first(model):
+            return [model.departure_date.desc(), model.id.desc()]
+        
+        # Page size, fetching one extra row to detect a next page
+        if output_format == 'json':
+            limit = min(limit or FILTER_DEFAULT_LIMIT, FILTER_MAX_LIMIT)
+        fetch_limit = limit + 1 if output_format == 'json' else limit
         
-        # Build query
-        query = AirlineData.query
-        
-        if origin:
-            query = query.filter(AirlineData.origin.ilike(f'%{origin}%'))
-        if destination:
-            query = query.filter(AirlineData.destination.ilike(f'%{destination}%'))
-        if airline:
-            query = query.filter(AirlineData.airline.ilike(f'%{airline}%'))
-        if min_price:
-            query = query.filter(AirlineData.price >= min_price)
-        if max_price:
-            query = query.filter(AirlineData.price <= max_price)
-        if date_from:
-            query = query.filter(AirlineData.departure_date >= datetime.strptime(date_from, '%Y-%m-%d'))
-        if date_to:
-            query = query.filter(AirlineData.departure_date <= datetime.strptime(date_to, '%Y-%m-%d'))
+        # Build query over both the hot table and the archive
+        history = flight_history(FILTER_COLUMNS, where=filter_criteria, order_by=newest_first, limit=fetch_limit)
+        query = db.select(history).order_by(history.c.departure_date.desc(), history.c.id.desc())
+        if fetch_limit is not None:
+            query = query.limit(fetch_limit)
+        
+        if output_format == 'ndjson':
+            def generate_rows():
+                # yield_per streams rows from a server-side cursor in chunks
+                result = db.session.execute(query.execution_options(yield_per=FILTER_DEFAULT_LIMIT * 10))
+                for record in result:
+                    yield app.json.dumps(flight_to_dict(record)) + '\n'
+            
+            return app.response_class(stream_with_context(generate_rows()), mimetype='application/x-ndjson')
         
         # Execute query and format results
-        results = query.order_by(AirlineData.departure_date.desc()).limit(100).all()
-        
-        data = []
-        for record in results:
-            data.append({
-                'route': record.route,
-                'origin': record.origin,
-                'destination': record.destination,
-                'price': record.price,
-                'airline': record.airline,
-                'departure_date': record.departure_date.strftime('%Y-%m-%d'),
-                'scraped_at': record.scraped_at.strftime('%Y-%m-%d %H:%M')
-            })
-        
-        return jsonify(data)
+        results = db.session.execute(query).all()
+        
+        data = [flight_to_dict(record) for record in results[:limit]]
+        response = jsonify(data)
+        
+        if len(results) > limit:
+            last = results[limit - 1]
+            next_cursor = encode_cursor(last.departure_date, last.id)
+            response.headers['X-Next-Cursor'] = next_cursor
+            
+            next_args = request.args.to_dict()
+            next_args['cursor'] = next_cursor
+            response.headers['Link'] = f'<{url_for("filter_data", **next_args)}>; rel="next"'
+        
+        return response
         
     except Exception as e:
         logging.error(f"Filter data error: {str(e)}")
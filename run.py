@@ -13,7 +13,7 @@ if __name__ == '__main__':
         os.environ['SESSION_SECRET'] = 'your-secret-key-change-this-in-production'
     
     if not os.environ.get('DATABASE_URL'):
-        os.environ['DATABASE_URL'] = 'sqlite:///instance/airline_data.db'
+        os.environ['DATABASE_URL'] = 'sqlite:///airline_data.db'
     
     # Check if OpenAI API key is set
     if not os.environ.get('OPENAI_API_KEY'):
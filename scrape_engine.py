@@ -0,0 +1,149 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+import hashlib
+import logging
+import random
+import threading
+import time
+import trafilatura
+from http_client import HttpClient
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_HOST_DELAY = (1, 3)
+
+# Outcome of a conditional fetch. status is 'changed' (content holds the new
+# page body), 'not_modified' (the server answered 304) or 'unchanged' (the
+# body hashes the same as last time); content is None unless changed.
+FetchResult = namedtuple('FetchResult', 'url status content etag last_modified content_hash bytes')
+
+class HostThrottle:
+    """
+    Per-host politeness: at most one request in flight per host, with a
+    random delay between consecutive requests to the same host
+    """
+
+    def __init__(self, delay_range=DEFAULT_HOST_DELAY):
+        self.delay_range = delay_range
+        self._guard = threading.Lock()
+        self._hosts = {}
+
+    def _host_state(self, host):
+        with self._guard:
+            if host not in self._hosts:
+                self._hosts[host] = {'lock': threading.Lock(), 'next_allowed': 0.0}
+            return self._hosts[host]
+
+    @contextmanager
+    def slot(self, host):
+        """Hold the host's slot for the duration of one request"""
+        state = self._host_state(host)
+
+        with state['lock']:
+            wait = state['next_allowed'] - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+
+            try:
+                yield
+            finally:
+                state['next_allowed'] = time.monotonic() + random.uniform(*self.delay_range)
+
+class FetchEngine:
+    """
+    Fetch many URLs concurrently. Each host is worked through serially by a
+    single worker (honouring the HostThrottle delay), different hosts run in
+    parallel, and the pool size caps total concurrency. Total wall time is
+    therefore roughly that of the slowest host.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_CONCURRENCY, host_delay=DEFAULT_HOST_DELAY, fetch=None):
+        self.max_workers = max_workers
+        self.throttle = HostThrottle(host_delay)
+        self.fetch = fetch or trafilatura.fetch_url
+
+    def _fetch_host(self, host, urls):
+        results = {}
+
+        for url in urls:
+            with self.throttle.slot(host):
+                try:
+                    results[url] = self.fetch(url)
+                except Exception as e:
+                    logging.warning(f"Could not fetch {url}: {str(e)}")
+                    results[url] = None
+
+        return results
+
+    def fetch_all(self, urls):
+        """
+        Fetch every URL and return a dict of url -> downloaded content
+        (None for pages that could not be fetched)
+        """
+        urls_by_host = {}
+        for url in dict.fromkeys(urls):
+            urls_by_host.setdefault(urlsplit(url).netloc.lower(), []).append(url)
+
+        if not urls_by_host:
+            return {}
+
+        results = {}
+        workers = min(self.max_workers, len(urls_by_host))
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scrape') as executor:
+            futures = [
+                executor.submit(self._fetch_host, host, host_urls)
+                for host, host_urls in urls_by_host.items()
+            ]
+            for future in futures:
+                results.update(future.result())
+
+        return results
+
+class ConditionalFetcher:
+    """
+    Fetch callable for FetchEngine that revalidates pages against the state
+    recorded on the previous run. states maps url -> dict with 'etag',
+    'last_modified', 'content_hash' and 'bytes'; matching If-None-Match and
+    If-Modified-Since headers are sent, and a 200 response whose body hashes
+    the same as before is also reported as unchanged. Requests go through
+    client (an http_client.HttpClient).
+    """
+
+    def __init__(self, states=None, headers=None, timeout=None, client=None):
+        self.states = states or {}
+        self.headers = headers or {}
+        self.timeout = timeout
+        self.client = client or HttpClient()
+
+    def __call__(self, url):
+        state = self.states.get(url) or {}
+
+        headers = dict(self.headers)
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+
+        response = self.client.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return FetchResult(
+                url, 'not_modified', None,
+                state.get('etag'), state.get('last_modified'), state.get('content_hash'), 0
+            )
+
+        response.raise_for_status()
+        body = response.content
+        content_hash = hashlib.sha256(body).hexdigest()
+        changed = content_hash != state.get('content_hash')
+
+        return FetchResult(
+            url,
+            'changed' if changed else 'unchanged',
+            body if changed else None,
+            response.headers.get('ETag'),
+            response.headers.get('Last-Modified'),
+            content_hash,
+            len(body)
+        )
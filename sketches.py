@@ -0,0 +1,416 @@
+from app import db
+from models import AirlineData, Sketch, Route, Airline
+from dimensions import LOOKUP_CHUNK_SIZE, insert_ignoring_duplicates
+from tiering import flight_history
+from array import array
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import bindparam, event, select, insert, update
+from sqlalchemy.orm import Session
+import hashlib
+import logging
+import math
+import struct
+
+# t-digest compression (delta): a digest keeps at most about delta / 2 centroids
+DIGEST_COMPRESSION = 100
+
+# HyperLogLog precision: 2**p one-byte registers, standard error 1.04 / sqrt(2**p)
+HLL_PRECISION = 12
+
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+PRICE_DIGEST = 'price_digest'
+ROUTE_HLL = 'route_hll'
+
+# Rows read per chunk when rebuilding the sketches from the raw data
+REBUILD_CHUNK_SIZE = 10000
+
+class TDigest:
+    """
+    Merging t-digest (Dunning & Ertl) of a stream of values: sorted centroids
+    (mean, weight) that are small near the tails and larger in the middle
+    (k1 scale function), so extreme quantiles such as p99 stay accurate while
+    the digest keeps at most about DIGEST_COMPRESSION / 2 centroids however
+    many values it has seen. Digests of disjoint data merge into a digest of the union.
+    """
+
+    def __init__(self, compression=DIGEST_COMPRESSION):
+        self.compression = compression
+        self.means = []
+        self.weights = []
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer = []
+
+    def add(self, value, weight=1):
+        self._buffer.append((value, weight))
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= 5 * self.compression:
+            self._compress()
+
+    def update(self, values):
+        values = list(values)
+        if not values:
+            return
+        self._buffer.extend((value, 1) for value in values)
+        self.count += len(values)
+        self.min = min(self.min, min(values))
+        self.max = max(self.max, max(values))
+        if len(self._buffer) >= 5 * self.compression:
+            self._compress()
+
+    def merge(self, other):
+        """Fold another digest into this one"""
+        other._compress()
+        self._buffer.extend(zip(other.means, other.weights))
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def _k(self, q):
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _q_limit(self, q):
+        """Largest cumulative fraction a centroid starting at `q` may reach"""
+        k = self._k(q) + 1
+        if k >= self.compression / 4:
+            return 1.0
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def _compress(self):
+        if not self._buffer:
+            return
+
+        points = sorted(list(zip(self.means, self.weights)) + self._buffer)
+        self._buffer = []
+        total = self.count
+
+        means, weights = [], []
+        mean, weight = points[0]
+        cumulative = 0
+        q_limit = self._q_limit(0)
+
+        for next_mean, next_weight in points[1:]:
+            if (cumulative + weight + next_weight) / total <= q_limit:
+                weight += next_weight
+                mean += (next_mean - mean) * next_weight / weight
+            else:
+                means.append(mean)
+                weights.append(weight)
+                cumulative += weight
+                q_limit = self._q_limit(cumulative / total)
+                mean, weight = next_mean, next_weight
+
+        means.append(mean)
+        weights.append(weight)
+        self.means, self.weights = means, weights
+
+    def quantile(self, q):
+        """Estimated value at quantile q (0..1), or None for an empty digest"""
+        self._compress()
+        if not self.count:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+
+        # Positions run from 0 (min) to count - 1 (max) as in numpy's linear
+        # interpolation, so a digest whose centroids are all single values
+        # gives numpy.quantile's result exactly. A centroid's mass is centred
+        # on its mean; interpolate between neighbouring centres, and from
+        # min/max to the outermost ones
+        target = q * (self.count - 1)
+        means, weights = self.means, self.weights
+
+        first_center = (weights[0] - 1) / 2
+        if target < first_center:
+            return self.min + (means[0] - self.min) * target / first_center
+
+        cumulative = 0
+        for index in range(len(means) - 1):
+            center = cumulative + (weights[index] - 1) / 2
+            next_center = cumulative + weights[index] + (weights[index + 1] - 1) / 2
+            if target < next_center:
+                fraction = (target - center) / (next_center - center)
+                return means[index] + (means[index + 1] - means[index]) * fraction
+            cumulative += weights[index]
+
+        last_center = cumulative + (weights[-1] - 1) / 2
+        if target <= last_center:
+            return means[-1]
+        fraction = (target - last_center) / (self.count - 1 - last_center)
+        return means[-1] + (self.max - means[-1]) * fraction
+
+    def to_bytes(self):
+        self._compress()
+        header = struct.pack('<HddI', self.compression, self.min, self.max, len(self.means))
+        return header + array('d', self.means).tobytes() + array('d', self.weights).tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        if not data:
+            return cls()
+        compression, low, high, size = struct.unpack_from('<HddI', data)
+        offset = struct.calcsize('<HddI')
+        means, weights = array('d'), array('d')
+        means.frombytes(data[offset:offset + 8 * size])
+        weights.frombytes(data[offset + 8 * size:offset + 16 * size])
+
+        digest = cls(compression)
+        digest.means, digest.weights = means.tolist(), weights.tolist()
+        digest.count = sum(digest.weights)
+        digest.min, digest.max = low, high
+        return digest
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest(), 'big')
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct-value counter: 2**precision registers, each holding
+    the longest run of leading zero bits seen among the hashes routed to it.
+    Estimates have a standard error of 1.04 / sqrt(2**precision) (1.6% at
+    the default precision); small counts use linear counting and are close
+    to exact. Sketches merge by taking the larger of each register.
+    """
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        hashed = _hash64(value)
+        index = hashed >> (64 - self.precision)
+        remaining = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remaining.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        # Repeated values cannot change the registers, so hash each once
+        for value in set(values):
+            self.add(value)
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self):
+        registers = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / registers)
+        # Registers hold small ranks, so sum 2**-rank per distinct rank
+        ranks = Counter(self.registers)
+        raw = alpha * registers * registers / sum(count * 2.0 ** -rank for rank, count in ranks.items())
+
+        empty = ranks[0]
+        if raw <= 2.5 * registers and empty:
+            return round(registers * math.log(registers / empty))
+        return round(raw)
+
+    def to_bytes(self):
+        return bytes([self.precision]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if not data:
+            return cls()
+        sketch = cls(data[0])
+        sketch.registers = bytearray(data[1:])
+        return sketch
+
+SKETCH_CLASSES = {
+    PRICE_DIGEST: TDigest,
+    ROUTE_HLL: HyperLogLog
+}
+
+def sketch_values(flights):
+    """
+    Group flight records (row dicts or AirlineData objects) by sketch:
+    prices per route and per airline, route ids per airline.
+    Returns a dict of (sketch_type, scope, scope_id) -> list of values
+    """
+    values = {}
+    for flight in flights:
+        if isinstance(flight, dict):
+            route_id, airline_id, price = flight['route_id'], flight['airline_id'], flight['price']
+        else:
+            route_id, airline_id, price = flight.route_id, flight.airline_id, flight.price
+
+        values.setdefault((PRICE_DIGEST, 'route', route_id), []).append(price)
+        values.setdefault((PRICE_DIGEST, 'airline', airline_id), []).append(price)
+        values.setdefault((ROUTE_HLL, 'airline', airline_id), []).append(route_id)
+    return values
+
+def _load_stored(connection, keys):
+    """Stored sketch rows for keys, locked for update, as a dict of key -> (id, data)"""
+    table = Sketch.__table__
+    ids_by_kind = {}
+    for sketch_type, scope, scope_id in keys:
+        ids_by_kind.setdefault((sketch_type, scope), []).append(scope_id)
+
+    stored = {}
+    for (sketch_type, scope), scope_ids in ids_by_kind.items():
+        for offset in range(0, len(scope_ids), LOOKUP_CHUNK_SIZE):
+            rows = connection.execute(
+                select(table.c.id, table.c.scope_id, table.c.data).where(
+                    table.c.sketch_type == sketch_type,
+                    table.c.scope == scope,
+                    table.c.scope_id.in_(scope_ids[offset:offset + LOOKUP_CHUNK_SIZE])
+                ).with_for_update()
+            )
+            for sketch_id, scope_id, data in rows:
+                stored[(sketch_type, scope, scope_id)] = (sketch_id, data)
+    return stored
+
+def record_sketches(flights, connection=None):
+    """
+    Add newly inserted flights to the stored sketches. Runs on the caller's
+    connection so the sketches commit or roll back together with the raw
+    rows; stored rows are locked while they are updated.
+    Returns the number of sketches touched.
+    """
+    values = sketch_values(flights)
+    if not values:
+        return 0
+
+    connection = connection if connection is not None else db.session.connection()
+    table = Sketch.__table__
+    now = datetime.utcnow()
+
+    stored = _load_stored(connection, list(values))
+    missing = [key for key in values if key not in stored]
+    if missing:
+        connection.execute(insert_ignoring_duplicates(connection.dialect.name, table), [
+            {'sketch_type': sketch_type, 'scope': scope, 'scope_id': scope_id,
+             'data': b'', 'item_count': 0, 'updated_at': now}
+            for sketch_type, scope, scope_id in missing
+        ])
+        stored.update(_load_stored(connection, missing))
+
+    updates = []
+    for key, new_values in values.items():
+        sketch_id, data = stored[key]
+        sketch = SKETCH_CLASSES[key[0]].from_bytes(data)
+        sketch.update(new_values)
+        updates.append({'sketch_id': sketch_id, 'new_data': sketch.to_bytes(), 'new_count': len(new_values)})
+
+    connection.execute(
+        update(table).where(table.c.id == bindparam('sketch_id')).values(
+            data=bindparam('new_data'),
+            item_count=table.c.item_count + bindparam('new_count'),
+            updated_at=now
+        ),
+        updates
+    )
+    return len(updates)
+
+def rebuild_sketches():
+    """
+    Recompute all sketches from the raw airline data, hot and archived
+    Returns the number of sketches written
+    """
+    try:
+        history = flight_history(('route_id', 'airline_id', 'price'))
+        query = select(history).execution_options(yield_per=REBUILD_CHUNK_SIZE)
+
+        sketches = {}
+        counts = {}
+        for chunk in db.session.execute(query).partitions():
+            for key, values in sketch_values(
+                {'route_id': route_id, 'airline_id': airline_id, 'price': price}
+                for route_id, airline_id, price in chunk
+            ).items():
+                if key not in sketches:
+                    sketches[key] = SKETCH_CLASSES[key[0]]()
+                sketches[key].update(values)
+                counts[key] = counts.get(key, 0) + len(values)
+
+        now = datetime.utcnow()
+        db.session.query(Sketch).delete()
+        if sketches:
+            db.session.execute(insert(Sketch), [
+                {'sketch_type': sketch_type, 'scope': scope, 'scope_id': scope_id,
+                 'data': sketch.to_bytes(), 'item_count': counts[(sketch_type, scope, scope_id)],
+                 'updated_at': now}
+                for (sketch_type, scope, scope_id), sketch in sketches.items()
+            ])
+        db.session.commit()
+        logging.info(f"Rebuilt {len(sketches)} sketches from raw airline data")
+
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error rebuilding sketches: {str(e)}")
+        raise e
+
+    return len(sketches)
+
+def backfill_sketches_if_empty():
+    """
+    Build the sketches for databases that have raw data but were created
+    before the sketch table existed
+    """
+    has_sketches = db.session.query(Sketch.id).first() is not None
+    has_raw_data = db.session.query(AirlineData.id).first() is not None
+
+    if has_raw_data and not has_sketches:
+        return rebuild_sketches()
+    return 0
+
+def quantile_label(q):
+    """'p50', 'p99', 'p99.9' for 0.5, 0.99, 0.999"""
+    return f"p{q * 100:.4g}"
+
+def price_percentiles(scope='route', name=None, quantiles=DEFAULT_QUANTILES):
+    """
+    Estimated price quantiles per route or airline (scope), or for the one
+    named, from the stored t-digests. Returns a list of dicts with the
+    count, exact min/max and a 'percentiles' dict keyed by quantile_label
+    """
+    model = Route if scope == 'route' else Airline
+    label = model.name
+    query = select(label, Sketch.data).join(
+        Sketch, Sketch.scope_id == model.id
+    ).where(
+        Sketch.sketch_type == PRICE_DIGEST,
+        Sketch.scope == scope
+    ).order_by(label)
+    if name is not None:
+        query = query.where(label == name)
+
+    results = []
+    for scope_name, data in db.session.execute(query):
+        digest = TDigest.from_bytes(data)
+        if not digest.count:
+            continue
+        results.append({
+            scope: scope_name,
+            'count': int(digest.count),
+            'min_price': round(digest.min, 2),
+            'max_price': round(digest.max, 2),
+            'percentiles': {quantile_label(q): round(digest.quantile(q), 2) for q in quantiles}
+        })
+    return results
+
+def distinct_route_counts():
+    """Estimated number of distinct routes flown, per airline id, from the stored HyperLogLogs"""
+    rows = db.session.execute(
+        select(Sketch.scope_id, Sketch.data).where(
+            Sketch.sketch_type == ROUTE_HLL,
+            Sketch.scope == 'airline'
+        )
+    )
+    return {airline_id: HyperLogLog.from_bytes(data).estimate() for airline_id, data in rows}
+
+@event.listens_for(Session, 'after_flush')
+def _sketch_flushed_airline_data(session, flush_context):
+    """
+    Keep sketches in step with AirlineData rows added through the ORM session
+    """
+    new_flights = [obj for obj in session.new if isinstance(obj, AirlineData)]
+    if new_flights:
+        record_sketches(new_flights, session.connection())
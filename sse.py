@@ -0,0 +1,139 @@
+from flask import Response, stream_with_context
+from collections import deque
+import json
+import threading
+
+DEFAULT_BUFFER_SIZE = 256
+DEFAULT_HEARTBEAT_SECONDS = 15
+
+# Milliseconds a disconnected EventSource waits before reconnecting
+RECONNECT_MS = 3000
+
+def format_event(data, event=None, event_id=None):
+    """Encode one Server-Sent Events message with `data` serialized as JSON"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'), default=str)}")
+    return '\n'.join(lines) + '\n\n'
+
+def parse_last_event_id(value):
+    """The numeric Last-Event-ID a reconnecting client sent, or None"""
+    try:
+        return int(value) if value not in (None, '') else None
+    except ValueError:
+        return None
+
+class EventBroadcaster:
+    """
+    Fan-out of events to any number of Server-Sent Events subscribers.
+    Published events are numbered and kept in a ring buffer of the last
+    `buffer_size` messages, already encoded, so publishing costs the same
+    however many clients listen and a client that reconnects with
+    Last-Event-ID is sent what it missed. Subscribers keep no queue of their
+    own: each just remembers the last id it sent, and waits on an Event that
+    the next publish sets (under gevent, setting it only schedules the
+    wake-ups, so publishing does not block on the number of subscribers).
+    """
+
+    def __init__(self, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self._events = deque(maxlen=buffer_size)
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self._published_event = threading.Event()
+        self.published = 0
+        self.subscribers = 0
+
+    def publish(self, event, data):
+        """Add an event to the buffer and wake the subscribers. Returns its id"""
+        message = format_event(data, event)
+        with self._lock:
+            self._last_id += 1
+            event_id = self._last_id
+            self._events.append((event_id, f"id: {event_id}\n{message}"))
+            self.published += 1
+            waiting, self._published_event = self._published_event, threading.Event()
+        waiting.set()
+        return event_id
+
+    def last_event_id(self):
+        with self._lock:
+            return self._last_id
+
+    def _missed_events(self, last_id):
+        """
+        Buffered messages after `last_id`, or None when some of them have
+        already left the buffer (or the id is from before a restart)
+        """
+        missed = self._last_id - last_id
+        if missed < 0 or missed > len(self._events):
+            return None
+        # Ids are consecutive, so the missed events are the last `missed` ones
+        return [self._events[index][1] for index in range(len(self._events) - missed, len(self._events))]
+
+    def stream(self, last_event_id=None, snapshot=None, heartbeat=DEFAULT_HEARTBEAT_SECONDS):
+        """
+        Generator of SSE text for one subscriber. A client resuming within the
+        buffer gets the events it missed; a new client (or one that fell too
+        far behind) first gets `snapshot()`, a (event, data) pair describing
+        the current state, if given. A comment line is sent after `heartbeat`
+        idle seconds so proxies and clients keep the connection open.
+        """
+        with self._lock:
+            self.subscribers += 1
+            position = self._last_id
+            missed = self._missed_events(last_event_id) if last_event_id is not None else None
+
+        try:
+            yield f"retry: {RECONNECT_MS}\n\n"
+            if missed is not None:
+                yield from missed
+            elif snapshot is not None:
+                event, data = snapshot()
+                yield format_event(data, event, position)
+
+            while True:
+                with self._lock:
+                    waiting = self._published_event if self._last_id == position else None
+                if waiting is not None:
+                    waiting.wait(heartbeat)
+
+                with self._lock:
+                    messages = self._missed_events(position)
+                    if messages is None:
+                        # Fell behind by more than the buffer: skip ahead
+                        messages = [message for _, message in self._events]
+                    position = self._last_id
+
+                if messages:
+                    yield ''.join(messages)
+                else:
+                    yield ": keep-alive\n\n"
+        finally:
+            with self._lock:
+                self.subscribers -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': self.subscribers,
+                'published': self.published,
+                'last_event_id': self._last_id,
+                'buffered': len(self._events),
+                'buffer_size': self.buffer_size
+            }
+
+def event_stream_response(stream):
+    """Streaming text/event-stream response for a generator from EventBroadcaster.stream"""
+    return Response(
+        stream_with_context(stream),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            # Stop nginx from buffering the stream
+            'X-Accel-Buffering': 'no'
+        }
+    )
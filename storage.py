@@ -0,0 +1,154 @@
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from urllib.parse import quote
+import logging
+import os
+
+DEFAULT_DATABASE_URL = 'sqlite:///airline_data.db'
+
+# Requests whose reads may be served by the read-only engine
+READ_ONLY_METHODS = frozenset(['GET', 'HEAD'])
+
+def database_url(url=None):
+    """
+    The database URL from DATABASE_URL (default: SQLite airline_data.db in the
+    instance folder). The postgres:// scheme some hosts hand out is rewritten
+    to postgresql://, which is the only spelling SQLAlchemy accepts.
+    """
+    url = url or os.environ.get('DATABASE_URL') or DEFAULT_DATABASE_URL
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+def is_sqlite(url):
+    return make_url(url).get_backend_name() == 'sqlite'
+
+def engine_options(config):
+    """
+    SQLAlchemy engine options for config['SQLALCHEMY_DATABASE_URI']: a sized
+    connection pool for server databases, plain options for SQLite (whose
+    tuning happens per connection, see sqlite_pragmas)
+    """
+    options = {
+        'pool_recycle': 300,
+        'pool_pre_ping': True,
+    }
+
+    if not is_sqlite(config['SQLALCHEMY_DATABASE_URI']):
+        options.update({
+            'pool_size': config['DB_POOL_SIZE'],
+            'max_overflow': config['DB_MAX_OVERFLOW'],
+            'pool_timeout': config['DB_POOL_TIMEOUT'],
+        })
+
+    return options
+
+def sqlite_pragmas(config, read_only=False):
+    """PRAGMA statements run on every new SQLite connection"""
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA mmap_size = {int(config['SQLITE_MMAP_SIZE'])}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
+    else:
+        # The journal mode is stored in the database file, so setting it on
+        # the writer is enough for the read-only connections too
+        pragmas.append(f"PRAGMA journal_mode = {config['SQLITE_JOURNAL_MODE']}")
+        pragmas.append(f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}")
+    return pragmas
+
+def _apply_pragmas_on_connect(engine, pragmas):
+    @event.listens_for(engine, 'connect')
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+def sqlite_read_only_url(url):
+    """URL opening the same SQLite file through a read-only URI connection"""
+    path = os.path.abspath(make_url(url).database)
+    return URL.create('sqlite', database=f"file:{quote(path)}", query={'mode': 'ro', 'uri': 'true'})
+
+def create_read_engine(app, engine):
+    """
+    Engine for the read-only connections, or None when reads should share
+    the primary engine: DATABASE_READ_URL (a replica) when set, otherwise a
+    read-only connection pool on the same file for on-disk SQLite
+    """
+    config = app.config
+    if not config['DB_READ_ROUTING']:
+        return None
+
+    if config.get('DATABASE_READ_URL'):
+        read_url = database_url(config['DATABASE_READ_URL'])
+        options = engine_options(dict(config, SQLALCHEMY_DATABASE_URI=read_url))
+        read_engine = create_engine(read_url, **options)
+        if is_sqlite(read_url):
+            _apply_pragmas_on_connect(read_engine, sqlite_pragmas(config, read_only=True))
+        return read_engine
+
+    if engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:'):
+        read_engine = create_engine(sqlite_read_only_url(engine.url), pool_pre_ping=True)
+        _apply_pragmas_on_connect(read_engine, sqlite_pragmas(config, read_only=True))
+        return read_engine
+
+    return None
+
+def init_storage(app, db):
+    """
+    Tune the app's engine (SQLite pragmas on connect) and set up the
+    read-only engine that RoutingSession sends request reads to.
+    Call right after db.init_app(app), before the first connection is made.
+    """
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name == 'sqlite':
+            _apply_pragmas_on_connect(engine, sqlite_pragmas(app.config))
+
+        read_engine = create_read_engine(app, engine)
+
+    app.extensions['read_engine'] = read_engine
+    if read_engine is not None:
+        logging.info(f"Routing read-only request queries to {read_engine.url!r}")
+    return read_engine
+
+class RoutingSession(Session):
+    """
+    Session sending SELECTs made while handling GET/HEAD requests to the
+    app's read-only engine (see init_storage). Everything else (writes,
+    flushes, background jobs, CLI commands, and any read after the session
+    has written in the current transaction) uses the primary engine, so a
+    transaction always sees its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._routes_to_reader(clause):
+            read_engine = current_app.extensions.get('read_engine')
+            if read_engine is not None:
+                return read_engine
+
+        # Flushes and raw connection() calls arrive without a SELECT clause
+        if clause is None or not getattr(clause, 'is_select', False):
+            self.info['wrote'] = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _routes_to_reader(self, clause):
+        return (
+            clause is not None
+            and getattr(clause, 'is_select', False)
+            and not self._flushing
+            and not self.info.get('wrote')
+            and has_request_context()
+            and request.method in READ_ONLY_METHODS
+        )
+
+@event.listens_for(RoutingSession, 'after_commit')
+@event.listens_for(RoutingSession, 'after_rollback')
+def _reset_write_flag(session):
+    session.info.pop('wrote', None)
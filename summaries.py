@@ -0,0 +1,160 @@
+class RouteSummaryAccumulator:
+    """
+    Running per-route booking counts, price totals and airlines, producing
+    the route summary sent to the popular routes analysis
+    """
+
+    def __init__(self):
+        self.routes = {}
+
+    def add(self, route, airline, price, month):
+        stats = self.routes.get(route)
+        if stats is None:
+            stats = self.routes[route] = {'count': 0, 'total_price': 0, 'airlines': set()}
+
+        stats['count'] += 1
+        stats['total_price'] += price
+        stats['airlines'].add(airline)
+
+    def summary(self, limit=20):
+        summary = []
+        for route, stats in self.routes.items():
+            summary.append({
+                'route': route,
+                'booking_count': stats['count'],
+                'avg_price': round(stats['total_price'] / stats['count'], 2),
+                'airline_count': len(stats['airlines']),
+                'airlines': sorted(stats['airlines'])
+            })
+
+        # Sort by booking count
+        summary.sort(key=lambda x: x['booking_count'], reverse=True)
+
+        return summary[:limit]
+
+class PriceSummaryAccumulator:
+    """
+    Running price count/total/min/max per route and departure month,
+    producing the price summary sent to the price trends analysis
+    """
+
+    def __init__(self):
+        self.groups = {}
+
+    def add(self, route, airline, price, month):
+        key = (route, month)
+        stats = self.groups.get(key)
+        if stats is None:
+            self.groups[key] = [1, price, price, price]
+            return
+
+        stats[0] += 1
+        stats[1] += price
+        if price < stats[2]:
+            stats[2] = price
+        if price > stats[3]:
+            stats[3] = price
+
+    def summary(self):
+        return [
+            {
+                'route': route,
+                'month': month,
+                'avg_price': round(total / count, 2),
+                'min_price': min_price,
+                'max_price': max_price,
+                'price_count': count
+            }
+            for (route, month), (count, total, min_price, max_price) in self.groups.items()
+        ]
+
+class DemandSummaryAccumulator:
+    """
+    Running booking counts and revenue per airline, route and departure
+    month, producing the demand summary sent to the demand analysis
+    """
+
+    def __init__(self):
+        self.total_bookings = 0
+        self.airlines = {}
+        self.routes = {}
+        self.monthly_demand = {}
+
+    def add(self, route, airline, price, month):
+        self.total_bookings += 1
+
+        airline_stats = self.airlines.get(airline)
+        if airline_stats is None:
+            airline_stats = self.airlines[airline] = {
+                'booking_count': 0,
+                'total_revenue': 0,
+                'avg_price': 0,
+                'routes': set()
+            }
+        airline_stats['booking_count'] += 1
+        airline_stats['total_revenue'] += price
+        airline_stats['routes'].add(route)
+
+        route_stats = self.routes.get(route)
+        if route_stats is None:
+            route_stats = self.routes[route] = {
+                'booking_count': 0,
+                'avg_price': 0,
+                'airlines': set()
+            }
+        route_stats['booking_count'] += 1
+        route_stats['airlines'].add(airline)
+
+        self.monthly_demand[month] = self.monthly_demand.get(month, 0) + 1
+
+    def summary(self):
+        airlines = {}
+        for airline, stats in self.airlines.items():
+            airlines[airline] = {
+                'booking_count': stats['booking_count'],
+                'total_revenue': stats['total_revenue'],
+                'avg_price': round(stats['total_revenue'] / stats['booking_count'], 2),
+                'routes': sorted(stats['routes'])
+            }
+
+        routes = {}
+        for route, stats in self.routes.items():
+            routes[route] = {
+                'booking_count': stats['booking_count'],
+                'avg_price': stats['avg_price'],
+                'airlines': sorted(stats['airlines'])
+            }
+
+        return {
+            'total_bookings': self.total_bookings,
+            'airlines': airlines,
+            'routes': routes,
+            'monthly_demand': dict(self.monthly_demand)
+        }
+
+class AnalysisSummaries:
+    """
+    Feeds each flight record to all three summary accumulators, so the route,
+    price and demand summaries are built in a single pass over the data.
+    Memory grows with the number of routes, airlines and months, not rows.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.routes = RouteSummaryAccumulator()
+        self.prices = PriceSummaryAccumulator()
+        self.demand = DemandSummaryAccumulator()
+
+    def add(self, route, airline, price, month):
+        self.count += 1
+        self.routes.add(route, airline, price, month)
+        self.prices.add(route, airline, price, month)
+        self.demand.add(route, airline, price, month)
+
+    def summaries(self):
+        """Summaries keyed by insight type, as analyze_market_trends takes them"""
+        return {
+            'popular_routes': self.routes.summary(),
+            'price_trends': self.prices.summary(),
+            'demand_analysis': self.demand.summary()
+        }
@@ -0,0 +1,41 @@
+import os
+import tempfile
+
+# Importing app migrates DATABASE_URL at startup: point it at a scratch file,
+# and use the offline model, before anything imports it
+os.environ['DATABASE_URL'] = f"sqlite:///{tempfile.mkdtemp(prefix='airline-tests-')}/app.db"
+os.environ['LLM_CLIENT'] = 'fake'
+os.environ['FAKE_LLM_LATENCY'] = '0'
+
+from flask import Flask
+import pytest
+from app import app, db
+from storage import engine_options, init_storage
+
+def bind_app(database_uri):
+    """
+    Flask app configured like the application but bound to its own
+    database, with no tables created
+    """
+    test_app = Flask('tests')
+    test_app.config.update(app.config)
+    test_app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    test_app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(test_app.config)
+    db.init_app(test_app)
+    init_storage(test_app, db)
+    return test_app
+
+@pytest.fixture
+def database_path(tmp_path):
+    return tmp_path / 'airline.db'
+
+@pytest.fixture
+def app_context(database_path):
+    """Application context on an empty, fully migrated database"""
+    from migrations import upgrade_database
+
+    test_app = bind_app(f"sqlite:///{database_path}")
+    with test_app.app_context():
+        upgrade_database()
+        yield test_app
+        db.session.remove()
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from columnar import FlightColumns, epoch_seconds, flight_snapshot
+from data_processor import get_popular_routes, get_airline_performance, get_route_statistics
+from ingest import ingest_flights
+
+ROUTES = [('JFK → LAX', 'JFK', 'LAX'), ('SFO → BOS', 'SFO', 'BOS'), ('ORD → MIA', 'ORD', 'MIA')]
+AIRLINES = ['Delta', 'United']
+
+def flights(count=60):
+    start = datetime(2026, 3, 1, 8, 30)
+    result = []
+    for index in range(count):
+        route, origin, destination = ROUTES[index % len(ROUTES)]
+        result.append({
+            'route': route, 'origin': origin, 'destination': destination,
+            'airline': AIRLINES[index % 5 % len(AIRLINES)],
+            'price': 100.0 + (index * 37) % 250,
+            'departure_date': start + timedelta(days=index % 30),
+            'scraped_at': start - timedelta(hours=index)
+        })
+    return result
+
+def as_rows(records):
+    return [(f['route'], f['origin'], f['destination'], f['airline'], f['price'], f['departure_date'], f['scraped_at'])
+            for f in records]
+
+def test_epoch_seconds_accepts_strings_datetimes_and_missing():
+    moment = datetime(2026, 1, 2, 3, 4, 5, 678)
+    expected = int((moment.replace(microsecond=0) - datetime(1970, 1, 1)).total_seconds())
+
+    assert epoch_seconds([moment, None]).tolist() == [expected, 0]
+    assert epoch_seconds(['2026-01-02 03:04:05.000678', None]).tolist() == [expected, 0]
+    assert epoch_seconds([]).tolist() == []
+
+def test_group_stats_matches_numpy_per_group():
+    records = flights()
+    columns = FlightColumns.from_rows(as_rows(records))
+
+    stats = {group['route']: group for group in columns.group_stats('route', percentiles=[50, 90])}
+    assert set(stats) == {route for route, _, _ in ROUTES}
+    for route, _, _ in ROUTES:
+        prices = np.array([f['price'] for f in records if f['route'] == route])
+        group = stats[route]
+        assert group['count'] == len(prices)
+        assert group['mean'] == pytest.approx(prices.mean())
+        assert group['std'] == pytest.approx(prices.std(ddof=1))
+        assert (group['min'], group['max']) == (prices.min(), prices.max())
+        assert group['p50'] == pytest.approx(np.percentile(prices, 50))
+        assert group['p90'] == pytest.approx(np.percentile(prices, 90))
+
+def test_single_row_group_has_zero_std():
+    columns = FlightColumns.from_rows(as_rows(flights(1)))
+    [group] = columns.group_stats('airline')
+    assert group['count'] == 1 and group['std'] == 0
+
+def test_load_matches_rows_read_through_labels(app_context):
+    records = flights()
+    ingest_flights(records, source_url='test://columnar')
+
+    loaded = FlightColumns.load()
+    expected = FlightColumns.from_rows(as_rows(records))
+    by_label = lambda stats, by: {group[by]: (group['count'], round(group['mean'], 6), group['min'], group['max'])
+                                  for group in stats}
+    for by in ('route', 'airline'):
+        assert by_label(loaded.group_stats(by), by) == by_label(expected.group_stats(by), by)
+    assert sorted(loaded.departure_ts.tolist()) == sorted(expected.departure_ts.tolist())
+    assert loaded.distinct_routes_per_airline() == expected.distinct_routes_per_airline()
+
+def test_numpy_backend_matches_sql(app_context):
+    ingest_flights(flights(), source_url='test://columnar')
+
+    assert get_popular_routes(10, 'numpy') == get_popular_routes(10, 'sql')
+    assert get_route_statistics('SFO → BOS', 'numpy') == get_route_statistics('SFO → BOS', 'sql')
+    numpy_airlines = get_airline_performance('numpy')
+    sql_airlines = get_airline_performance('sql')
+    # The SQL backend's route counts are HyperLogLog estimates
+    for row in numpy_airlines + sql_airlines:
+        row.pop('route_count')
+    assert numpy_airlines == sql_airlines
+
+def test_snapshot_is_reused_until_data_is_written(app_context):
+    ingest_flights(flights(30), source_url='test://columnar')
+
+    snapshot = flight_snapshot()
+    assert flight_snapshot() is snapshot
+    assert len(snapshot) == 30
+
+    ingest_flights(flights(30), source_url='test://columnar')
+    assert len(flight_snapshot()) == 60
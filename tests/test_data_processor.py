@@ -0,0 +1,42 @@
+from datetime import datetime
+from data_processor import get_demand_by_month, month_columns
+from ingest import ingest_flights
+from models import RouteDailyRollup
+from app import db
+
+def flight(price, departure_date):
+    return {
+        'route': 'JFK → LAX', 'origin': 'JFK', 'destination': 'LAX', 'airline': 'Delta',
+        'price': price, 'departure_date': departure_date, 'scraped_at': datetime(2026, 1, 15)
+    }
+
+def test_demand_by_month_groups_rollups_by_calendar_month(app_context):
+    ingest_flights([
+        flight(100.0, datetime(2026, 3, 1)),
+        flight(200.0, datetime(2026, 3, 31, 23, 0)),
+        flight(300.0, datetime(2026, 4, 1)),
+        flight(150.0, datetime(2025, 12, 20)),
+    ], source_url='test://demand')
+
+    assert get_demand_by_month() == [
+        {'month': '2025-12', 'booking_count': 1, 'avg_price': 150.0},
+        {'month': '2026-03', 'booking_count': 2, 'avg_price': 150.0},
+        {'month': '2026-04', 'booking_count': 1, 'avg_price': 300.0},
+    ]
+
+def test_demand_by_month_falls_back_to_extract_for_other_dialects(app_context, monkeypatch):
+    ingest_flights([
+        flight(100.0, datetime(2026, 3, 1)),
+        flight(300.0, datetime(2026, 4, 1)),
+    ], source_url='test://demand')
+    native = get_demand_by_month()
+
+    # Any dialect without its own month formatting gets EXTRACT(year/month)
+    monkeypatch.setattr(db.engine.dialect, 'name', 'mysql')
+    assert [str(column) for column in month_columns(RouteDailyRollup.day)] == [
+        'EXTRACT(year FROM route_daily_rollup.day)', 'EXTRACT(month FROM route_daily_rollup.day)'
+    ]
+    assert get_demand_by_month() == native == [
+        {'month': '2026-03', 'booking_count': 1, 'avg_price': 100.0},
+        {'month': '2026-04', 'booking_count': 1, 'avg_price': 300.0},
+    ]
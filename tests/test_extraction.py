@@ -0,0 +1,68 @@
+from datetime import datetime
+from extraction import extract_flights, extract_many
+
+REFERENCE = datetime(2026, 2, 1)
+
+def extract(text, source_url=None):
+    return extract_flights(text, source_url, reference_date=REFERENCE)
+
+def summary(flights):
+    return [(flight['route'], flight['airline'], flight['price'], flight['departure_date']) for flight in flights]
+
+def test_links_price_to_mentions_in_its_sentence():
+    text = (
+        "Delta has fares from JFK to LAX for $249 departing March 5. "
+        "United also flies SFO to BOS daily, with summer sales expected."
+    )
+    assert summary(extract(text)) == [('JFK → LAX', 'Delta', 249.0, datetime(2026, 3, 5))]
+
+def test_does_not_link_across_sentences():
+    text = (
+        "Fares are up this spring, with deals from $249 on some routes. "
+        "United flies SFO to BOS on March 5."
+    )
+    assert extract(text) == []
+
+def test_prefers_mentions_before_the_price():
+    text = "On March 5 Delta flies JFK to LAX for $249, and on March 9 United flies SFO to BOS for $199."
+    assert summary(extract(text)) == [
+        ('JFK → LAX', 'Delta', 249.0, datetime(2026, 3, 5)),
+        ('SFO → BOS', 'United', 199.0, datetime(2026, 3, 9)),
+    ]
+
+def test_clauses_split_on_semicolons():
+    text = "JFK to LAX on Delta for $249 departing March 5; SFO to BOS on United for $199 departing April 2."
+    assert summary(extract(text)) == [
+        ('JFK → LAX', 'Delta', 249.0, datetime(2026, 3, 5)),
+        ('SFO → BOS', 'United', 199.0, datetime(2026, 4, 2)),
+    ]
+
+def test_skips_fare_whose_only_route_follows_another_price():
+    # Nothing before $99 in the sentence, and the route after it comes after $249
+    text = "From $99 or $249 you can fly JFK to LAX on March 5."
+    assert summary(extract(text)) == [('JFK → LAX', 'Unknown', 249.0, datetime(2026, 3, 5))]
+
+def test_skips_fares_without_a_date():
+    assert extract("Delta flies JFK to LAX for $249.") == []
+
+def test_abbreviated_month_does_not_end_the_sentence():
+    text = "Delta flies JFK to LAX for $1,249.00 departing Jan. 5, 2027."
+    assert summary(extract(text)) == [('JFK → LAX', 'Delta', 1249.0, datetime(2027, 1, 5))]
+
+def test_airline_in_another_sentence_is_unknown():
+    text = "Delta posted results today. Fares from JFK to LAX are $249 departing March 5."
+    assert [flight['airline'] for flight in extract(text)] == ['Unknown']
+
+def test_records_carry_the_source_url():
+    text = "Delta flies JFK to LAX for $249 departing March 5."
+    assert [flight['source_url'] for flight in extract(text, 'https://example.com/deals')] == ['https://example.com/deals']
+    assert 'source_url' not in extract(text)[0]
+
+def test_extract_many_keeps_page_order():
+    pages = [
+        ("Delta flies JFK to LAX for $249 departing March 5.", 'page-1'),
+        ("No fares here.", 'page-2'),
+        ("United flies SFO to BOS for $199 departing April 2.", 'page-3'),
+    ]
+    results = extract_many(pages, reference_date=REFERENCE, processes=1)
+    assert [[flight['source_url'] for flight in page] for page in results] == [['page-1'], [], ['page-3']]
@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+from app import db
+from metrics import DB_QUERY_LATENCY, DB_SLOW_QUERIES, statement_operation
+
+def observed(operation, endpoint='background'):
+    return DB_QUERY_LATENCY._values.get((endpoint, operation), {'count': 0, 'sum': 0.0})
+
+def test_statement_operation():
+    assert statement_operation("  select 1") == 'SELECT'
+    assert statement_operation("WITH t AS (SELECT 1) SELECT * FROM t") == 'WITH'
+    assert statement_operation("PRAGMA journal_mode") == 'OTHER'
+    assert statement_operation("") == 'OTHER'
+
+def test_failed_statement_does_not_skew_later_timings(app_context):
+    with db.engine.connect() as connection:
+        before = dict(observed('SELECT'))
+        slow_before = DB_SLOW_QUERIES._values.get(('background', 'SELECT'), 0)
+
+        with pytest.raises(OperationalError):
+            connection.exec_driver_sql("SELECT * FROM no_such_table")
+        connection.rollback()
+        connection.exec_driver_sql("SELECT 1").scalar()
+
+        after = observed('SELECT')
+        assert after['count'] == before['count'] + 1
+        assert after['sum'] - before['sum'] < 0.5
+        assert DB_SLOW_QUERIES._values.get(('background', 'SELECT'), 0) == slow_before
+        assert not connection.info.get('query_started')
@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+import random
+import sqlite3
+import pytest
+from sqlalchemy import inspect
+from app import db
+from conftest import bind_app
+import migrations
+from migrations import upgrade_database
+from models import AirlineData, Airline, Airport, Route, RouteDailyRollup
+
+# The schema the application shipped with, before the dimension tables
+BASELINE_SCHEMA = """
+CREATE TABLE airline_data (
+    id INTEGER NOT NULL PRIMARY KEY,
+    route VARCHAR(200) NOT NULL,
+    origin VARCHAR(100) NOT NULL,
+    destination VARCHAR(100) NOT NULL,
+    price FLOAT NOT NULL,
+    airline VARCHAR(100) NOT NULL,
+    departure_date DATETIME NOT NULL,
+    scraped_at DATETIME,
+    source_url VARCHAR(500)
+);
+CREATE TABLE market_insight (
+    id INTEGER NOT NULL PRIMARY KEY,
+    insight_type VARCHAR(100) NOT NULL,
+    content TEXT NOT NULL,
+    generated_at DATETIME,
+    data_period_start DATETIME NOT NULL,
+    data_period_end DATETIME NOT NULL
+);
+CREATE TABLE scraping_log (
+    id INTEGER NOT NULL PRIMARY KEY,
+    source VARCHAR(200) NOT NULL,
+    status VARCHAR(50) NOT NULL,
+    records_scraped INTEGER,
+    error_message TEXT,
+    scraped_at DATETIME
+);
+"""
+
+AIRLINES = ['United', 'American', 'Delta', 'Southwest', 'JetBlue', 'Alaska', 'Spirit', 'Frontier']
+ROUTES = [('LAX', 'JFK'), ('SFO', 'BOS'), ('CHI', 'MIA'), ('DEN', 'SEA'), ('BOS', 'LAX')]
+ROWS = 500
+
+def create_baseline_database(path, rows=ROWS):
+    """A database populated like the original populate_sample_data.py"""
+    rng = random.Random(7)
+    now = datetime(2026, 1, 15, 12, 0)
+    connection = sqlite3.connect(path)
+    connection.executescript(BASELINE_SCHEMA)
+    for record_id in range(1, rows + 1):
+        origin, destination = rng.choice(ROUTES)
+        connection.execute(
+            "INSERT INTO airline_data (id, route, origin, destination, price, airline, departure_date, scraped_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (record_id, f"{origin} → {destination}", origin, destination, round(rng.uniform(150, 650), 2),
+             rng.choice(AIRLINES), str(now + timedelta(days=rng.randint(1, 90))),
+             str(now - timedelta(days=rng.randint(0, 59))))
+        )
+    connection.commit()
+    connection.close()
+
+def table_names():
+    return set(inspect(db.engine).get_table_names())
+
+def test_upgrade_migrates_baseline_database(database_path):
+    create_baseline_database(database_path)
+
+    with bind_app(f"sqlite:///{database_path}").app_context():
+        upgrade_database()
+
+        assert db.session.query(AirlineData).count() == ROWS
+        assert sorted(airline.name for airline in Airline.query) == sorted(AIRLINES)
+        assert {route.name for route in Route.query} == {f"{o} → {d}" for o, d in ROUTES}
+        assert db.session.query(Airport).count() == len({code for route in ROUTES for code in route})
+        assert db.session.query(db.func.sum(RouteDailyRollup.booking_count)).scalar() == ROWS
+        assert not {name for name in table_names() if name.endswith('_legacy')}
+
+        record = db.session.get(AirlineData, 1)
+        assert record.route == f"{record.origin} → {record.destination}"
+
+def test_failed_migration_leaves_baseline_rows_in_place(database_path, monkeypatch):
+    create_baseline_database(database_path)
+
+    def fail(*selects):
+        raise RuntimeError('interrupted')
+
+    # Fails after the tables were copied, dropped and recreated
+    monkeypatch.setattr(migrations, 'union_all', fail)
+    with bind_app(f"sqlite:///{database_path}").app_context():
+        with pytest.raises(RuntimeError):
+            migrations.normalize_legacy_flight_tables()
+
+    connection = sqlite3.connect(database_path)
+    columns = {row[1] for row in connection.execute("PRAGMA table_info(airline_data)")}
+    tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert 'route' in columns
+    assert connection.execute("SELECT COUNT(*) FROM airline_data").fetchone()[0] == ROWS
+    assert 'airline_data_legacy' not in tables
+    assert 'airline' not in tables
+    connection.close()
+
+def test_upgrade_restores_copy_left_by_interrupted_migration(database_path):
+    create_baseline_database(database_path)
+    connection = sqlite3.connect(database_path)
+    connection.execute("ALTER TABLE airline_data RENAME TO airline_data_legacy")
+    connection.commit()
+    connection.close()
+
+    with bind_app(f"sqlite:///{database_path}").app_context():
+        # What an interrupted migration used to leave: empty new tables
+        db.create_all()
+        upgrade_database()
+
+        assert db.session.query(AirlineData).count() == ROWS
+        assert 'airline_data_legacy' not in table_names()
+
+def test_upgrade_is_a_no_op_on_current_schema(app_context):
+    assert migrations.normalize_legacy_flight_tables() == 0
+    assert upgrade_database() == []
@@ -0,0 +1,84 @@
+from datetime import datetime, time, timedelta
+from data_events import airline_data_committed
+from data_processor import get_price_alerts
+from ingest import ingest_flights
+from price_alerts import PriceAlertEngine, WINDOW_DAYS
+
+class RecordingBroadcaster:
+    def __init__(self):
+        self.events = []
+
+    def publish(self, event, data):
+        self.events.append((event, data['route']))
+
+def departing(days_ago, route, price):
+    origin, destination = route.split(' → ')
+    return {
+        'route': route, 'origin': origin, 'destination': destination, 'airline': 'Delta', 'price': price,
+        'departure_date': datetime.combine(datetime.utcnow().date() - timedelta(days=days_ago), time(12))
+    }
+
+def previous_window(route, price):
+    return departing(WINDOW_DAYS + 3, route, price)
+
+def recent_window(route, price):
+    return departing(3, route, price)
+
+def engine_with_events():
+    broadcaster = RecordingBroadcaster()
+    engine = PriceAlertEngine(threshold_percentage=10, broadcaster=broadcaster, signal=airline_data_committed)
+    return engine, broadcaster
+
+def test_alerts_match_the_sql_query(app_context):
+    ingest_flights([
+        previous_window('JFK → LAX', 200.0), recent_window('JFK → LAX', 260.0),
+        previous_window('SFO → BOS', 200.0), recent_window('SFO → BOS', 150.0),
+        previous_window('ORD → MIA', 200.0), recent_window('ORD → MIA', 205.0),
+    ], source_url='test://alerts')
+
+    engine = PriceAlertEngine(threshold_percentage=10)
+    assert engine.alerts() == get_price_alerts(10)
+    assert [(alert['route'], alert['alert_type']) for alert in engine.alerts()] == [
+        ('JFK → LAX', 'price_increase'), ('SFO → BOS', 'price_decrease')
+    ]
+
+def test_committed_rows_raise_and_clear_alerts(app_context):
+    ingest_flights([previous_window('JFK → LAX', 200.0), recent_window('JFK → LAX', 205.0)],
+                   source_url='test://alerts')
+    engine, broadcaster = engine_with_events()
+    assert engine.alerts() == []
+
+    ingest_flights([recent_window('JFK → LAX', 400.0)], source_url='test://alerts')
+    assert broadcaster.events == [('price_alert', 'JFK → LAX')]
+    assert engine.stats()['rows_applied'] == 1 and engine.stats()['syncs'] == 1
+
+    ingest_flights([previous_window('JFK → LAX', 400.0), previous_window('JFK → LAX', 400.0)],
+                   source_url='test://alerts')
+    assert broadcaster.events[-1] == ('price_alert_cleared', 'JFK → LAX')
+    assert engine.alerts() == get_price_alerts(10) == []
+
+def test_windows_slide_with_the_date(app_context, monkeypatch):
+    ingest_flights([previous_window('JFK → LAX', 200.0), recent_window('JFK → LAX', 300.0)],
+                   source_url='test://alerts')
+    engine, broadcaster = engine_with_events()
+    assert len(engine.alerts()) == 1
+
+    # Five days on, the recent departures have moved into the previous
+    # window and the old ones out of both
+    today = datetime.utcnow().date()
+    monkeypatch.setattr(engine, '_today', lambda: today + timedelta(days=WINDOW_DAYS - 2))
+    assert engine.alerts() == []
+    assert broadcaster.events == [('price_alert', 'JFK → LAX'), ('price_alert_cleared', 'JFK → LAX')]
+    assert engine.stats()['syncs'] == 1
+
+def test_unknown_writes_reseed_from_the_rollups(app_context):
+    from rollups import rebuild_rollups
+
+    ingest_flights([previous_window('JFK → LAX', 200.0), recent_window('JFK → LAX', 300.0)],
+                   source_url='test://alerts')
+    engine, _ = engine_with_events()
+    engine.alerts()
+
+    rebuild_rollups()
+    assert engine.stats()['syncs'] == 2
+    assert engine.alerts() == get_price_alerts(10)
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+from app import db
+from ingest import ingest_flights
+from models import AirlineData, RouteDailyRollup
+from rollups import rebuild_rollups
+
+DEPARTURE = datetime(2026, 5, 1, 9, 0)
+
+def flights():
+    return [
+        {
+            'route': route, 'origin': route[:3], 'destination': route[-3:], 'airline': airline,
+            'price': price, 'departure_date': DEPARTURE + timedelta(days=day), 'scraped_at': datetime(2026, 4, 1)
+        }
+        for route, airline, price, day in [
+            ('JFK → LAX', 'Delta', 200.0, 0),
+            ('JFK → LAX', 'Delta', 300.0, 0),
+            ('JFK → LAX', 'Delta', 250.0, 1),
+            ('SFO → BOS', 'United', 150.0, 0),
+        ]
+    ]
+
+def stored_rollups():
+    db.session.expire_all()
+    return sorted(
+        (str(row.day), row.route_id, row.airline_id, row.booking_count, row.price_sum,
+         row.price_sum_sq, row.price_min, row.price_max)
+        for row in RouteDailyRollup.query
+    )
+
+def assert_rollups_match_raw_data():
+    incremental = stored_rollups()
+    rebuild_rollups()
+    assert incremental == stored_rollups()
+
+def row_priced(price):
+    return AirlineData.query.filter_by(price=price).one()
+
+def test_orm_insert_is_rolled_up(app_context):
+    ingest_flights(flights(), source_url='test://rollups')
+    template = row_priced(150.0)
+
+    db.session.add(AirlineData(
+        route_id=template.route_id, airline_id=template.airline_id, price=90.0,
+        departure_date=DEPARTURE, scraped_at=datetime(2026, 4, 2)
+    ))
+    db.session.commit()
+
+    assert_rollups_match_raw_data()
+    assert db.session.query(db.func.sum(RouteDailyRollup.booking_count)).scalar() == 5
+
+def test_price_update_recomputes_min_and_max(app_context):
+    ingest_flights(flights(), source_url='test://rollups')
+
+    row_priced(300.0).price = 120.0
+    db.session.commit()
+
+    assert_rollups_match_raw_data()
+    assert max(row.price_max for row in RouteDailyRollup.query) == 250.0
+
+def test_departure_change_moves_the_row_between_days(app_context):
+    ingest_flights(flights(), source_url='test://rollups')
+
+    row_priced(250.0).departure_date = DEPARTURE + timedelta(days=7)
+    db.session.commit()
+
+    assert_rollups_match_raw_data()
+
+def test_delete_empties_the_bucket(app_context):
+    ingest_flights(flights(), source_url='test://rollups')
+
+    db.session.delete(row_priced(150.0))
+    db.session.commit()
+
+    assert_rollups_match_raw_data()
+    assert len(stored_rollups()) == 2
+
+def test_expired_rows_are_updated_and_deleted_by_their_stored_keys(app_context):
+    ingest_flights(flights(), source_url='test://rollups')
+    updated, deleted = row_priced(200.0), row_priced(250.0)
+    db.session.expire_all()
+
+    updated.price = 400.0
+    db.session.delete(deleted)
+    db.session.commit()
+
+    assert_rollups_match_raw_data()
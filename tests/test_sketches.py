@@ -0,0 +1,91 @@
+from datetime import datetime
+import random
+import numpy as np
+import pytest
+from ingest import ingest_flights
+from sketches import HyperLogLog, TDigest, DIGEST_COMPRESSION, price_percentiles, rebuild_sketches
+
+def test_digest_of_few_values_is_exact():
+    values = [120.0, 80.0, 95.5, 300.0, 150.0, 99.0, 210.0]
+    digest = TDigest()
+    digest.update(values)
+
+    for q in (0.1, 0.5, 0.9, 0.99):
+        assert digest.quantile(q) == pytest.approx(np.quantile(values, q))
+    assert (digest.quantile(0), digest.quantile(1)) == (80.0, 300.0)
+    assert TDigest().quantile(0.5) is None
+
+def test_digest_stays_small_and_accurate_on_many_values():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(5, 0.5) for _ in range(50000)]
+    digest = TDigest()
+    for offset in range(0, len(values), 1000):
+        digest.update(values[offset:offset + 1000])
+
+    assert len(digest.means) <= DIGEST_COMPRESSION
+    ranked = np.sort(values)
+    for q in (0.5, 0.9, 0.99):
+        # Error measured in rank, as t-digest bounds it
+        rank = np.searchsorted(ranked, digest.quantile(q)) / len(values)
+        assert rank == pytest.approx(q, abs=0.01)
+
+def test_merged_digests_match_one_digest_of_the_union():
+    rng = random.Random(11)
+    values = [rng.uniform(50, 500) for _ in range(20000)]
+    whole, left, right = TDigest(), TDigest(), TDigest()
+    whole.update(values)
+    left.update(values[:7000])
+    right.update(values[7000:])
+    left.merge(right)
+
+    assert left.count == whole.count == len(values)
+    assert (left.min, left.max) == (min(values), max(values))
+    for q in (0.5, 0.9, 0.99):
+        assert left.quantile(q) == pytest.approx(whole.quantile(q), rel=0.01)
+
+def test_digest_round_trips_through_bytes():
+    digest = TDigest()
+    digest.update(float(value) for value in range(1000))
+    restored = TDigest.from_bytes(digest.to_bytes())
+
+    assert (restored.count, restored.min, restored.max) == (1000, 0.0, 999.0)
+    assert restored.quantile(0.9) == digest.quantile(0.9)
+    assert TDigest.from_bytes(b'').count == 0
+
+def test_hyperloglog_estimates_within_its_error_bound():
+    sketch = HyperLogLog()
+    sketch.update(range(20000))
+    sketch.update(range(10000))  # duplicates do not count
+
+    # Three standard errors of 1.04 / sqrt(4096)
+    assert sketch.estimate() == pytest.approx(20000, rel=3 * 0.0163)
+
+def test_merged_hyperloglogs_match_one_of_the_union():
+    left, right, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    left.update(range(40))
+    right.update(range(30, 70))
+    union.update(range(70))
+    assert left.estimate() == 40
+
+    left.merge(right)
+    assert left.to_bytes() == union.to_bytes()
+    assert HyperLogLog.from_bytes(left.to_bytes()).estimate() == pytest.approx(70, abs=2)
+
+def test_stored_percentiles_follow_ingestion_and_rebuild(app_context):
+    prices = [100.0, 150.0, 200.0, 250.0, 400.0]
+    ingest_flights([
+        {
+            'route': 'JFK → LAX', 'origin': 'JFK', 'destination': 'LAX', 'airline': 'Delta',
+            'price': price, 'departure_date': datetime(2026, 5, 1)
+        }
+        for price in prices
+    ], source_url='test://sketches')
+
+    [stats] = price_percentiles('route', quantiles=(0.5, 0.9))
+    assert stats == {
+        'route': 'JFK → LAX', 'count': 5, 'min_price': 100.0, 'max_price': 400.0,
+        'percentiles': {'p50': 200.0, 'p90': round(float(np.quantile(prices, 0.9)), 2)}
+    }
+
+    rebuild_sketches()
+    assert price_percentiles('route', quantiles=(0.5, 0.9)) == [stats]
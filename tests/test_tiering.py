@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import func, select
+from app import db
+from ingest import ingest_flights
+from models import AirlineData, AirlineDataArchive, RouteDailyRollup
+from tiering import archive_old_rows, flight_history, MIN_HOT_RETENTION_DAYS
+
+def flights(scraped_days_ago):
+    now = datetime.utcnow()
+    return [
+        {
+            'route': 'JFK → LAX', 'origin': 'JFK', 'destination': 'LAX', 'airline': 'Delta',
+            'price': 100.0 + index, 'departure_date': now + timedelta(days=10),
+            'scraped_at': now - timedelta(days=days)
+        }
+        for index, days in enumerate(scraped_days_ago)
+    ]
+
+def history_prices():
+    history = flight_history(('id', 'price', 'route'))
+    return sorted(db.session.execute(select(history.c.id, history.c.price, history.c.route)).all())
+
+def test_archive_moves_old_rows_and_keeps_ids(app_context):
+    ingest_flights(flights([200, 120, 100, 5, 1]), source_url='test://tiering')
+    before = history_prices()
+
+    assert archive_old_rows(retention_days=90, batch_size=2) == 3
+
+    assert sorted(row.price for row in AirlineDataArchive.query) == [100.0, 101.0, 102.0]
+    assert sorted(row.price for row in AirlineData.query) == [103.0, 104.0]
+    assert history_prices() == before
+    # The rollups cover both tiers and are left alone
+    assert db.session.query(func.sum(RouteDailyRollup.booking_count)).scalar() == 5
+
+def test_archive_never_moves_the_newest_row(app_context):
+    ingest_flights(flights([200, 150]), source_url='test://tiering')
+
+    assert archive_old_rows(retention_days=90) == 1
+    assert [row.price for row in AirlineData.query] == [101.0]
+
+def test_archive_rejects_short_retention(app_context):
+    with pytest.raises(ValueError):
+        archive_old_rows(retention_days=MIN_HOT_RETENTION_DAYS - 1)
+
+def test_flight_history_filters_each_tier(app_context):
+    ingest_flights(flights([200, 120, 5, 1]), source_url='test://tiering')
+    archive_old_rows(retention_days=90)
+
+    history = flight_history(('price',), where=lambda model: [model.price >= 101.0])
+    assert sorted(db.session.execute(select(history.c.price)).scalars()) == [101.0, 102.0, 103.0]
+
+def test_populate_sample_data_clears_the_archive(app_context, monkeypatch):
+    import populate_sample_data
+
+    # Run the script against the test database rather than the app's own
+    monkeypatch.setattr(populate_sample_data, 'app', app_context)
+    ingest_flights(flights([200, 150, 1]), source_url='test://tiering')
+    archive_old_rows(retention_days=90)
+
+    populate_sample_data.populate_sample_data()
+
+    assert AirlineDataArchive.query.count() == 0
+    assert db.session.query(func.sum(RouteDailyRollup.booking_count)).scalar() == AirlineData.query.count() == 500
@@ -0,0 +1,93 @@
+from app import db
+from models import AirlineData, AirlineDataArchive
+from dimensions import LABEL_COLUMNS, join_labels
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, insert, delete, func, union_all
+import logging
+
+# Columns copied from the hot table into the archive
+ARCHIVE_COLUMNS = ('id', 'route_id', 'airline_id', 'price', 'departure_date', 'scraped_at', 'source_id')
+
+# Insight generation summarizes the last 30 days from the hot table alone
+# (ai_analyzer.generate_and_store_insights), so rows that recent must stay hot
+MIN_HOT_RETENTION_DAYS = 30
+
+def archive_old_rows(retention_days=None, batch_size=None):
+    """
+    Move AirlineData rows scraped more than retention_days ago (default:
+    HOT_RETENTION_DAYS) into airline_data_archive, one batch per transaction.
+    Rows keep their ids, and the rollups are left untouched since they cover
+    both tiers. The newest hot row is never moved, so SQLite cannot hand an
+    archived id out again. retention_days below MIN_HOT_RETENTION_DAYS is
+    rejected with a ValueError.
+    Returns the number of rows archived
+    """
+    if retention_days is None:
+        retention_days = current_app.config['HOT_RETENTION_DAYS']
+    if retention_days < MIN_HOT_RETENTION_DAYS:
+        raise ValueError(f"Hot retention must be at least {MIN_HOT_RETENTION_DAYS} days, got {retention_days}")
+    batch_size = batch_size or current_app.config['ARCHIVE_BATCH_SIZE']
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+
+    hot = AirlineData.__table__
+    archive = AirlineDataArchive.__table__
+    archived = 0
+
+    try:
+        newest_id = db.session.query(func.max(AirlineData.id)).scalar()
+        if newest_id is None:
+            return 0
+
+        while True:
+            rows = db.session.execute(
+                select(*[hot.c[name] for name in ARCHIVE_COLUMNS]).where(
+                    hot.c.scraped_at < cutoff,
+                    hot.c.id < newest_id
+                ).order_by(hot.c.id).limit(batch_size)
+            ).mappings().all()
+            if not rows:
+                break
+
+            archived_at = datetime.utcnow()
+            db.session.execute(insert(archive), [dict(row, archived_at=archived_at) for row in rows])
+            db.session.execute(delete(hot).where(hot.c.id.in_([row['id'] for row in rows])))
+            db.session.commit()
+            archived += len(rows)
+
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error archiving airline data: {str(e)}")
+        raise e
+
+    if archived:
+        logging.info(f"Archived {archived} airline records scraped before {cutoff:%Y-%m-%d}")
+    return archived
+
+def flight_history(column_names, where=None, order_by=None, limit=None):
+    """
+    Subquery over the full history: UNION ALL of the hot table and the
+    archive, exposing column_names. Besides the tiers' own columns these may
+    be the labels 'route', 'origin', 'destination', 'airline' and
+    'source_url', which are joined in from the dimension tables (aggregate
+    on the *_id columns and join labels afterwards where possible).
+    where and order_by are functions taking
+    the model (AirlineData or AirlineDataArchive) and returning a list of
+    criteria / order clauses, so each tier is filtered with its own indexes.
+    With a limit, each tier contributes at most `limit` rows in order_by
+    order, so an ordered, limited query over the union stays cheap.
+    """
+    branches = []
+    for model in (AirlineData, AirlineDataArchive):
+        branch = select(*[
+            LABEL_COLUMNS[name].label(name) if name in LABEL_COLUMNS else getattr(model, name)
+            for name in column_names
+        ]).select_from(model)
+        branch = join_labels(branch, model, column_names)
+        if where is not None:
+            branch = branch.where(*where(model))
+        if limit is not None:
+            branch = select(branch.order_by(*order_by(model)).limit(limit).subquery())
+        branches.append(branch)
+
+    return union_all(*branches).subquery('flight_history')